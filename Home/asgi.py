@@ -2,6 +2,11 @@
 ASGI config for Home project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Route /notification/stream/ to this entry point (e.g. gunicorn with uvicorn
+workers, see docker-compose.yml) when NOTIFICATION_STREAM_ENABLED is set, so
+open notification streams do not each hold a worker. Everything else should
+go through Home.wsgi: Django's ASGI handler reads synchronous streaming
+responses (exports, downloads) into memory before sending them.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -28,6 +28,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'school',
     'student',
     'home_auth'
@@ -37,10 +38,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', 
+    'school.middleware.RequestInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'school.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -49,7 +52,8 @@ ROOT_URLCONF = 'Home.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's own backend, timing renders for the request instrumentation
+        'BACKEND': 'school.instrumentation.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,6 +86,135 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis (see docker-compose.yml) is shared by every gunicorn worker, which
+# the signal-driven dashboard cache invalidation relies on. Without
+# REDIS_URL each process keeps its own local-memory cache.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'school.instrumentation.InstrumentedRedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'school.instrumentation.InstrumentedLocMemCache',
+        }
+    }
+
+# Seconds a dashboard metric group stays cached between invalidations
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Newest unread notifications shown in the header dropdown
+NOTIFICATION_DROPDOWN_LIMIT = 10
+
+# Seconds a cached per-user unread count is trusted before being recounted
+NOTIFICATION_COUNT_TIMEOUT = 3600
+
+# Bulk notification fan-out: rows per INSERT, seconds within which an
+# identical message to the same user is dropped, and background worker
+# threads per process (0 = send inline after commit)
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATION_DEDUPE_WINDOW = 300
+NOTIFICATION_WORKERS = 1
+
+# Retention: read/unread notifications older than these many days are
+# removed by `manage.py prune_notifications`, in chunks of this many rows
+NOTIFICATION_READ_TTL_DAYS = 30
+NOTIFICATION_UNREAD_TTL_DAYS = 180
+NOTIFICATION_PRUNE_BATCH_SIZE = 5000
+
+# Live notification push (Server-Sent Events). The stream view needs the
+# ASGI entry point (Home.asgi); under WSGI it would tie up a worker per open
+# tab. Serve only /notification/stream/ through ASGI and the rest through
+# WSGI (see docker-compose.yml): under ASGI, streamed exports and downloads
+# are read fully into memory before the first byte is sent.
+# Messages go through Redis when a URL is set, otherwise they only reach
+# browsers connected to the same process.
+NOTIFICATION_STREAM_ENABLED = os.environ.get('NOTIFICATION_STREAM_ENABLED', '') == '1'
+NOTIFICATION_PUBSUB_URL = os.environ.get('NOTIFICATION_PUBSUB_URL', REDIS_URL)
+# Seconds between keep-alive comments on an idle stream
+NOTIFICATION_STREAM_HEARTBEAT = 15
+
+# `manage.py update_homework_status` reminds teachers about open homework
+# due within this many days
+HOMEWORK_REMINDER_DAYS = 2
+
+# Seconds a section's computed exam results stay cached; mark entry
+# invalidates the affected sections immediately
+GRADEBOOK_CACHE_TIMEOUT = 3600
+
+# Report cards: school name printed on each card, and worker processes
+# that render a batch of PDFs (None = one per CPU, 0 = in the web process)
+REPORT_CARD_SCHOOL_NAME = 'Student Management System'
+REPORT_CARD_PROCESSES = None
+
+# Request instrumentation (school.middleware): queries, database, template
+# and cache figures per request, returned in a Server-Timing header and
+# logged on "school.requests". Requests slower than the threshold are
+# logged on "school.requests.slow" with their most expensive query shapes;
+# a query shape repeated this many times in one request is reported as a
+# likely N+1 loop.
+REQUEST_INSTRUMENTATION = True
+SERVER_TIMING_HEADER = True
+SLOW_REQUEST_THRESHOLD_MS = 500
+SLOW_REQUEST_TOP_QUERIES = 5
+N_PLUS_ONE_THRESHOLD = 10
+
+# Prometheus scrape endpoint at /metrics, fed by the request
+# instrumentation above. With several gunicorn workers, point
+# PROMETHEUS_MULTIPROC_DIR (an environment variable read by
+# prometheus_client) at a directory shared by the workers; gunicorn.conf.py
+# empties it on start. A scrape is answered only for a client sending
+# METRICS_TOKEN as "Authorization: Bearer <token>" or connecting from one
+# of METRICS_ALLOWED_NETWORKS (the address Django sees: behind nginx that
+# is the proxy, so use the token there). METRICS_PUBLIC = True opens it to
+# everyone.
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = ['127.0.0.0/8', '::1/128']
+METRICS_PUBLIC = False
+
+# On-demand profiling (school.middleware.ProfilingMiddleware). Nothing is
+# profiled until an admin adds a rule on the Profiling page; each process
+# re-reads the rules every PROFILING_RULES_REFRESH seconds. The sampler
+# records the request's stack every PROFILING_SAMPLE_INTERVAL seconds.
+# PROFILING_ENABLED = False removes the middleware altogether.
+PROFILING_ENABLED = True
+PROFILING_RULES_REFRESH = 30
+PROFILING_SAMPLE_INTERVAL = 0.005
+
+# Set REQUEST_LOG_LEVEL=INFO to log every request, not only slow ones and
+# N+1 warnings; SLOW_REQUEST_LOG names a file for the slow-request log.
+REQUEST_LOG_LEVEL = os.environ.get('REQUEST_LOG_LEVEL', 'WARNING')
+SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'request': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'requests': {'class': 'logging.StreamHandler', 'formatter': 'request'},
+        'slow_requests': (
+            {'class': 'logging.FileHandler', 'filename': SLOW_REQUEST_LOG, 'formatter': 'request'}
+            if SLOW_REQUEST_LOG else
+            {'class': 'logging.StreamHandler', 'formatter': 'request'}
+        ),
+    },
+    'loggers': {
+        'school.requests': {'handlers': ['requests'], 'level': REQUEST_LOG_LEVEL, 'propagate': False},
+        'school.requests.slow': {'handlers': ['slow_requests'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -155,3 +288,13 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Number of Parent/Student pairs written per transaction by the bulk importer
+STUDENT_IMPORT_BATCH_SIZE = 500
+
+# Rows fetched per database round trip by the streaming roster export
+STUDENT_EXPORT_CHUNK_SIZE = 2000
+
+# Worker threads that build student photo thumbnails after upload
+# (0 = build them inline, e.g. in tests)
+STUDENT_IMAGE_WORKERS = 2
@@ -0,0 +1,19 @@
+# Picked up automatically by gunicorn when started from the project root.
+import os
+import shutil
+
+
+def on_starting(server):
+    # Values left by a previous run would be added to this one's.
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        # Drop the dead worker's live gauges (notification queue depth).
+        multiprocess.mark_process_dead(worker.pid)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SchoolConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "school"
+
+    def ready(self):
+        # instrumentation hooks every database connection as it opens.
+        from . import instrumentation, signals  # noqa: F401
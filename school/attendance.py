@@ -0,0 +1,220 @@
+import hashlib
+import sys
+from array import array
+
+from django.db import transaction
+from django.utils import timezone
+
+from student.models import Student
+from . import homework, metrics, rollups
+from .models import AttendanceRoster, ClassSchedule, SessionAttendance
+
+
+UNMARKED = 0
+# Status name -> the byte stored at the student's roster position.
+STATUSES = {
+    "present": 1,
+    "absent": 2,
+    "late": 3,
+    "excused": 4,
+}
+STATUS_NAMES = {code: name for name, code in STATUSES.items()}
+# Late students were in class and count towards present_students.
+PRESENT_CODES = frozenset((STATUSES["present"], STATUSES["late"]))
+
+
+# Student ids are stored as little-endian signed 64-bit integers, wide
+# enough for any BigAutoField primary key.
+ID_TYPECODE = "q"
+ID_SIZE = array(ID_TYPECODE).itemsize
+
+
+def pack_ids(ids):
+    packed = array(ID_TYPECODE, ids)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_ids(blob):
+    ids = array(ID_TYPECODE)
+    ids.frombytes(bytes(blob))
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+def count_present(marks):
+    return sum(bytes(marks).count(code) for code in PRESENT_CODES)
+
+
+def roster_students(class_name):
+    # Same reading of the class name as homework: "Grade 9" or "Grade 9 B".
+    return homework.class_students(class_name).order_by("pk")
+
+
+def current_roster(class_name):
+    """
+    Return the roster for the class's current students, reusing the stored
+    snapshot when the membership has not changed.
+    """
+    blob = pack_ids(roster_students(class_name).values_list("pk", flat=True))
+    digest = hashlib.sha1(class_name.encode() + b"\0" + blob).hexdigest()
+    roster, _ = AttendanceRoster.objects.get_or_create(
+        digest=digest,
+        defaults={"class_name": class_name, "student_ids": blob, "size": len(blob) // ID_SIZE},
+    )
+    return roster
+
+
+def _apply(marks, roster_ids, statuses):
+    """
+    Write ``statuses`` (a status name for everyone, or ``{student_id: name}``)
+    into the ``marks`` bytearray.
+    """
+    if isinstance(statuses, str):
+        marks[:] = bytes([STATUSES[statuses]]) * len(roster_ids)
+        return
+    positions = {student_id: position for position, student_id in enumerate(roster_ids)}
+    for student_id, status in statuses.items():
+        position = positions.get(student_id)
+        if position is not None:
+            marks[position] = STATUSES[status] if status else UNMARKED
+
+
+def record(schedules, statuses):
+    """
+    Record attendance for every session in ``schedules``. ``statuses`` is a
+    status name applied to the whole class, or ``{student_id: name}``.
+
+    A session's roster is fixed the first time it is marked. New attendance
+    rows are written with one ``bulk_create``, existing ones and the derived
+    ``present_students``/``total_students`` with ``bulk_update``. Returns the
+    number of sessions written.
+    """
+    schedules = list(schedules)
+    if not schedules:
+        return 0
+    now = timezone.now()
+    rosters = {}
+    with transaction.atomic():
+        existing = {
+            row.pk: row
+            for row in SessionAttendance.objects.select_related("roster").filter(
+                schedule__in=schedules
+            )
+        }
+        created, updated = [], []
+        for schedule in schedules:
+            row = existing.get(schedule.pk)
+            if row is None:
+                if schedule.class_name not in rosters:
+                    rosters[schedule.class_name] = current_roster(schedule.class_name)
+                roster = rosters[schedule.class_name]
+                row = SessionAttendance(
+                    schedule=schedule, roster=roster, marks=bytes(roster.size), updated_at=now
+                )
+                created.append(row)
+            else:
+                updated.append(row)
+            marks = bytearray(row.marks)
+            _apply(marks, unpack_ids(row.roster.student_ids), statuses)
+            row.marks = bytes(marks)
+            row.present_count = count_present(marks)
+            row.updated_at = now
+
+            schedule.total_students = row.roster.size
+            schedule.present_students = row.present_count
+            schedule.updated_at = now
+
+        SessionAttendance.objects.bulk_create(created)
+        SessionAttendance.objects.bulk_update(updated, ["marks", "present_count", "updated_at"])
+        ClassSchedule.objects.bulk_update(
+            schedules, ["total_students", "present_students", "updated_at"]
+        )
+        # bulk_update sends no post_save, so the dashboard and roll-ups are
+        # refreshed here.
+        transaction.on_commit(lambda: metrics.invalidate("schedules"))
+        rollups.refresh_on_commit(schedules)
+    return len(schedules)
+
+
+def session_marks(schedule):
+    """
+    ``[(student, status_name_or_None), ...]`` for a session, in roster order.
+    Unmarked sessions list the class's current students.
+    """
+    try:
+        row = SessionAttendance.objects.select_related("roster").get(schedule=schedule)
+    except SessionAttendance.DoesNotExist:
+        return [(student, None) for student in roster_students(schedule.class_name)]
+
+    ids = unpack_ids(row.roster.student_ids)
+    students = Student.objects.in_bulk(list(ids))
+    return [
+        (students[student_id], STATUS_NAMES.get(code))
+        for student_id, code in zip(ids, row.marks)
+        # Students deleted since the session was marked are skipped.
+        if student_id in students
+    ]
+
+
+def _sessions(start=None, end=None):
+    rows = SessionAttendance.objects.all()
+    if start:
+        rows = rows.filter(schedule__date__gte=start)
+    if end:
+        rows = rows.filter(schedule__date__lt=end)
+    return rows
+
+
+def student_summaries(student_ids, start=None, end=None):
+    """
+    Count ``{student_id: {status_name: sessions}}`` for the given students
+    across the marked sessions whose rosters list them, optionally limited
+    to dates in ``[start, end)``. Going by the rosters rather than the class
+    name counts section sessions, and sessions from before a promotion.
+    """
+    wanted = set(student_ids)
+    rows = _sessions(start, end)
+    # Roster positions of the wanted students, for rosters used in the window.
+    positions = {}
+    for roster_id, blob in AttendanceRoster.objects.filter(
+        pk__in=rows.values("roster_id")
+    ).values_list("pk", "student_ids").iterator():
+        found = [
+            (position, student_id)
+            for position, student_id in enumerate(unpack_ids(blob))
+            if student_id in wanted
+        ]
+        if found:
+            positions[roster_id] = found
+
+    summaries = {}
+    for roster_id, marks in rows.filter(roster_id__in=list(positions)).values_list(
+        "roster_id", "marks"
+    ).iterator():
+        marks = bytes(marks)
+        for position, student_id in positions[roster_id]:
+            name = STATUS_NAMES.get(marks[position])
+            if name:
+                summary = summaries.get(student_id)
+                if summary is None:
+                    summary = summaries[student_id] = {status: 0 for status in STATUSES}
+                summary[name] += 1
+    return summaries
+
+
+def student_summary(student, start=None, end=None):
+    """
+    :func:`student_summaries` for one student; every status is listed.
+    """
+    return student_summaries([student.pk], start, end).get(student.pk) or {name: 0 for name in STATUSES}
+
+
+def class_summaries(class_name, start=None, end=None):
+    """
+    :func:`student_summaries` for the current students of a class or of one
+    of its sections.
+    """
+    return student_summaries(roster_students(class_name).values_list("pk", flat=True), start, end)
@@ -0,0 +1,273 @@
+"""
+End-to-end view benchmarks for ``manage.py benchmark``: every named URL
+in Home/urls.py is requested through the test client against a seeded
+test database, and its latency, query count and peak memory are recorded.
+"""
+import gc
+import io
+import math
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from home_auth.models import CustomUser
+from student.models import Student
+from . import gradebook
+from .models import ClassSchedule, Exam, ExamPaper, Notification, ReportCardBatch
+
+
+BENCHMARK_USER = "benchmark-admin"
+SEED_TEACHERS = 40
+EXAM_GRADE = "Grade 5"
+
+# URL name -> why it is not benchmarked.
+SKIPPED = {
+    "logout": "ends the benchmark session",
+    "notification_stream": "long-lived event stream",
+    "download_report_cards": "needs a rendered batch",
+    "delete_student": "destructive",
+    "clear_all_notification": "destructive",
+    "mark_notification_as_read": "changes state",
+    "mark_class_attendance": "POST only",
+    "reset-password": "needs a reset token",
+}
+# Pages served to visitors who are not signed in.
+ANONYMOUS = {"login", "signup", "forgot-password"}
+
+# Noise floors below which a slower or larger result is not a regression.
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KB = 256
+
+
+def seed(students, seed_value):
+    """
+    Top the database up to ``students`` students (the seeder only adds the
+    missing rows, so ascending sizes reuse the previous data set) plus the
+    fixtures that parametrised URLs need.
+    """
+    call_command(
+        "seed_demo_data",
+        students=students,
+        teachers=SEED_TEACHERS,
+        schedules=20,
+        homework=5,
+        # Notifications are added rather than topped up, so only once.
+        notifications=0 if Notification.objects.exists() else 20,
+        seed=seed_value,
+        stdout=io.StringIO(),
+    )
+    user, _ = CustomUser.objects.get_or_create(
+        username=BENCHMARK_USER,
+        defaults={"email": f"{BENCHMARK_USER}@example.com", "is_admin": True, "is_teacher": True},
+    )
+
+    exam = Exam.objects.filter(grade=EXAM_GRADE).first()
+    if exam is None:
+        exam = Exam.objects.create(name="Benchmark Exam", grade=EXAM_GRADE, date=timezone.localdate())
+        ExamPaper.objects.bulk_create(
+            ExamPaper(exam=exam, subject=subject) for subject in ("Mathematics", "English", "Science")
+        )
+    papers = list(exam.papers.all())
+    graded = set(exam.papers.values_list("marks__student_id", flat=True))
+    gradebook.record_marks(exam, {
+        (paper.pk, student_id): Decimal((student_id * 7 + paper.pk * 13) % 101)
+        for student_id in Student.objects.filter(student_class=EXAM_GRADE).values_list("pk", flat=True)
+        if student_id not in graded
+        for paper in papers
+    })
+    batch = ReportCardBatch.objects.filter(exam=exam).first() or ReportCardBatch.objects.create(exam=exam)
+    return user, {"exam": exam, "batch": batch}
+
+
+def url_kwargs(name, fixtures):
+    """
+    Arguments for the parametrised URLs, or None when there is no sample.
+    """
+    if name in ("view_student", "edit_student"):
+        slug = Student.objects.order_by("pk").values_list("slug", flat=True).first()
+        return slug and {"slug": slug}
+    if name == "session_attendance":
+        pk = ClassSchedule.objects.order_by("pk").values_list("pk", flat=True).first()
+        return pk and {"pk": pk}
+    if name in ("exam_marks", "exam_gradebook", "exam_report_cards"):
+        return {"pk": fixtures["exam"].pk}
+    if name == "report_card_progress":
+        return {"pk": fixtures["batch"].pk}
+    return None
+
+
+def url_query(name):
+    today = timezone.localdate()
+    if name in ("schedule_events", "schedule_conflicts"):
+        return f"start={today - timedelta(days=7)}&end={today + timedelta(days=35)}"
+    if name in ("student_search", "student_search_data"):
+        return "q=Shrestha"
+    if name == "student_roster_data":
+        return "draw=1&start=0&length=25"
+    return ""
+
+
+def _patterns(resolver=None):
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            # The admin site is Django's, not ours.
+            if pattern.app_name != "admin":
+                yield from _patterns(pattern)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern
+
+
+def benchmark_urls(fixtures, only=None):
+    """
+    ``(name, path_or_None, skip_reason)`` for every named URL.
+    """
+    for pattern in _patterns():
+        name = pattern.name
+        if only and name not in only:
+            continue
+        if name in SKIPPED:
+            yield name, None, SKIPPED[name]
+            continue
+        kwargs = {}
+        if pattern.pattern.converters:
+            kwargs = url_kwargs(name, fixtures)
+            if kwargs is None:
+                yield name, None, "no sample arguments"
+                continue
+        path = reverse(name, kwargs=kwargs)
+        query = url_query(name)
+        yield name, f"{path}?{query}" if query else path, None
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def succeeded(response):
+    return 200 <= response.status_code < 400
+
+
+def measure(client, path, repeat, warmup):
+    """
+    Latency (ms) percentiles and query counts over ``repeat`` requests after
+    ``warmup`` discarded ones, plus the peak traced memory of one extra
+    request (tracing is kept off the timed runs). A response other than
+    2xx/3xx stops the measurement: the result is then only ``path``,
+    ``status`` and ``failed``, since the time it takes to fail says nothing
+    about the page.
+    """
+    def failure(response):
+        return {"path": path, "status": response.status_code, "failed": True}
+
+    for _ in range(warmup):
+        response = client.get(path)
+        if not succeeded(response):
+            return failure(response)
+
+    latencies, queries, status = [], [], None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if not succeeded(response):
+            return failure(response)
+        queries.append(len(captured))
+        status = response.status_code
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        client.get(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "path": path,
+        "status": status,
+        "requests": repeat,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "queries": percentile(queries, 50),
+        "max_queries": max(queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_size(students, repeat, warmup, seed_value=1, only=None, log=None):
+    """
+    Seed up to ``students`` and benchmark every URL. Returns
+    ``({url_name: result}, {url_name: skip_reason}, {url_name: failure})``;
+    failed URLs are left out of the results.
+    """
+    user, fixtures = seed(students, seed_value)
+    # A failing view is reported by its status code rather than aborting the run.
+    signed_in = Client(raise_request_exception=False)
+    signed_in.force_login(user)
+    anonymous = Client(raise_request_exception=False)
+
+    results, skipped, failed = {}, {}, {}
+    for name, path, reason in benchmark_urls(fixtures, only):
+        if path is None:
+            skipped[name] = reason
+            continue
+        client = anonymous if name in ANONYMOUS else signed_in
+        result = measure(client, path, repeat, warmup)
+        if result.get("failed"):
+            failed[name] = result
+            if log:
+                log(f"  {name:<28} {result['status']}  FAILED, not timed")
+            continue
+        results[name] = result
+        if log:
+            log(f"  {name:<28} {result['status']}  p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                f"{result['queries']:>3} queries  {result['peak_memory_kb']:>9} KB")
+    return results, skipped, failed
+
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of ``results`` against ``baseline`` (both keyed by dataset
+    size, then URL name): p90 latency or peak memory more than ``threshold``
+    percent above the baseline, or any extra queries. Pages that fail are
+    not in ``results``; :func:`run_size` reports them separately.
+    """
+    factor = 1 + threshold / 100
+    regressions = []
+    for size, urls in results.items():
+        for name, result in urls.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            label = f"{size} students, {name}"
+            if (
+                result["p90_ms"] > before["p90_ms"] * factor
+                and result["p90_ms"] - before["p90_ms"] > MIN_LATENCY_DELTA_MS
+            ):
+                regressions.append(f"{label}: p90 {before['p90_ms']} ms -> {result['p90_ms']} ms")
+            if result["queries"] > before["queries"]:
+                regressions.append(f"{label}: queries {before['queries']} -> {result['queries']}")
+            if (
+                result["peak_memory_kb"] > before["peak_memory_kb"] * factor
+                and result["peak_memory_kb"] - before["peak_memory_kb"] > MIN_MEMORY_DELTA_KB
+            ):
+                regressions.append(
+                    f"{label}: peak memory {before['peak_memory_kb']} KB -> {result['peak_memory_kb']} KB"
+                )
+    return regressions
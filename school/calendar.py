@@ -0,0 +1,75 @@
+import hashlib
+from datetime import date, datetime, timedelta
+
+from django.db.models import Count, Max
+from django.urls import reverse
+
+from .models import ClassSchedule
+
+
+MAX_WINDOW_DAYS = 100
+
+EVENT_FIELDS = ("id", "date", "start_time", "end_time", "class_name", "topic", "status")
+
+
+def _parse_date(value):
+    # FullCalendar sends plain dates, or datetimes when a timezone is set.
+    return date.fromisoformat(value[:10])
+
+
+def parse_window(params, max_days=MAX_WINDOW_DAYS):
+    """
+    Return the ``[start, end)`` date window from ``start``/``end`` query
+    parameters. Raises ``ValueError`` for a missing, inverted or too wide
+    window.
+    """
+    try:
+        start = _parse_date(params["start"])
+        end = _parse_date(params["end"])
+    except (KeyError, ValueError):
+        raise ValueError("start and end must be ISO dates.")
+    if end <= start:
+        raise ValueError("end must be after start.")
+    if end - start > timedelta(days=max_days):
+        raise ValueError(f"The window may span at most {max_days} days.")
+    return start, end
+
+
+def schedules_in_window(start, end, teacher_id=None, class_name=None):
+    """
+    Schedules in ``[start, end)`` for a teacher or a class, served by the
+    ``(teacher, date, start_time)`` and ``(class_name, date)`` indexes.
+    """
+    schedules = ClassSchedule.objects.filter(date__gte=start, date__lt=end)
+    if class_name:
+        schedules = schedules.filter(class_name=class_name)
+    if teacher_id is not None:
+        schedules = schedules.filter(teacher_id=teacher_id)
+    return schedules.order_by("date", "start_time")
+
+
+def window_etag(schedules, key):
+    """
+    ETag for a window: changes whenever a schedule in it is added, removed
+    or edited, without loading the rows.
+    """
+    state = schedules.order_by().aggregate(count=Count("id"), changed=Max("updated_at"))
+    changed = state["changed"].isoformat() if state["changed"] else ""
+    return hashlib.md5(f"{key}:{state['count']}:{changed}".encode()).hexdigest()
+
+
+def serialize_event(row):
+    return {
+        "id": row["id"],
+        "title": f"{row['class_name']} - {row['topic']}",
+        "start": datetime.combine(row["date"], row["start_time"]).isoformat(),
+        "end": datetime.combine(row["date"], row["end_time"]).isoformat(),
+        "className": f"schedule-{row['status']}",
+        "url": reverse("session_attendance", args=[row["id"]]),
+        "class_name": row["class_name"],
+        "status": row["status"],
+    }
+
+
+def events(schedules):
+    return [serialize_event(row) for row in schedules.values(*EVENT_FIELDS)]
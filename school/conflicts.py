@@ -0,0 +1,259 @@
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from operator import itemgetter
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import ClassSchedule
+
+
+ROW_FIELDS = ("id", "teacher_id", "class_name", "date", "start_time", "end_time", "topic")
+
+# kind is "teacher" or "class"; first and second are rows as returned by
+# ``values(*ROW_FIELDS)``.
+Conflict = namedtuple("Conflict", ["kind", "first", "second"])
+
+# Kept in step with migration 0008 for `find_schedule_conflicts --install-constraints`.
+CONSTRAINTS = {
+    "schedule_teacher_no_overlap": "teacher_id",
+    "schedule_class_no_overlap": "class_name",
+}
+
+
+def _interval(row):
+    return (
+        datetime.combine(row["date"], row["start_time"]),
+        datetime.combine(row["date"], row["end_time"]),
+    )
+
+
+def _keys(row):
+    if row.get("teacher_id") is not None:
+        yield ("teacher", row["teacher_id"])
+    yield ("class", row["class_name"])
+
+
+class IntervalTree:
+    """
+    Static centred interval tree over half-open ``[start, end)`` intervals.
+    Built once in O(n log n); ``overlapping`` answers in O(log n + k).
+    """
+
+    def __init__(self, intervals):
+        intervals = list(intervals)
+        points = sorted(point for start, end, _ in intervals for point in (start, end))
+        self.center = points[len(points) // 2] if points else None
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=itemgetter(0))
+        self.by_end = sorted(here, key=itemgetter(1), reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def overlapping(self, start, end):
+        """
+        Return the items of every interval overlapping ``[start, end)``.
+        """
+        found = []
+        node = self
+        stack = []
+        while node is not None:
+            if node.center is not None:
+                if end <= node.center:
+                    for s, e, item in node.by_start:
+                        if s >= end:
+                            break
+                        if e > start:
+                            found.append(item)
+                elif start >= node.center:
+                    for s, e, item in node.by_end:
+                        if e <= start:
+                            break
+                        if s < end:
+                            found.append(item)
+                else:
+                    found.extend(item for s, e, item in node.by_start if s < end and e > start)
+                if start < node.center and node.left is not None:
+                    stack.append(node.left)
+                if end > node.center and node.right is not None:
+                    stack.append(node.right)
+            node = stack.pop() if stack else None
+        return found
+
+
+def _sweep(rows):
+    """
+    Yield every overlapping pair among ``rows``, which must share a key and
+    be sorted by start.
+    """
+    active = []
+    for row in rows:
+        start, end = _interval(row)
+        active = [(active_end, other) for active_end, other in active if active_end > start]
+        for _, other in active:
+            yield other, row
+        active.append((end, row))
+
+
+def find_conflicts(rows):
+    """
+    Every teacher and class double booking among ``rows`` in one pass: rows
+    are grouped by teacher and by class and each group is swept in start
+    order.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        for key in _keys(row):
+            groups[key].append(row)
+
+    conflicts = []
+    for (kind, _), group in groups.items():
+        group.sort(key=_interval)
+        conflicts.extend(Conflict(kind, first, second) for first, second in _sweep(group))
+    return conflicts
+
+
+def active_schedules():
+    return ClassSchedule.objects.exclude(status="cancelled")
+
+
+def term_conflicts(start, end, teacher_id=None):
+    """
+    All conflicts between sessions dated in ``[start, end)``, from a single
+    query. With ``teacher_id`` only conflicts involving that teacher are
+    returned.
+    """
+    rows = active_schedules().filter(date__gte=start, date__lt=end).values(*ROW_FIELDS)
+    conflicts = find_conflicts(rows)
+    if teacher_id is not None:
+        conflicts = [
+            conflict
+            for conflict in conflicts
+            if teacher_id in (conflict.first["teacher_id"], conflict.second["teacher_id"])
+        ]
+    return conflicts
+
+
+def schedule_conflicts(schedule):
+    """
+    Saved sessions that overlap ``schedule`` for its teacher or its class.
+    Only the session's own day is read, through the (teacher, date,
+    start_time) and (class_name, date) indexes.
+    """
+    same_owner = Q(class_name=schedule.class_name)
+    if schedule.teacher_id is not None:
+        same_owner |= Q(teacher_id=schedule.teacher_id)
+    conflicts = active_schedules().filter(
+        same_owner,
+        date=schedule.date,
+        start_time__lt=schedule.end_time,
+        end_time__gt=schedule.start_time,
+    )
+    if schedule.pk is not None:
+        conflicts = conflicts.exclude(pk=schedule.pk)
+    return conflicts
+
+
+def _row(schedule):
+    return {field: getattr(schedule, field) for field in ROW_FIELDS}
+
+
+def find_overlaps(schedule, limit=5):
+    """
+    Up to ``limit`` conflicts between ``schedule`` and saved sessions.
+    """
+    row = _row(schedule)
+    conflicts = []
+    for other in schedule_conflicts(schedule).values(*ROW_FIELDS)[:limit]:
+        kind = "teacher" if other["teacher_id"] == schedule.teacher_id else "class"
+        conflicts.append(Conflict(kind, row, other))
+    return conflicts
+
+
+def validate_schedules(schedules):
+    """
+    Check a batch of unsaved (or edited) sessions against each other and the
+    database. Existing sessions for every teacher and class in the batch are
+    fetched in one query and indexed in interval trees. Returns
+    ``{index: [Conflict, ...]}`` for the sessions that would clash.
+    """
+    candidates = [
+        (index, _row(schedule))
+        for index, schedule in enumerate(schedules)
+        if schedule.status != "cancelled"
+    ]
+    if not candidates:
+        return {}
+
+    rows = [row for _, row in candidates]
+    teacher_ids = {row["teacher_id"] for row in rows if row["teacher_id"] is not None}
+    class_names = {row["class_name"] for row in rows}
+    existing = (
+        active_schedules()
+        .filter(Q(teacher_id__in=teacher_ids) | Q(class_name__in=class_names))
+        .filter(date__gte=min(row["date"] for row in rows), date__lte=max(row["date"] for row in rows))
+        .exclude(pk__in=[row["id"] for row in rows if row["id"] is not None])
+        .values(*ROW_FIELDS)
+    )
+
+    intervals = defaultdict(list)
+    for row in existing:
+        start, end = _interval(row)
+        for key in _keys(row):
+            intervals[key].append((start, end, row))
+    trees = {key: IntervalTree(items) for key, items in intervals.items()}
+
+    problems = defaultdict(list)
+    for index, row in candidates:
+        start, end = _interval(row)
+        for key in _keys(row):
+            tree = trees.get(key)
+            if tree is not None:
+                problems[index].extend(Conflict(key[0], row, other) for other in tree.overlapping(start, end))
+
+    positions = {id(row): index for index, row in candidates}
+    for conflict in find_conflicts(rows):
+        problems[positions[id(conflict.second)]].append(conflict)
+    return {index: found for index, found in problems.items() if found}
+
+
+def describe(conflict):
+    other = conflict.second
+    owner = "Teacher" if conflict.kind == "teacher" else f"Class {other['class_name']}"
+    return (
+        f"{owner} is already booked on {other['date']:%b %d} from "
+        f"{other['start_time']:%H:%M} to {other['end_time']:%H:%M} ({other['topic']})."
+    )
+
+
+def constraints_installed():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", [next(iter(CONSTRAINTS))])
+        return cursor.fetchone() is not None
+
+
+def install_constraints():
+    """
+    Add the PostgreSQL exclusion constraints that migration 0008 skipped
+    because conflicting rows existed. Fails if any are still left.
+    """
+    if connection.vendor != "postgresql":
+        raise ValueError("Exclusion constraints are only supported on PostgreSQL.")
+    table = ClassSchedule._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        for name, column in CONSTRAINTS.items():
+            cursor.execute(
+                f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" EXCLUDE USING gist '
+                f'("{column}" WITH =, tsrange("date" + "start_time", "date" + "end_time") WITH &&) '
+                f"WHERE (status <> 'cancelled')"
+            )
@@ -1,23 +1,28 @@
-from django.db.models import QuerySet
-from .models import Notification
+from django.utils.functional import SimpleLazyObject
+
+from . import notifications
 
 
 def notification_context(request):
     """
     Provide unread notifications and count for the base layout.
+
+    Both values are lazy: nothing is queried unless the template uses them,
+    the list is capped at NOTIFICATION_DROPDOWN_LIMIT rows and the count
+    comes from a cached per-user counter.
     """
     if request.user.is_authenticated:
-        unread_qs: QuerySet[Notification] = Notification.objects.filter(
-            user=request.user, is_read=False
-        ).order_by("-created_at")
-        unread_list = list(unread_qs)
+        user_id = request.user.pk
         return {
-            "unread_notification": unread_list,
-            "unread_notification_count": len(unread_list),
+            "unread_notification": notifications.latest_unread(user_id),
+            "unread_notification_count": SimpleLazyObject(
+                lambda: notifications.unread_count(user_id)
+            ),
+            "notification_stream_enabled": notifications.stream_enabled(),
         }
 
     return {
         "unread_notification": [],
         "unread_notification_count": 0,
+        "notification_stream_enabled": False,
     }
-
@@ -0,0 +1,113 @@
+"""
+Deterministic row generators for ``manage.py seed_demo_data``. Kept free of
+Django imports so chunks can be generated in spawned worker processes;
+every chunk is seeded from ``(seed, chunk_index)`` alone, so the output is
+the same whatever the number of processes.
+"""
+import random
+import re
+import string
+from datetime import date, timedelta
+
+
+# Students generated per task; part of what a seed reproduces.
+CHUNK_SIZE = 10000
+
+MALE_NAMES = ["Aarav", "Sushan", "Bibek", "Prabesh", "Rohan", "Bijay", "Kiran", "Pratik", "Sudip", "Roshan"]
+FEMALE_NAMES = ["Aditi", "Sanjana", "Nitika", "Smriti", "Anu", "Bhawana", "Isha", "Kabita", "Reema", "Diya"]
+SURNAMES = ["Shrestha", "Gurung", "Khadka", "Magar", "Rai", "Thapa", "Poudel", "Bhattarai", "KC", "Basnet"]
+FATHER_NAMES = [
+    "Hari Bahadur", "Madan Prasad", "Dinesh Kumar", "Ramchandra", "Laxman",
+    "Parmanand", "Kishor", "Mahesh", "Ramesh", "Krishna",
+]
+MOTHER_NAMES = ["Laxmi", "Goma", "Radha", "Saraswati", "Mina", "Sita", "Kamala", "Parbati", "Sarita", "Gita"]
+DISTRICTS = [
+    "Kathmandu", "Lalitpur", "Bhaktapur", "Pokhara", "Chitwan",
+    "Biratnagar", "Dharan", "Butwal", "Hetauda", "Janakpur",
+]
+FATHER_OCCUPATIONS = ["Engineer", "Farmer", "Teacher", "Entrepreneur", "Civil Servant"]
+MOTHER_OCCUPATIONS = ["Homemaker", "Nurse", "Lecturer", "Entrepreneur", "Banker"]
+RELIGIONS = ["Hindu", "Buddhist", "Christian", "Muslim"]
+CLASSES = [f"Grade {grade}" for grade in range(1, 13)]
+SECTIONS = list(string.ascii_uppercase[:5])  # A-E
+
+TEACHER_TEMPLATES = [
+    ("Aisha", "Shrestha", "Science", "Physics"),
+    ("Bikash", "Adhikari", "Mathematics", "Calculus"),
+    ("Pratima", "Koirala", "Languages", "English"),
+    ("Suresh", "Maharjan", "Humanities", "History"),
+    ("Nisha", "Gurung", "Computer Science", "Programming"),
+    ("Kamal", "Thapa", "Science", "Biology"),
+    ("Ritika", "Rai", "Mathematics", "Algebra"),
+    ("Ganesh", "Bhattarai", "Languages", "Nepali"),
+    ("Sunita", "Bista", "Humanities", "Civics"),
+    ("Pawan", "Basnet", "Computer Science", "Robotics"),
+]
+
+
+def chunk_random(seed, *parts):
+    return random.Random("/".join(str(part) for part in (seed,) + parts))
+
+
+def slug(text):
+    # django.utils.text.slugify for the ASCII names used here.
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def phone(rng):
+    return rng.choice(["981", "984", "985", "986", "974"]) + "".join(rng.choices(string.digits, k=7))
+
+
+def email(full_name):
+    return f"{slug(full_name).replace('-', '.')}@example.com"
+
+
+def student_chunk(seed, chunk_index, first_serial, count, today_ordinal, year):
+    """
+    ``(parent_fields, student_fields)`` dict pairs for serials
+    ``first_serial .. first_serial + count - 1``. The serial is also the
+    row's primary key, which ties each student to its parent without a
+    round trip.
+    """
+    rng = chunk_random(seed, "students", chunk_index)
+    today = date.fromordinal(today_ordinal)
+    rows = []
+    for serial in range(first_serial, first_serial + count):
+        gender = rng.choice(("Male", "Female"))
+        first_name = rng.choice(MALE_NAMES if gender == "Male" else FEMALE_NAMES)
+        last_name = rng.choice(SURNAMES)
+        father = f"{rng.choice(FATHER_NAMES)} {rng.choice(SURNAMES)}"
+        mother = f"{rng.choice(MOTHER_NAMES)} {rng.choice(SURNAMES)}"
+        district = rng.choice(DISTRICTS)
+        student_id = f"STD{year}{serial:06d}"
+        parent = {
+            "id": serial,
+            "father_name": father,
+            "father_occupation": rng.choice(FATHER_OCCUPATIONS),
+            "father_mobile": phone(rng),
+            "father_email": email(father),
+            "mother_name": mother,
+            "mother_occupation": rng.choice(MOTHER_OCCUPATIONS),
+            "mother_mobile": phone(rng),
+            "mother_email": email(mother),
+            "present_address": f"{district} - {rng.randint(1, 30)}",
+            "permanent_address": f"{district}, Nepal",
+        }
+        student = {
+            "id": serial,
+            "parent_id": serial,
+            "first_name": first_name,
+            "last_name": last_name,
+            "student_id": student_id,
+            "gender": gender,
+            "date_of_birth": date(rng.randint(2008, 2016), rng.randint(1, 12), rng.randint(1, 28)),
+            "student_class": rng.choice(CLASSES),
+            "religion": rng.choice(RELIGIONS),
+            "joining_date": today - timedelta(days=rng.randint(30, 900)),
+            "mobile_number": phone(rng),
+            "admission_number": f"ADM{year}{serial:06d}",
+            "section": rng.choice(SECTIONS),
+            "slug": slug(f"{first_name}-{last_name}-{student_id}"),
+        }
+        rows.append((parent, student))
+    return rows
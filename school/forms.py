@@ -1,5 +1,6 @@
 from django import forms
-from .models import TeacherProfile, ClassSchedule, Homework
+from django.contrib.auth import get_user_model
+from .models import TeacherProfile, ClassSchedule, Homework, Exam, ProfilingRule
 
 
 class TeacherProfileForm(forms.ModelForm):
@@ -27,8 +28,6 @@ class ClassScheduleForm(forms.ModelForm):
             "end_time",
             "class_name",
             "topic",
-            "total_students",
-            "present_students",
             "syllabus_coverage",
             "status",
             "notes",
@@ -51,11 +50,88 @@ class HomeworkForm(forms.ModelForm):
             "description",
             "due_date",
             "status",
-            "completed_count",
-            "pending_count",
         ]
         widgets = {
             "due_date": forms.DateInput(attrs={"type": "date"}),
             "description": forms.Textarea(attrs={"rows": 3}),
         }
 
+
+
+class ExamForm(forms.ModelForm):
+    subjects = forms.CharField(
+        help_text="One paper per line as Subject or Subject:max marks (default 100).",
+        widget=forms.Textarea(attrs={"rows": 4}),
+    )
+
+    class Meta:
+        model = Exam
+        fields = [
+            "name",
+            "term",
+            "grade",
+            "date",
+        ]
+        widgets = {
+            "date": forms.DateInput(attrs={"type": "date"}),
+        }
+
+    def clean_subjects(self):
+        papers = {}
+        for line in self.cleaned_data["subjects"].splitlines():
+            subject, _, max_marks = line.partition(":")
+            subject = subject.strip()
+            if not subject:
+                continue
+            if len(subject) > 120:
+                raise forms.ValidationError(f"Subject names are limited to 120 characters: {subject[:20]}...")
+            max_marks = max_marks.strip() or "100"
+            if not max_marks.isdigit() or int(max_marks) < 1:
+                raise forms.ValidationError(f"Invalid max marks for {subject}.")
+            papers[subject] = int(max_marks)
+        if not papers:
+            raise forms.ValidationError("Add at least one subject.")
+        return papers
+
+
+class ProfilingRuleForm(forms.ModelForm):
+    class Meta:
+        model = ProfilingRule
+        fields = [
+            "path",
+            "user",
+            "sample_rate",
+            "mode",
+            "max_profiles",
+            "expires_at",
+        ]
+        labels = {
+            "path": "Path prefix",
+            "sample_rate": "Sample rate (%)",
+        }
+        widgets = {
+            "expires_at": forms.DateTimeInput(attrs={"type": "datetime-local"}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["user"].queryset = get_user_model().objects.filter(is_active=True).order_by("username")
+        self.fields["user"].required = False
+
+    def clean_path(self):
+        path = self.cleaned_data["path"].strip()
+        if path and not path.startswith("/"):
+            raise forms.ValidationError("Start the path with /, e.g. /teacher/dashboard/.")
+        return path
+
+    def clean_sample_rate(self):
+        rate = self.cleaned_data["sample_rate"]
+        if not 0 < rate <= 100:
+            raise forms.ValidationError("Choose a rate above 0 and up to 100.")
+        return rate
+
+    def clean_max_profiles(self):
+        count = self.cleaned_data["max_profiles"]
+        if count < 1:
+            raise forms.ValidationError("Capture at least one profile.")
+        return count
@@ -0,0 +1,324 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from student.models import Student
+from .models import ExamMark
+
+
+DEFAULT_TIMEOUT = 3600
+
+# Lower bound of each percentage band and the grade points it earns; below
+# the first band a paper earns nothing.
+GRADE_BANDS = np.array([35, 40, 50, 60, 70, 80, 90])
+GRADE_POINTS = np.array([0.0, 1.6, 2.0, 2.4, 2.8, 3.2, 3.6, 4.0])
+GRADE_LETTERS = ("NG", "D", "C", "C+", "B", "B+", "A", "A+")
+
+
+def _timeout():
+    return getattr(settings, "GRADEBOOK_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def _section_key(exam_id, section):
+    return f"gradebook:{exam_id}:section:{section}"
+
+
+def _sections_key(exam_id):
+    return f"gradebook:{exam_id}:sections"
+
+
+def invalidate(exam_id, sections=None):
+    """
+    Drop the cached results of ``sections`` (default: every section) so only
+    those are recomputed on the next read. A section the exam had no marks
+    for yet also drops the cached list of sections.
+    """
+    known = cache.get(_sections_key(exam_id))
+    if sections is None or (known is not None and not set(sections) <= set(known)):
+        cache.delete(_sections_key(exam_id))
+    if sections is None:
+        sections = known or []
+    cache.delete_many([_section_key(exam_id, section) for section in sections])
+
+
+def invalidate_students(student_ids):
+    """
+    Drop, once the transaction commits, the cached results of every exam
+    section ``student_ids`` have marks in. The sections are read now, so it
+    can run before the students (and their marks) are deleted.
+    """
+    touched = defaultdict(set)
+    for exam_id, section in (
+        ExamMark.objects.filter(student_id__in=student_ids)
+        .order_by()
+        .values_list("paper__exam_id", "section")
+        .distinct()
+    ):
+        touched[exam_id].add(section)
+    if touched:
+        transaction.on_commit(lambda: [invalidate(exam_id, sections) for exam_id, sections in touched.items()])
+
+
+def record_marks(exam, entries):
+    """
+    Save ``{(paper_id, student_id): marks}`` for ``exam`` in one upsert;
+    ``None`` clears a mark. New marks take the section the student already
+    has in this exam, or else their current section. Only the sections of
+    the students involved are invalidated. Returns the number of marks
+    written.
+    """
+    student_ids = {student_id for _, student_id in entries}
+    with transaction.atomic():
+        sections = dict(
+            Student.objects.filter(pk__in=student_ids).values_list("pk", "section")
+        )
+        sections.update(
+            ExamMark.objects.filter(paper__exam=exam, student_id__in=student_ids)
+            .values_list("student_id", "section")
+        )
+        saved = [
+            ExamMark(paper_id=paper_id, student_id=student_id, marks=marks, section=sections.get(student_id, ""))
+            for (paper_id, student_id), marks in entries.items()
+            if marks is not None
+        ]
+        cleared = [key for key, marks in entries.items() if marks is None]
+        ExamMark.objects.bulk_create(
+            saved,
+            update_conflicts=True,
+            unique_fields=("paper", "student"),
+            update_fields=("marks",),
+        )
+        if cleared:
+            removed = Q()
+            for paper_id, student_id in cleared:
+                removed |= Q(paper_id=paper_id, student_id=student_id)
+            ExamMark.objects.filter(removed).delete()
+        touched = set(sections.values())
+        transaction.on_commit(lambda: invalidate(exam.pk, touched))
+    return len(saved)
+
+
+def grade_points(percentages):
+    """
+    Grade points for an array of percentages; NaN (no mark) earns 0.
+    """
+    points = GRADE_POINTS[np.digitize(np.nan_to_num(percentages), GRADE_BANDS)]
+    return np.where(np.isnan(percentages), 0.0, points)
+
+
+def letter_grade(percentage):
+    return GRADE_LETTERS[int(np.digitize(percentage, GRADE_BANDS))]
+
+
+def _competition_ranks(groups, values):
+    """
+    1224-style ranks of ``values`` (highest first) within each group, without
+    a Python loop over students.
+    """
+    count = len(values)
+    order = np.lexsort((-values, groups))
+    sorted_groups, sorted_values = groups[order], values[order]
+    positions = np.arange(count)
+    group_start = np.ones(count, dtype=bool)
+    group_start[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    tie_start = group_start.copy()
+    tie_start[1:] |= sorted_values[1:] != sorted_values[:-1]
+    first_in_group = np.maximum.accumulate(np.where(group_start, positions, 0))
+    first_in_tie = np.maximum.accumulate(np.where(tie_start, positions, 0))
+    ranks = np.empty(count, dtype=int)
+    ranks[order] = first_in_tie - first_in_group + 1
+    return ranks
+
+
+def _fetch(exam, sections=None):
+    # By the section recorded on the mark: the students may have moved on
+    # to another class or section since.
+    rows = ExamMark.objects.filter(paper__exam=exam)
+    if sections is not None:
+        rows = rows.filter(section__in=sections)
+    return rows.values_list("student_id", "section", "paper_id", "marks")
+
+
+def _section_results(papers, rows):
+    """
+    Per-section arrays for ``rows`` of ``(student_id, section, paper_id,
+    marks)``: totals, percentages, GPA, class rank and subject sums. Missing
+    marks count as zero towards totals and GPA and are left out of subject
+    averages.
+    """
+    if not rows:
+        return {}
+    paper_index = {paper.pk: position for position, paper in enumerate(papers)}
+    student_ids, sections, paper_ids, marks = zip(*rows)
+    student_ids = np.array(student_ids)
+    students, student_rows = np.unique(student_ids, return_inverse=True)
+    columns = np.array([paper_index[paper_id] for paper_id in paper_ids])
+
+    scores = np.full((len(students), len(papers)), np.nan)
+    scores[student_rows, columns] = np.array(marks, dtype=float)
+    max_marks = np.array([paper.max_marks for paper in papers], dtype=float)
+
+    student_sections = np.empty(len(students), dtype=object)
+    student_sections[student_rows] = sections
+    section_names, section_codes = np.unique(student_sections.astype(str), return_inverse=True)
+
+    totals = np.nansum(scores, axis=1)
+    percentages = 100 * totals / max_marks.sum()
+    gpa = grade_points(100 * scores / max_marks).mean(axis=1)
+    class_ranks = _competition_ranks(section_codes, totals)
+
+    recorded = ~np.isnan(scores)
+    subject_sums = np.zeros((len(section_names), len(papers)))
+    subject_counts = np.zeros((len(section_names), len(papers)))
+    np.add.at(subject_sums, section_codes, np.nan_to_num(scores))
+    np.add.at(subject_counts, section_codes, recorded)
+
+    results = {}
+    for code, section in enumerate(section_names):
+        members = section_codes == code
+        results[section] = {
+            "student_ids": students[members],
+            "totals": totals[members],
+            "percentages": percentages[members],
+            "gpa": gpa[members],
+            "class_ranks": class_ranks[members],
+            "subject_sums": subject_sums[code],
+            "subject_counts": subject_counts[code],
+        }
+    return results
+
+
+def _empty_section(paper_count):
+    return {
+        "student_ids": np.array([], dtype=int),
+        "totals": np.array([]),
+        "percentages": np.array([]),
+        "gpa": np.array([]),
+        "class_ranks": np.array([], dtype=int),
+        "subject_sums": np.zeros(paper_count),
+        "subject_counts": np.zeros(paper_count),
+    }
+
+
+def section_results(exam, papers):
+    """
+    ``{section: arrays}`` for every section with marks in the exam, from
+    the cache where possible. Sections missing from the cache are
+    recomputed together from one ``values_list`` query.
+    """
+    sections = cache.get(_sections_key(exam.pk))
+    if sections is None:
+        sections = sorted(
+            ExamMark.objects.filter(paper__exam=exam)
+            .order_by()
+            .values_list("section", flat=True)
+            .distinct()
+        )
+        cache.set(_sections_key(exam.pk), sections, _timeout())
+
+    keys = {_section_key(exam.pk, section): section for section in sections}
+    cached = cache.get_many(keys)
+    results = {keys[key]: value for key, value in cached.items()}
+    stale = [section for section in sections if section not in results]
+    if stale:
+        fresh = _section_results(papers, list(_fetch(exam, None if len(stale) == len(sections) else stale)))
+        for section in stale:
+            results[section] = fresh.get(section) or _empty_section(len(papers))
+        cache.set_many(
+            {_section_key(exam.pk, section): results[section] for section in stale}, _timeout()
+        )
+    return results
+
+
+def standings(sections):
+    """
+    ``{student_id: figures}`` for everyone in ``sections`` (as returned by
+    :func:`section_results`): section, total, percentage, GPA, letter grade,
+    class (section) rank, grade rank and percentile. Grade-wide figures are
+    merged from the section arrays without touching the database.
+    """
+    names = sorted(sections)
+
+    def merged(field):
+        return np.concatenate([sections[name][field] for name in names] or [[]])
+
+    student_ids = merged("student_ids").astype(int)
+    totals = merged("totals")
+    percentages, gpa, class_ranks = merged("percentages"), merged("gpa"), merged("class_ranks")
+    section_of = np.concatenate([[name] * len(sections[name]["totals"]) for name in names] or [[]])
+    count = len(totals)
+    if not count:
+        return {}
+
+    grade_ranks = _competition_ranks(np.zeros(count, dtype=int), totals)
+    ordered = np.sort(totals)
+    below = np.searchsorted(ordered, totals, side="left")
+    equal = np.searchsorted(ordered, totals, side="right") - below
+    percentiles = 100 * (below + 0.5 * equal) / count
+    letters = np.array(GRADE_LETTERS)[np.digitize(percentages, GRADE_BANDS)]
+    section_sizes = {name: len(sections[name]["totals"]) for name in names}
+
+    return {
+        student_id: {
+            "section": str(section_of[index]),
+            "section_size": section_sizes[section_of[index]],
+            "grade_size": count,
+            "total": round(float(totals[index]), 2),
+            "percentage": round(float(percentages[index]), 1),
+            "gpa": round(float(gpa[index]), 2),
+            "letter": str(letters[index]),
+            "class_rank": int(class_ranks[index]),
+            "grade_rank": int(grade_ranks[index]),
+            "percentile": round(float(percentiles[index]), 1),
+        }
+        for index, student_id in enumerate(student_ids.tolist())
+    }
+
+
+def subject_averages(sections, papers):
+    """
+    Average mark of every paper across the grade and within each section.
+    """
+    names = sorted(sections)
+    sums = np.array([sections[name]["subject_sums"] for name in names]).reshape(len(names), len(papers))
+    counts = np.array([sections[name]["subject_counts"] for name in names]).reshape(len(names), len(papers))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        grade_means = sums.sum(axis=0) / counts.sum(axis=0)
+        section_means = sums / counts
+    return [
+        {
+            "paper": paper,
+            "average": None if np.isnan(grade_means[column]) else round(float(grade_means[column]), 1),
+            "sections": {
+                name: None if np.isnan(section_means[code, column]) else round(float(section_means[code, column]), 1)
+                for code, name in enumerate(names)
+            },
+        }
+        for column, paper in enumerate(papers)
+    ]
+
+
+def gradebook(exam):
+    """
+    :func:`standings` for every student, best first, and the
+    :func:`subject_averages` of ``exam``.
+    """
+    papers = list(exam.papers.all())
+    sections = section_results(exam, papers)
+    results = standings(sections)
+    students = Student.objects.only("pk", "first_name", "last_name", "student_id").in_bulk(list(results))
+    rows = [
+        dict(figures, student=students[student_id])
+        for student_id, figures in results.items()
+        if student_id in students
+    ]
+    rows.sort(key=lambda row: (row["grade_rank"], row["student"].last_name))
+    return {
+        "students": rows,
+        "subjects": subject_averages(sections, papers),
+        "sections": sorted(sections),
+    }
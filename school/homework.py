@@ -0,0 +1,192 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from student.models import Student
+from . import metrics, notifications
+from .models import Homework, HomeworkSubmission
+
+
+DEFAULT_REMINDER_DAYS = 2
+# Open homework is still waiting for submissions; in_review and completed
+# work can no longer become overdue.
+OPEN_STATUS = "assigned"
+# Re-running the job on the same day must not repeat a reminder.
+REMINDER_DEDUPE_WINDOW = 20 * 60 * 60
+
+
+def mark_overdue(today=None):
+    """
+    Move open homework whose due date has passed to ``overdue`` with a
+    single UPDATE over the (status, due_date) index. Returns the number of
+    rows changed.
+    """
+    today = today or timezone.localdate()
+    changed = Homework.objects.filter(status=OPEN_STATUS, due_date__lt=today).update(status="overdue")
+    if changed:
+        # update() sends no post_save.
+        metrics.invalidate("homework")
+    return changed
+
+
+def due_soon(today=None, days=None):
+    today = today or timezone.localdate()
+    if days is None:
+        days = getattr(settings, "HOMEWORK_REMINDER_DAYS", DEFAULT_REMINDER_DAYS)
+    return Homework.objects.filter(
+        status=OPEN_STATUS, due_date__gte=today, due_date__lte=today + timedelta(days=days)
+    ).order_by("due_date")
+
+
+def _reminder(items):
+    listed = ", ".join(f"{item.title} ({item.class_name}, {item.due_date:%b %d})" for item in items)
+    message = f"Homework due soon: {listed}"
+    return message if len(message) <= 255 else message[:252] + "..."
+
+
+def send_reminders(today=None, days=None):
+    """
+    Queue one digest notification per teacher listing their open homework
+    due within ``days`` days. All digests go out through one batched
+    notify_many call. Returns the number of notifications created.
+    """
+    per_teacher = defaultdict(list)
+    for item in due_soon(today, days).only("teacher_id", "title", "class_name", "due_date"):
+        per_teacher[item.teacher_id].append(item)
+    return notifications.notify_many(
+        ((teacher_id, _reminder(items)) for teacher_id, items in per_teacher.items()),
+        dedupe_window=REMINDER_DEDUPE_WINDOW,
+    )
+
+
+# -------------------------------
+# Per-student submissions
+# -------------------------------
+SUBMISSION_STATUSES = dict(HomeworkSubmission.STATUS_CHOICES)
+# Submission status -> the Homework counter it is counted in.
+COUNTERS = {
+    "submitted": "completed_count",
+    "pending": "pending_count",
+}
+
+
+def class_students(class_name):
+    """
+    Students a homework ``class_name`` is assigned to: a whole class
+    ("Grade 9") or one section of it ("Grade 9 B").
+    """
+    matches = Q(student_class=class_name)
+    if " " in class_name:
+        student_class, section = class_name.rsplit(" ", 1)
+        matches |= Q(student_class=student_class, section=section)
+    return Student.objects.active().filter(matches)
+
+
+def assign(homework):
+    """
+    Create a pending submission for every student in the homework's class
+    with one ``bulk_create`` and count them in ``pending_count``. Students
+    who already have a submission are skipped. Returns the pending count.
+    """
+    student_ids = class_students(homework.class_name).values_list("pk", flat=True)
+    with transaction.atomic():
+        HomeworkSubmission.objects.bulk_create(
+            [HomeworkSubmission(homework=homework, student_id=pk) for pk in student_ids],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts leaves no way to tell skipped rows apart, so the
+        # counter is set from the table once.
+        pending = homework.submissions.filter(status="pending").count()
+        Homework.objects.filter(pk=homework.pk).update(pending_count=pending)
+    homework.pending_count = pending
+    return pending
+
+
+def update_statuses(changes, homework_ids=None):
+    """
+    Apply ``{(homework_id, student_id): status}`` from the grid. Changed
+    rows are written with one ``bulk_update`` and each homework's counters
+    move by the net change with an ``F()`` UPDATE, so concurrent edits never
+    need a recount. ``homework_ids`` restricts which homework may change.
+    Returns the number of submissions changed.
+    """
+    changes = {key: status for key, status in changes.items() if status in SUBMISSION_STATUSES}
+    if homework_ids is not None:
+        changes = {key: status for key, status in changes.items() if key[0] in homework_ids}
+    if not changes:
+        return 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Locking the rows makes the old status, and so the delta, exact.
+        rows = HomeworkSubmission.objects.select_for_update().filter(
+            homework_id__in={homework_id for homework_id, _ in changes},
+            student_id__in={student_id for _, student_id in changes},
+        )
+        changed, deltas = [], defaultdict(Counter)
+        for row in rows:
+            status = changes.get((row.homework_id, row.student_id))
+            if status is None or status == row.status:
+                continue
+            if row.status in COUNTERS:
+                deltas[row.homework_id][COUNTERS[row.status]] -= 1
+            if status in COUNTERS:
+                deltas[row.homework_id][COUNTERS[status]] += 1
+            row.status = status
+            row.submitted_at = now if status == "submitted" else None
+            row.updated_at = now
+            changed.append(row)
+
+        HomeworkSubmission.objects.bulk_update(changed, ["status", "submitted_at", "updated_at"])
+        for homework_id, delta in deltas.items():
+            Homework.objects.filter(pk=homework_id).update(
+                **{field: F(field) + amount for field, amount in delta.items() if amount}
+            )
+    if changed:
+        metrics.invalidate("homework")
+    return len(changed)
+
+
+def outstanding_for(student):
+    """
+    The student's pending homework, soonest first (student, status index).
+    """
+    return (
+        HomeworkSubmission.objects.filter(student=student, status="pending")
+        .select_related("homework")
+        .order_by("homework__due_date")
+    )
+
+
+def completion_rate(class_name):
+    """
+    Percentage of a class's (or section's) non-excused submissions that
+    were handed in, found through the student class/section index.
+    """
+    counts = HomeworkSubmission.objects.filter(
+        student__in=class_students(class_name).values("pk")
+    ).aggregate(
+        submitted=Count("pk", filter=Q(status="submitted")),
+        expected=Count("pk", filter=~Q(status="excused")),
+    )
+    if not counts["expected"]:
+        return 0
+    return round(100 * counts["submitted"] / counts["expected"], 1)
+
+
+def matrix(homework_items, students):
+    """
+    ``{student_id: {homework_id: status}}`` for the grid, in one query.
+    """
+    cells = defaultdict(dict)
+    rows = HomeworkSubmission.objects.filter(
+        homework__in=homework_items, student__in=students
+    ).values_list("student_id", "homework_id", "status")
+    for student_id, homework_id, status in rows:
+        cells[student_id][homework_id] = status
+    return cells
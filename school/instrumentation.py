@@ -0,0 +1,197 @@
+"""
+Per-request cost accounting: queries and database time (through a
+database execute wrapper), template render time (through the template
+backend) and cache hits (through the cache backend), collected for the
+request being served by ``school.middleware.RequestInstrumentationMiddleware``.
+
+Outside an instrumented request every hook is a single context variable
+lookup.
+"""
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends import django as django_backend
+
+
+_current = ContextVar("request_stats", default=None)
+_missing = object()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:[^()]+)\)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def sql_shape(sql):
+    """
+    The statement with literals and ``IN`` lists folded, so that queries
+    differing only in their values count as the same shape.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _NUMBER.sub("?", sql.replace("%s", "?"))
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        # shape -> [executions, seconds]
+        self.shapes = {}
+        self.template_time = 0.0
+        self._template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        shape = sql_shape(sql)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            self.shapes[shape] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def repeated(self, minimum):
+        """
+        ``(shape, executions, seconds)`` for shapes run at least ``minimum``
+        times, most frequent first: the usual sign of an N+1 loop.
+        """
+        return sorted(
+            ((shape, count, seconds) for shape, (count, seconds) in self.shapes.items() if count >= minimum),
+            key=lambda item: (-item[1], -item[2]),
+        )
+
+    def slowest(self, limit):
+        """
+        ``(shape, executions, seconds)`` for the ``limit`` shapes with the
+        most database time.
+        """
+        return sorted(
+            ((shape, count, seconds) for shape, (count, seconds) in self.shapes.items()),
+            key=lambda item: -item[2],
+        )[:limit]
+
+
+def start():
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def stop():
+    # Not reset with a token: streamed responses finish in another context.
+    _current.set(None)
+
+
+def activate(stats):
+    _current.set(stats)
+
+
+# -------------------------------
+# Database
+# -------------------------------
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def _instrument_connection(sender, connection, **kwargs):
+    # Connection objects are reused when they reconnect.
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+# -------------------------------
+# Templates
+# -------------------------------
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        # Nested renders are part of the outer one; queries run lazily from
+        # the template are already counted as database time.
+        stats._template_depth += 1
+        started, db_before = time.perf_counter(), stats.db_time
+        try:
+            return super().render(context, request)
+        finally:
+            stats._template_depth -= 1
+            if not stats._template_depth:
+                stats.template_time += time.perf_counter() - started - (stats.db_time - db_before)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    The stock Django template backend, timing each render.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+
+# -------------------------------
+# Cache
+# -------------------------------
+class CacheStatsMixin:
+    """
+    Counts hits and misses of ``get``/``get_many`` (and so ``get_or_set``
+    and the async variants, which go through them).
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        stats = _current.get()
+        if stats is not None:
+            if value is _missing:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        stats = _current.get()
+        if stats is None:
+            return super().get_many(keys, version)
+        keys = list(keys)
+        # Backends without a native get_many (locmem) loop over get().
+        _current.set(None)
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            _current.set(stats)
+        stats.cache_hits += len(found)
+        stats.cache_misses += len(keys) - len(found)
+        return found
+
+
+class InstrumentedLocMemCache(CacheStatsMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(CacheStatsMixin, RedisCache):
+    pass
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from home_auth.models import CustomUser
+from school.models import TeacherProfile
+
+
+class Command(BaseCommand):
+    help = "Create missing TeacherProfile rows for every teacher account."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Profiles inserted per query (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        # Anti-join: teachers with no profile row.
+        missing = CustomUser.objects.filter(
+            is_teacher=True, teacherprofile__isnull=True
+        ).values_list("pk", flat=True)
+        profiles = [TeacherProfile(user_id=pk) for pk in missing]
+        TeacherProfile.objects.bulk_create(
+            profiles, batch_size=options["batch_size"], ignore_conflicts=True
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {len(profiles)} teacher profiles."))
@@ -0,0 +1,130 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from school import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every page in Home/urls.py against seeded test databases and report latency "
+        "percentiles, query counts and peak memory; optionally fail on regressions against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000",
+            help="Comma separated numbers of students to seed, e.g. 1000,10000,100000 (default: 1000)",
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Timed requests per URL (default: 20)")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per URL first (default: 2)")
+        parser.add_argument("--only", action="append", help="Only this URL name (repeatable)")
+        parser.add_argument("--seed", type=int, default=1, help="Seed for the demo data (default: 1)")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--baseline", help="Compare against this JSON file and fail on regressions")
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Overwrite the --baseline file with these results instead of comparing",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=25,
+            help="Allowed p90 latency and peak memory growth over the baseline, in percent (default: 25)",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Reuse the test database between runs instead of recreating it",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options["sizes"].split(",") if size.strip()})
+        except ValueError:
+            raise CommandError("--sizes must be a comma separated list of numbers.")
+        if not sizes or min(sizes) < 1:
+            raise CommandError("--sizes needs at least one positive number.")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("--save-baseline needs --baseline.")
+
+        baseline = None
+        if options["baseline"] and not options["save_baseline"]:
+            try:
+                with open(options["baseline"]) as handle:
+                    baseline = json.load(handle)["results"]
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        # Never benchmark against the real database: the seeder writes to it.
+        creation = connection.creation
+        old_name = connection.settings_dict["NAME"]
+        creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"], serialize=False)
+        results, skipped, failed = {}, {}, {}
+        try:
+            for size in sizes:
+                self.stdout.write(f"{size} students:")
+                started = time.monotonic()
+                results[str(size)], skipped, failures = benchmark.run_size(
+                    size,
+                    options["repeat"],
+                    options["warmup"],
+                    seed_value=options["seed"],
+                    only=options["only"],
+                    log=self.stdout.write,
+                )
+                if failures:
+                    failed[str(size)] = failures
+                self.stdout.write(f"  done in {time.monotonic() - started:.1f}s")
+        finally:
+            creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        for name, reason in sorted(skipped.items()):
+            self.stdout.write(f"Skipped {name}: {reason}")
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "results": results,
+            "skipped": skipped,
+            "failed": failed,
+        }
+        paths = [options["output"]] if options["output"] else []
+        # Never make a run with failing pages the new baseline.
+        if options["save_baseline"] and not failed:
+            paths.append(options["baseline"])
+        for path in paths:
+            with open(path, "w") as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote {path}")
+
+        errors = [
+            f"{size} students, {name}: status {result['status']} from {result['path']}"
+            for size, failures in failed.items()
+            for name, result in sorted(failures.items())
+        ]
+        if errors:
+            raise CommandError(f"{len(errors)} page(s) failed and were not timed:\n  " + "\n  ".join(errors))
+
+        if baseline is not None:
+            regressions = benchmark.compare(results, baseline, options["threshold"])
+            if regressions:
+                raise CommandError(
+                    f"{len(regressions)} regression(s) against {options['baseline']}:\n  "
+                    + "\n  ".join(regressions)
+                )
+            self.stdout.write(f"No regressions against {options['baseline']}.")
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from school import conflicts
+
+
+class Command(BaseCommand):
+    help = "Report overlapping class sessions, or install the PostgreSQL constraints that prevent them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day to check (default: today)")
+        parser.add_argument("--end", type=date.fromisoformat, help="Day after the last one to check (default: start + 1 year)")
+        parser.add_argument(
+            "--install-constraints",
+            action="store_true",
+            help="Add the exclusion constraints migration 0008 skipped (PostgreSQL only)",
+        )
+
+    def handle(self, *args, **options):
+        if options["install_constraints"]:
+            if conflicts.constraints_installed():
+                self.stdout.write("Exclusion constraints are already installed.")
+                return
+            try:
+                conflicts.install_constraints()
+            except Exception as exc:
+                raise CommandError(f"Could not install the constraints: {exc}")
+            self.stdout.write(self.style.SUCCESS("Exclusion constraints installed."))
+            return
+
+        start = options["start"] or timezone.localdate()
+        end = options["end"] or start + timedelta(days=366)
+        found = conflicts.term_conflicts(start, end)
+        for conflict in found:
+            first = conflict.first
+            self.stdout.write(
+                f"#{first['id']} {first['class_name']} on {first['date']} "
+                f"{first['start_time']:%H:%M}-{first['end_time']:%H:%M}: {conflicts.describe(conflict)}"
+            )
+        self.stdout.write(f"{len(found)} conflicts between {start} and {end}.")
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from school import report_cards
+from school.models import Exam, ReportCardBatch
+
+
+class Command(BaseCommand):
+    help = "Render report card PDFs for every student who sat an exam, plus a zip of all of them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam", type=int, help="Exam id")
+        parser.add_argument("--section", default="", help="Only this section of the exam's grade")
+        parser.add_argument(
+            "--processes",
+            type=int,
+            help="Worker processes (default: REPORT_CARD_PROCESSES, 0 = render in this process)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(pk=options["exam"])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam']} does not exist.")
+
+        batch = ReportCardBatch.objects.create(exam=exam, section=options["section"])
+        started = time.monotonic()
+        written = report_cards.generate(batch, processes=options["processes"])
+        batch.refresh_from_db()
+        self.stdout.write(f"Archive: {batch.archive}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Rendered {written} report cards in {time.monotonic() - started:.1f}s.")
+        )
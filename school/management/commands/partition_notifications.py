@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "PostgreSQL only: convert the notification table to monthly range "
+        "partitions on created_at, or create upcoming monthly partitions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Rebuild the existing table as a partitioned table (locks it while copying)",
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Future monthly partitions to keep ready (default: 3)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options["convert"]:
+                created = retention.convert_to_partitioned(options["months_ahead"])
+                self.stdout.write(self.style.SUCCESS(f"Notification table partitioned ({created} monthly partitions)."))
+                return
+            if not retention.is_partitioned():
+                raise CommandError("The notification table is not partitioned; run with --convert first.")
+            created = retention.ensure_partitions(options["months_ahead"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Created {created} monthly partitions."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from school import retention
+
+
+class Command(BaseCommand):
+    help = "Delete expired notifications in small batches, optionally archiving them first."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Rows deleted per transaction (default: NOTIFICATION_PRUNE_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--archive",
+            help="Append pruned rows to this JSON Lines file before deleting them",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches to reduce load (default: 0)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many notifications have expired",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = retention.expired_notifications().count()
+            self.stdout.write(f"{count} notifications have expired.")
+            return
+
+        if options["archive"]:
+            with open(options["archive"], "a", encoding="utf-8") as archive:
+                removed = retention.prune_notifications(
+                    batch_size=options["batch_size"], archive=archive, pause=options["pause"]
+                )
+        else:
+            removed = retention.prune_notifications(
+                batch_size=options["batch_size"], pause=options["pause"]
+            )
+        self.stdout.write(self.style.SUCCESS(f"Pruned {removed} notifications."))
@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from school import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily and weekly schedule roll-ups from the class sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (default: all history)")
+        parser.add_argument("--end", type=date.fromisoformat, help="Day after the last one to rebuild")
+
+    def handle(self, *args, **options):
+        written = rollups.rebuild(start=options["start"], end=options["end"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} roll-up rows."))
@@ -1,19 +1,44 @@
+import multiprocessing
 import random
-import string
-from datetime import date, time, timedelta
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import time, timedelta
 
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q
 from django.utils import timezone
-from django.utils.text import slugify
 
 from home_auth.models import CustomUser
-from school.models import ClassSchedule, Homework, TeacherProfile
+from school import demo_data, metrics, notifications, rollups
+from school import homework as homework_service
+from school.models import ClassSchedule, Homework, Notification, TeacherProfile
 from student.models import Parent, Student
 
 
+DEMO_PASSWORD = "demoPass123"
+SUBJECTS = [
+    "Mathematics",
+    "English",
+    "Physics",
+    "Chemistry",
+    "Biology",
+    "History",
+    "Geography",
+    "Computer Science",
+]
+# One-hour sessions from 08:00; with one class per grade in a slot, no
+# teacher or class is ever double booked.
+SLOTS_PER_DAY = 8
+FIRST_HOUR = 8
+# Sessions start this many days in the past so dashboards have history.
+HISTORY_DAYS = 30
+
+
 class Command(BaseCommand):
-    help = "Populate the database with demo teachers, students, schedules and homework."
+    help = "Populate the database with demo teachers, students, schedules, homework and notifications."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -28,291 +53,287 @@ class Command(BaseCommand):
             default=100,
             help="Number of students to seed (default: 100)",
         )
+        parser.add_argument(
+            "--schedules",
+            type=int,
+            default=3,
+            help="Class sessions per teacher (default: 3)",
+        )
+        parser.add_argument(
+            "--homework",
+            type=int,
+            default=2,
+            help="Homework assignments per teacher (default: 2)",
+        )
+        parser.add_argument(
+            "--notifications",
+            type=int,
+            default=0,
+            help="Notifications created for every teacher and admin (default: 0)",
+        )
+        parser.add_argument(
+            "--submissions",
+            action="store_true",
+            help="Assign new homework to every student of its class (one row per student)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Random seed; the same seed, counts and day reproduce the same data",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per INSERT (default: 5000)",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=0,
+            help="Worker processes generating student rows (default: 0, generate inline)",
+        )
 
     def handle(self, *args, **options):
-        target_teachers = options["teachers"]
-        target_students = options["students"]
+        self.seed = options["seed"] if options["seed"] is not None else random.randrange(2**31)
+        self.rng = demo_data.chunk_random(self.seed, "main")
+        self.batch_size = options["batch_size"]
+        self.today = timezone.localdate()
+        self.stdout.write(f"Using seed {self.seed}.")
 
         with transaction.atomic():
-            teachers = self._seed_teachers(target_teachers)
-            self._seed_students(target_students)
-            self._seed_schedules_and_homework(teachers)
+            teachers = self._seed_teachers(options["teachers"])
+            self._seed_students(options["students"], options["processes"])
+            self._seed_schedules(teachers, options["schedules"])
+            self._seed_homework(teachers, options["homework"], options["submissions"])
+            self._seed_notifications(options["notifications"])
+            # Rows were inserted with explicit primary keys.
+            self._reset_sequences(CustomUser, Parent, Student)
 
+        # bulk_create sends no signals, so the derived data is rebuilt here.
+        rollups.rebuild()
+        metrics.invalidate("students", "teachers", "schedules", "homework")
         self.stdout.write(self.style.SUCCESS("Demo data seeded successfully."))
 
+    def _next_pk(self, *models):
+        return max((model.objects.aggregate(top=Max("pk"))["top"] or 0) for model in models) + 1
+
+    def _reset_sequences(self, *models):
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
     # -------------------------------
     # Teacher helpers
     # -------------------------------
     def _seed_teachers(self, target):
-        existing = list(CustomUser.objects.filter(is_teacher=True, is_admin=False))
-        if len(existing) >= target:
-            self.stdout.write(f"Already have {len(existing)} teachers. Skipping creation.")
-            for teacher in existing:
-                TeacherProfile.objects.get_or_create(user=teacher)
-            return existing
-
-        templates = [
-            ("Aisha", "Shrestha", "Science", "Physics"),
-            ("Bikash", "Adhikari", "Mathematics", "Calculus"),
-            ("Pratima", "Koirala", "Languages", "English"),
-            ("Suresh", "Maharjan", "Humanities", "History"),
-            ("Nisha", "Gurung", "Computer Science", "Programming"),
-            ("Kamal", "Thapa", "Science", "Biology"),
-            ("Ritika", "Rai", "Mathematics", "Algebra"),
-            ("Ganesh", "Bhattarai", "Languages", "Nepali"),
-            ("Sunita", "Bista", "Humanities", "Civics"),
-            ("Pawan", "Basnet", "Computer Science", "Robotics"),
-        ]
-
-        password = "demoPass123"
-        created_teachers = []
-        for idx in range(target - len(existing)):
-            first, last, department, subject = templates[idx % len(templates)]
-            serial = len(existing) + idx + 1
-            email = f"{slugify(first)}.{slugify(last)}{serial}@sms-nepal.edu"
-            user, created = CustomUser.objects.get_or_create(
-                username=email,
-                defaults=dict(
-                    email=email,
-                    first_name=first,
-                    last_name=last,
-                    is_teacher=True,
-                    is_admin=False,
-                ),
-            )
-            if created:
-                user.set_password(password)
-                user.save()
-
-            profile, _ = TeacherProfile.objects.get_or_create(user=user)
-            profile.title = "Subject Teacher"
-            profile.department = department
-            profile.subject_specialty = subject
-            profile.experience_years = random.randint(3, 15)
-            profile.phone = self._random_nepali_phone()
-            profile.bio = (
-                f"{first} {last} has been inspiring students across Nepal through "
-                f"engaging {subject.lower()} lessons."
-            )
-            profile.save()
-            created_teachers.append(user)
+        existing = CustomUser.objects.filter(is_teacher=True, is_admin=False).count()
+        if existing >= target:
+            self.stdout.write(f"Already have {existing} teachers. Skipping creation.")
+        else:
+            # PBKDF2 once; every demo account shares the hash.
+            password = make_password(DEMO_PASSWORD)
+            first_pk = self._next_pk(CustomUser)
+            users, profiles = [], []
+            for offset in range(target - existing):
+                first, last, department, subject = demo_data.TEACHER_TEMPLATES[
+                    offset % len(demo_data.TEACHER_TEMPLATES)
+                ]
+                pk = first_pk + offset
+                email = f"{demo_data.slug(first)}.{demo_data.slug(last)}{pk}@sms-nepal.edu"
+                users.append(CustomUser(
+                    pk=pk, username=email, email=email, password=password,
+                    first_name=first, last_name=last, is_teacher=True, is_admin=False,
+                ))
+                profiles.append(TeacherProfile(
+                    user_id=pk,
+                    title="Subject Teacher",
+                    department=department,
+                    subject_specialty=subject,
+                    experience_years=self.rng.randint(3, 15),
+                    phone=demo_data.phone(self.rng),
+                    bio=(
+                        f"{first} {last} has been inspiring students across Nepal through "
+                        f"engaging {subject.lower()} lessons."
+                    ),
+                ))
+            CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+            TeacherProfile.objects.bulk_create(profiles, batch_size=self.batch_size, ignore_conflicts=True)
+            self.stdout.write(f"Created {len(users)} teacher accounts.")
 
-        self.stdout.write(f"Created {len(created_teachers)} teacher accounts.")
-        return list(CustomUser.objects.filter(is_teacher=True, is_admin=False))
+        # Teachers seeded by hand may still lack a profile.
+        TeacherProfile.objects.bulk_create(
+            [
+                TeacherProfile(user_id=pk)
+                for pk in CustomUser.objects.filter(is_teacher=True, teacherprofile__isnull=True)
+                .values_list("pk", flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+        return list(
+            CustomUser.objects.filter(is_teacher=True, is_admin=False)
+            .select_related("teacherprofile")
+            .order_by("pk")
+        )
 
     # -------------------------------
     # Student helpers
     # -------------------------------
-    def _seed_students(self, target):
+    def _student_chunks(self, needed, first_pk, processes):
+        size = demo_data.CHUNK_SIZE
+        tasks = [
+            (self.seed, index, first_pk + start, min(size, needed - start), self.today.toordinal(), self.today.year)
+            for index, start in enumerate(range(0, needed, size))
+        ]
+        if processes <= 0:
+            for task in tasks:
+                yield demo_data.student_chunk(*task)
+            return
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            # map() keeps chunk order, so primary keys do not depend on timing.
+            yield from pool.map(demo_data.student_chunk, *zip(*tasks))
+
+    def _seed_students(self, target, processes):
         current = Student.objects.count()
         if current >= target:
             self.stdout.write(f"Already have {current} students. Skipping student creation.")
             return
 
-        male_names = [
-            "Aarav",
-            "Sushan",
-            "Bibek",
-            "Prabesh",
-            "Rohan",
-            "Bijay",
-            "Kiran",
-            "Pratik",
-            "Sudip",
-            "Roshan",
-        ]
-        female_names = [
-            "Aditi",
-            "Sanjana",
-            "Nitika",
-            "Smriti",
-            "Anu",
-            "Bhawana",
-            "Isha",
-            "Kabita",
-            "Reema",
-            "Diya",
-        ]
-        surnames = [
-            "Shrestha",
-            "Gurung",
-            "Khadka",
-            "Magar",
-            "Rai",
-            "Thapa",
-            "Poudel",
-            "Bhattarai",
-            "KC",
-            "Basnet",
-        ]
-
-        father_names = [
-            "Hari Bahadur",
-            "Madan Prasad",
-            "Dinesh Kumar",
-            "Ramchandra",
-            "Laxman",
-            "Parmanand",
-            "Kishor",
-            "Mahesh",
-            "Ramesh",
-            "Krishna",
-        ]
-        mother_names = [
-            "Laxmi",
-            "Goma",
-            "Radha",
-            "Saraswati",
-            "Mina",
-            "Sita",
-            "Kamala",
-            "Parbati",
-            "Sarita",
-            "Gita",
-        ]
-        districts = [
-            "Kathmandu",
-            "Lalitpur",
-            "Bhaktapur",
-            "Pokhara",
-            "Chitwan",
-            "Biratnagar",
-            "Dharan",
-            "Butwal",
-            "Hetauda",
-            "Janakpur",
-        ]
-
-        genders = ["Male", "Female"]
-        religions = ["Hindu", "Buddhist", "Christian", "Muslim"]
-        classes = [f"Grade {i}" for i in range(1, 13)]
-        sections = list(string.ascii_uppercase[:5])  # A-E
-
         needed = target - current
-        for idx in range(needed):
-            gender = random.choice(genders)
-            if gender == "Male":
-                first_name = random.choice(male_names)
-            else:
-                first_name = random.choice(female_names)
-            last_name = random.choice(surnames)
-
-            father = random.choice(father_names) + f" {random.choice(surnames)}"
-            mother = random.choice(mother_names) + f" {random.choice(surnames)}"
-            district = random.choice(districts)
-
-            dob = date(
-                random.randint(2008, 2016),
-                random.randint(1, 12),
-                random.randint(1, 28),
+        first_pk = self._next_pk(Parent, Student)
+        written = 0
+        for chunk in self._student_chunks(needed, first_pk, processes):
+            Parent.objects.bulk_create(
+                [Parent(**parent) for parent, _ in chunk], batch_size=self.batch_size
             )
-            joining_date = timezone.now().date() - timedelta(days=random.randint(30, 900))
-            student_class = random.choice(classes)
-            section = random.choice(sections)
-
-            parent = Parent.objects.create(
-                father_name=father,
-                father_occupation=random.choice(
-                    ["Engineer", "Farmer", "Teacher", "Entrepreneur", "Civil Servant"]
-                ),
-                father_mobile=self._random_nepali_phone(),
-                father_email=self._random_email(father),
-                mother_name=mother,
-                mother_occupation=random.choice(
-                    ["Homemaker", "Nurse", "Lecturer", "Entrepreneur", "Banker"]
-                ),
-                mother_mobile=self._random_nepali_phone(),
-                mother_email=self._random_email(mother),
-                present_address=f"{district} - {random.randint(1, 30)}",
-                permanent_address=f"{district}, Nepal",
-            )
-
-            current_count = Student.objects.count() + 1
-            student_id = f"STD{timezone.now().year}{current_count:04d}"
-
-            Student.objects.create(
-                first_name=first_name,
-                last_name=last_name,
-                student_id=student_id,
-                gender=gender,
-                date_of_birth=dob,
-                student_class=student_class,
-                religion=random.choice(religions),
-                joining_date=joining_date,
-                mobile_number=self._random_nepali_phone(),
-                admission_number=f"ADM{timezone.now().year}{current_count:04d}",
-                section=section,
-                parent=parent,
+            Student.objects.bulk_create(
+                [Student(**student) for _, student in chunk], batch_size=self.batch_size
             )
-
+            written += len(chunk)
+            self.stdout.write(f"  {written}/{needed} students", ending="\r")
         self.stdout.write(f"Created {needed} student records.")
 
     # -------------------------------
     # Schedule & Homework helpers
     # -------------------------------
-    def _seed_schedules_and_homework(self, teachers):
-        subjects = [
-            "Mathematics",
-            "English",
-            "Physics",
-            "Chemistry",
-            "Biology",
-            "History",
-            "Geography",
-            "Computer Science",
-        ]
-        today = timezone.localdate()
+    def _subject(self, teacher):
+        profile = getattr(teacher, "teacherprofile", None)
+        return (profile and profile.subject_specialty) or self.rng.choice(SUBJECTS)
 
-        for teacher in teachers:
-            # Ensure profile exists
-            profile, _ = TeacherProfile.objects.get_or_create(user=teacher)
-            profile.department = profile.department or random.choice(
-                ["Science", "Mathematics", "Languages", "Humanities", "ICT"]
-            )
-            profile.subject_specialty = profile.subject_specialty or random.choice(subjects)
-            profile.phone = profile.phone or self._random_nepali_phone()
-            profile.save()
+    def _seed_schedules(self, teachers, per_teacher):
+        """
+        Top every teacher up to ``per_teacher`` sessions. Each hour slot
+        holds at most one session per teacher and per grade, so the rows
+        satisfy the schedule exclusion constraints.
+        """
+        if not teachers or per_teacher <= 0:
+            return
+        existing = dict(
+            ClassSchedule.objects.filter(teacher__in=teachers)
+            .order_by()
+            .values_list("teacher_id")
+            .annotate(Count("id"))
+        )
+        remaining = {teacher.pk: max(0, per_teacher - existing.get(teacher.pk, 0)) for teacher in teachers}
+        by_pk = {teacher.pk: teacher for teacher in teachers}
+        per_slot = min(len(teachers), len(demo_data.CLASSES))
+        first_day = self.today - timedelta(days=HISTORY_DAYS)
+        latest = ClassSchedule.objects.aggregate(latest=Max("date"))["latest"]
+        if latest and latest >= first_day and any(remaining.values()):
+            # Start after every existing session so nothing can clash.
+            first_day = latest + timedelta(days=1)
 
-            existing_schedules = ClassSchedule.objects.filter(teacher=teacher).count()
-            to_create = max(0, 3 - existing_schedules)
-            for i in range(to_create):
-                ClassSchedule.objects.create(
+        schedules = []
+        queue = [pk for pk in by_pk if remaining[pk]]
+        slot = 0
+        while queue:
+            day = first_day + timedelta(days=slot // SLOTS_PER_DAY)
+            hour = FIRST_HOUR + slot % SLOTS_PER_DAY
+            for position, teacher_pk in enumerate(queue[:per_slot]):
+                teacher = by_pk[teacher_pk]
+                past = day < self.today
+                total = self.rng.randint(30, 45)
+                schedules.append(ClassSchedule(
                     teacher=teacher,
-                    date=today + timedelta(days=random.randint(1, 14)),
-                    start_time=time(hour=8 + i, minute=0),
-                    end_time=time(hour=9 + i, minute=0),
-                    class_name=f"Grade {random.randint(5, 12)}",
-                    topic=f"{profile.subject_specialty or random.choice(subjects)} - Lesson {i+1}",
-                    total_students=random.randint(30, 45),
-                    present_students=random.randint(25, 40),
-                    syllabus_coverage=random.randint(40, 95),
-                    status=random.choice(["scheduled", "completed"]),
+                    date=day,
+                    start_time=time(hour=hour),
+                    end_time=time(hour=hour + 1),
+                    class_name=demo_data.CLASSES[(slot + position) % len(demo_data.CLASSES)],
+                    topic=f"{self._subject(teacher)} - Lesson {per_teacher - remaining[teacher_pk] + 1}",
+                    total_students=total if past else 0,
+                    present_students=self.rng.randint(total - 10, total) if past else 0,
+                    syllabus_coverage=self.rng.randint(40, 95) if past else 0,
+                    status="completed" if past else "scheduled",
                     notes="Automatically generated through seed_demo_data.",
-                )
+                ))
+                remaining[teacher_pk] -= 1
+            # Rotate so every teacher gets slots at the same pace.
+            queue = [pk for pk in queue[per_slot:] + queue[:per_slot] if remaining[pk]]
+            slot += 1
+        ClassSchedule.objects.bulk_create(schedules, batch_size=self.batch_size)
+        self.stdout.write(f"Created {len(schedules)} class sessions.")
 
-            existing_homework = Homework.objects.filter(teacher=teacher).count()
-            to_create_hw = max(0, 2 - existing_homework)
-            for i in range(to_create_hw):
-                Homework.objects.create(
+    def _seed_homework(self, teachers, per_teacher, submissions):
+        if not teachers or per_teacher <= 0:
+            return
+        existing = dict(
+            Homework.objects.filter(teacher__in=teachers)
+            .order_by()
+            .values_list("teacher_id")
+            .annotate(Count("id"))
+        )
+        items = []
+        for teacher in teachers:
+            subject = self._subject(teacher)
+            for index in range(existing.get(teacher.pk, 0), per_teacher):
+                items.append(Homework(
                     teacher=teacher,
-                    title=f"{profile.subject_specialty or random.choice(subjects)} Assignment {i+1}",
-                    subject=profile.subject_specialty or random.choice(subjects),
-                    class_name=f"Grade {random.randint(5, 12)}",
+                    title=f"{subject} Assignment {index + 1}",
+                    subject=subject,
+                    class_name=self.rng.choice(demo_data.CLASSES),
                     description="Review classroom notes and prepare for next assessment.",
-                    due_date=today + timedelta(days=random.randint(3, 10)),
-                    status=random.choice(["assigned", "in_review", "completed"]),
-                    completed_count=random.randint(10, 30),
-                    pending_count=random.randint(5, 15),
-                )
-
-    # -------------------------------
-    # Utilities
-    # -------------------------------
-    def _random_nepali_phone(self):
-        prefix = random.choice(["981", "984", "985", "986", "974"])
-        return prefix + "".join(random.choices(string.digits, k=7))
-
-    def _random_email(self, full_name):
-        user = slugify(full_name.replace(" ", "."))
-        return f"{user}@example.com"
+                    due_date=self.today + timedelta(days=self.rng.randint(-5, 10)),
+                    status=self.rng.choice(["assigned", "in_review", "completed"]),
+                    completed_count=0 if submissions else self.rng.randint(10, 30),
+                    pending_count=0 if submissions else self.rng.randint(5, 15),
+                ))
+        items = Homework.objects.bulk_create(items, batch_size=self.batch_size)
+        if submissions:
+            for item in items:
+                homework_service.assign(item)
+        self.stdout.write(f"Created {len(items)} homework assignments.")
 
+    def _seed_notifications(self, per_user):
+        if per_user <= 0:
+            return
+        messages = [
+            "Staff meeting moved to 3 PM.",
+            "New homework submissions are waiting for review.",
+            "Attendance for today's sessions is due.",
+            "Term exam schedule has been published.",
+        ]
+        user_ids = list(
+            CustomUser.objects.filter(Q(is_teacher=True) | Q(is_admin=True), is_active=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        batch, created = [], 0
+        for user_id in user_ids:
+            for _ in range(per_user):
+                batch.append(Notification(
+                    id=uuid.UUID(int=self.rng.getrandbits(128), version=4),
+                    user_id=user_id,
+                    message=self.rng.choice(messages),
+                    is_read=self.rng.random() < 0.6,
+                ))
+                if len(batch) >= self.batch_size:
+                    Notification.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+        Notification.objects.bulk_create(batch)
+        created += len(batch)
+        notifications.forget_unread_counts(user_ids)
+        self.stdout.write(f"Created {created} notifications.")
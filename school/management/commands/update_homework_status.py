@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from school import homework
+
+
+class Command(BaseCommand):
+    help = "Mark past-due homework as overdue and remind teachers about homework due soon. Run daily."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Remind about homework due within this many days (default: HOMEWORK_REMINDER_DAYS)",
+        )
+        parser.add_argument(
+            "--no-reminders",
+            action="store_true",
+            help="Only update statuses",
+        )
+
+    def handle(self, *args, **options):
+        overdue = homework.mark_overdue()
+        self.stdout.write(f"{overdue} homework assignments are now overdue.")
+        if not options["no_reminders"]:
+            sent = homework.send_reminders(days=options["days"])
+            self.stdout.write(f"Sent {sent} due-soon reminders.")
+        self.stdout.write(self.style.SUCCESS("Homework statuses updated."))
@@ -0,0 +1,117 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from home_auth.models import CustomUser
+from student.models import Student
+from . import rollups
+from .models import ClassSchedule, Homework, TeacherProfile
+
+
+DEFAULT_TIMEOUT = 300
+
+
+def _version_key(group):
+    return f"dashboard:{group}:version"
+
+
+def _get_version(group):
+    key = _version_key(group)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version key that was evicted can never
+        # point back at data cached under an earlier version.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(*groups):
+    """
+    Bump the version of each group so its cached metrics are recomputed on
+    the next read. Old entries simply expire.
+    """
+    for group in groups:
+        try:
+            cache.incr(_version_key(group))
+        except ValueError:
+            cache.set(_version_key(group), int(time.time() * 1000), None)
+
+
+def _student_metrics():
+    return {
+        "student_count": Student.objects.active().count(),
+        "recent_students": list(
+            Student.objects.active().defer("search_vector").order_by("-joining_date")[:5]
+        ),
+    }
+
+
+def _teacher_metrics():
+    return {
+        "teacher_count": CustomUser.objects.filter(is_teacher=True).count(),
+        "teacher_profiles": list(
+            TeacherProfile.objects.select_related("user").order_by("-updated_at")[:5]
+        ),
+    }
+
+
+def _schedule_metrics():
+    today = timezone.localdate()
+    school = rollups.totals("school")
+    return {
+        "total_classes": school["sessions"],
+        "coverage": school["coverage"],
+        "attendance_rate": school["attendance_rate"],
+        "upcoming_classes": list(
+            ClassSchedule.objects.select_related("teacher")
+            .filter(date__gte=today)
+            .order_by("date", "start_time")[:5]
+        ),
+    }
+
+
+def _homework_metrics():
+    return {
+        "homework_queue": list(Homework.objects.order_by("-assigned_on")[:5]),
+    }
+
+
+GROUPS = {
+    "students": _student_metrics,
+    "teachers": _teacher_metrics,
+    "schedules": _schedule_metrics,
+    "homework": _homework_metrics,
+}
+
+
+def _data_key(group, version):
+    # "Upcoming" lists depend on the current date, so the day is part of the key.
+    return f"dashboard:{group}:v{version}:{timezone.localdate().isoformat()}"
+
+
+def get_dashboard_metrics(groups=None):
+    """
+    Return the merged metrics for ``groups`` (default: all), computing only
+    the groups whose cached entry is missing. Uses two cache round trips
+    when everything is warm.
+    """
+    groups = list(groups or GROUPS)
+    versions = cache.get_many([_version_key(group) for group in groups])
+    keys = {
+        group: _data_key(group, versions.get(_version_key(group)) or _get_version(group))
+        for group in groups
+    }
+    cached = cache.get_many(list(keys.values()))
+
+    metrics, fresh = {}, {}
+    for group, key in keys.items():
+        data = cached.get(key)
+        if data is None:
+            data = fresh[key] = GROUPS[group]()
+        metrics.update(data)
+    if fresh:
+        cache.set_many(fresh, getattr(settings, "DASHBOARD_CACHE_TIMEOUT", DEFAULT_TIMEOUT))
+    return metrics
@@ -0,0 +1,171 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import instrumentation, monitoring, profiling
+
+
+logger = logging.getLogger("school.requests")
+slow_logger = logging.getLogger("school.requests.slow")
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Counts the queries, database time, template render time and cache hits
+    of every request. They are sent back in a ``Server-Timing`` header
+    (visible in the browser's network panel), logged as one line per
+    request on ``school.requests``, and requests slower than
+    ``SLOW_REQUEST_THRESHOLD_MS`` are logged with their most expensive
+    queries on ``school.requests.slow``. Query shapes repeated at least
+    ``N_PLUS_ONE_THRESHOLD`` times in one request are logged as likely
+    N+1 loops. The same figures feed the Prometheus metrics (see
+    ``school.monitoring``).
+
+    Streamed responses are logged once the stream finishes; their header
+    only covers the work done before the first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_INSTRUMENTATION", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = getattr(settings, "SERVER_TIMING_HEADER", True)
+        self.slow_threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 500) / 1000
+        self.slow_queries = getattr(settings, "SLOW_REQUEST_TOP_QUERIES", 5)
+        self.n_plus_one = getattr(settings, "N_PLUS_ONE_THRESHOLD", 10)
+        self.metrics = monitoring.enabled()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = instrumentation.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.stop()
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = instrumentation.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.stop()
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        if self.header:
+            response["Server-Timing"] = self.server_timing(stats)
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._stream(request, response, stats, response.streaming_content)
+        else:
+            self.report(request, response, stats)
+        return response
+
+    def _stream(self, request, response, stats, content):
+        # An endless async stream (notifications) is never followed.
+        instrumentation.activate(stats)
+        try:
+            yield from content
+        finally:
+            instrumentation.stop()
+            self.report(request, response, stats)
+
+    def server_timing(self, stats):
+        return (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f"tpl;dur={stats.template_time * 1000:.1f}, "
+            f'cache;desc="{stats.cache_hits} hits {stats.cache_misses} misses", '
+            f"total;dur={stats.elapsed * 1000:.1f}"
+        )
+
+    def report(self, request, response, stats):
+        elapsed = stats.elapsed
+        if self.metrics:
+            monitoring.observe(request, response, stats)
+        match = request.resolver_match
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else "",
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 1),
+            "queries": stats.queries,
+            "db_ms": round(stats.db_time * 1000, 1),
+            "template_ms": round(stats.template_time * 1000, 1),
+            "cache_hits": stats.cache_hits,
+            "cache_misses": stats.cache_misses,
+        }
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                " ".join(f"{name}={value}" for name, value in fields.items()),
+                extra={"request_stats": fields},
+            )
+
+        for shape, count, seconds in stats.repeated(self.n_plus_one):
+            logger.warning(
+                "Possible N+1 in %s %s (%s): one query shape ran %d times, %.1f ms in total: %s",
+                request.method, request.path, fields["view"], count, seconds * 1000, shape,
+                extra={"request_stats": fields},
+            )
+
+        if elapsed >= self.slow_threshold:
+            lines = [
+                f"  {seconds * 1000:8.1f} ms  x{count:<4} {shape}"
+                for shape, count, seconds in stats.slowest(self.slow_queries)
+            ]
+            slow_logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries, %.1f ms in the database\n%s",
+                request.method, request.path, fields["view"], elapsed * 1000, stats.queries,
+                stats.db_time * 1000, "\n".join(lines),
+                extra={"request_stats": fields},
+            )
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests selected by an enabled ``ProfilingRule`` (see
+    ``school.profiling``); every other request goes straight through.
+    Needs ``request.user``, so it comes after AuthenticationMiddleware.
+
+    In an async chain the rules are re-read from a thread only when the
+    cached copy has expired, and the user is loaded only for rules that
+    name one.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rule = profiling.match(request)
+        if rule is None:
+            return self.get_response(request)
+        return profiling.profile(rule, request, self.get_response)
+
+    async def __acall__(self, request):
+        rules = profiling.cached_rules()
+        if rules is None:
+            rules = await sync_to_async(profiling.active_rules)()
+        user = None
+        if any(rule.user_id for rule in rules):
+            user = await request.auser()
+        rule = profiling.match(request, rules, user)
+        if rule is None:
+            return await self.get_response(request)
+        return await profiling.aprofile(rule, request, self.get_response)
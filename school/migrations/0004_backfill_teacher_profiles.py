@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def backfill_teacher_profiles(apps, schema_editor):
+    CustomUser = apps.get_model("home_auth", "CustomUser")
+    TeacherProfile = apps.get_model("school", "TeacherProfile")
+    missing = CustomUser.objects.filter(
+        is_teacher=True, teacherprofile__isnull=True
+    ).values_list("pk", flat=True)
+    TeacherProfile.objects.bulk_create(
+        [TeacherProfile(user_id=pk) for pk in missing],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home_auth', '0009_alter_passwordresetrequest_token'),
+        ('school', '0003_alter_classschedule_id_alter_homework_id_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_teacher_profiles, migrations.RunPython.noop),
+    ]
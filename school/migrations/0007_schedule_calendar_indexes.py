@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0006_notification_retention_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classschedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='classschedule',
+            index=models.Index(fields=['teacher', 'date', 'start_time'], name='schedule_teacher_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classschedule',
+            index=models.Index(fields=['class_name', 'date'], name='schedule_class_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='classschedule',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
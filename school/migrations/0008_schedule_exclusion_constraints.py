@@ -0,0 +1,63 @@
+import logging
+
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+TABLE = "school_classschedule"
+
+# constraint name -> column that must not be double booked
+CONSTRAINTS = {
+    "schedule_teacher_no_overlap": "teacher_id",
+    "schedule_class_no_overlap": "class_name",
+}
+
+SESSION_RANGE = 'tsrange("date" + "start_time", "date" + "end_time")'
+
+
+def add_exclusion_constraints(apps, schema_editor):
+    # Exclusion constraints are PostgreSQL only; elsewhere overlaps are
+    # caught by ClassSchedule.clean() and school.conflicts.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for column in CONSTRAINTS.values():
+            cursor.execute(
+                f'SELECT 1 FROM "{TABLE}" a JOIN "{TABLE}" b '
+                f'ON a."{column}" = b."{column}" AND a.id < b.id '
+                f"AND a.date = b.date AND a.start_time < b.end_time AND b.start_time < a.end_time "
+                f"WHERE a.status <> 'cancelled' AND b.status <> 'cancelled' LIMIT 1"
+            )
+            if cursor.fetchone():
+                logger.warning(
+                    "Skipped schedule exclusion constraints: overlapping sessions exist. "
+                    "Resolve them (manage.py find_schedule_conflicts) and run "
+                    "manage.py find_schedule_conflicts --install-constraints."
+                )
+                return
+    for name, column in CONSTRAINTS.items():
+        schema_editor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" EXCLUDE USING gist '
+            f'("{column}" WITH =, {SESSION_RANGE} WITH &&) '
+            f"WHERE (status <> 'cancelled')"
+        )
+
+
+def drop_exclusion_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in CONSTRAINTS:
+        schema_editor.execute(f'ALTER TABLE "{TABLE}" DROP CONSTRAINT IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0007_schedule_calendar_indexes'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(add_exclusion_constraints, drop_exclusion_constraints),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0008_schedule_exclusion_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRoster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_name', models.CharField(max_length=100)),
+                ('student_ids', models.BinaryField()),
+                ('digest', models.CharField(max_length=40, unique=True)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SessionAttendance',
+            fields=[
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance', serialize=False, to='school.classschedule')),
+                ('marks', models.BinaryField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('roster', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='school.attendanceroster')),
+            ],
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:21
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+SUM_FIELDS = ("sessions", "completed", "coverage_total", "present_total", "enrolled_total")
+
+
+def backfill_rollups(apps, schema_editor):
+    # Same grouping as school.rollups.rebuild(), against the historical models.
+    ClassSchedule = apps.get_model("school", "ClassSchedule")
+    ScheduleRollup = apps.get_model("school", "ScheduleRollup")
+    completed = Q(status="completed")
+    aggregates = {
+        "sessions": Count("id"),
+        "completed": Count("id", filter=completed),
+        "coverage_total": Coalesce(Sum("syllabus_coverage", filter=completed), 0),
+        "present_total": Coalesce(Sum("present_students"), 0),
+        "enrolled_total": Coalesce(Sum("total_students"), 0),
+    }
+    for scope, column in (("teacher", "teacher_id"), ("class", "class_name"), ("school", None)):
+        group = [column, "date"] if column else ["date"]
+        weeks = defaultdict(lambda: dict.fromkeys(SUM_FIELDS, 0))
+        rows = []
+        for values in ClassSchedule.objects.order_by().values(*group).annotate(**aggregates).iterator():
+            key = str(values.pop(column)) if column else ""
+            day = values.pop("date")
+            rows.append(ScheduleRollup(scope=scope, key=key, period="day", period_start=day, **values))
+            week = weeks[(key, day - timedelta(days=day.weekday()))]
+            for field in SUM_FIELDS:
+                week[field] += values[field]
+        rows.extend(
+            ScheduleRollup(scope=scope, key=key, period="week", period_start=monday, **values)
+            for (key, monday), values in weeks.items()
+        )
+        ScheduleRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0009_session_attendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('teacher', 'Teacher'), ('class', 'Class'), ('school', 'School')], max_length=10)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('coverage_total', models.PositiveIntegerField(default=0)),
+                ('present_total', models.PositiveIntegerField(default=0)),
+                ('enrolled_total', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'key', 'period', 'period_start'], name='schedule_rollup_key_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'period', 'period_start', 'key'), name='schedule_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
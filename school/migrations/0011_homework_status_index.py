@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0010_schedule_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='homework',
+            index=models.Index(fields=['status', 'due_date'], name='homework_status_due_idx'),
+        ),
+    ]
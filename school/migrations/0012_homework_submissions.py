@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0011_homework_status_index'),
+        ('student', '0007_student_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeworkSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('excused', 'Excused')], default='pending', max_length=10)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('homework', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='school.homework')),
+                ('student', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='student.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'status'], name='submission_student_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('homework', 'student'), name='homework_submission_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0012_homework_submissions'),
+        ('student', '0007_student_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Exam',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150)),
+                ('term', models.CharField(blank=True, max_length=50)),
+                ('grade', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ExamPaper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=120)),
+                ('max_marks', models.PositiveIntegerField(default=100)),
+                ('exam', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='papers', to='school.exam')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ExamMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marks', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('student', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='student.student')),
+                ('paper', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='marks', to='school.exampaper')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='exampaper',
+            constraint=models.UniqueConstraint(fields=('exam', 'subject'), name='exam_paper_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='exammark',
+            index=models.Index(fields=['student', 'paper'], name='exam_mark_student_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='exammark',
+            constraint=models.UniqueConstraint(fields=('paper', 'student'), name='exam_mark_unique'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:57
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_sections(apps, schema_editor):
+    # Existing marks take the student's current section, the best record
+    # there is of where they sat the exam.
+    ExamMark = apps.get_model("school", "ExamMark")
+    Student = apps.get_model("student", "Student")
+    ExamMark.objects.update(
+        section=Subquery(Student.objects.filter(pk=OuterRef("student_id")).values("section")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0015_profiling'),
+        ('student', '0007_student_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exammark',
+            name='section',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.RunPython(backfill_sections, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+import hashlib
+import sys
+from array import array
+
+from django.db import migrations
+
+
+def _repack(apps, source, target):
+    AttendanceRoster = apps.get_model("school", "AttendanceRoster")
+    for roster in AttendanceRoster.objects.iterator():
+        ids = array(source)
+        ids.frombytes(bytes(roster.student_ids))
+        if sys.byteorder == "big":
+            ids.byteswap()
+        packed = array(target, ids)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        roster.student_ids = packed.tobytes()
+        # The digest covers the packed ids, so it changes with them.
+        roster.digest = hashlib.sha1(roster.class_name.encode() + b"\0" + roster.student_ids).hexdigest()
+        roster.save(update_fields=["student_ids", "digest"])
+
+
+def widen_ids(apps, schema_editor):
+    _repack(apps, "I", "q")
+
+
+def narrow_ids(apps, schema_editor):
+    _repack(apps, "q", "I")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0016_exam_mark_section'),
+    ]
+
+    operations = [
+        migrations.RunPython(widen_ids, narrow_ids),
+    ]
@@ -1,4 +1,5 @@
 # models.py
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.conf import settings
 import uuid
@@ -11,6 +12,12 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "is_read", "created_at"], name="notification_user_unread_idx"),
+            models.Index(fields=["is_read", "created_at"], name="notification_retention_idx"),
+        ]
+
     def __str__(self):
         return self.message
 
@@ -36,7 +43,8 @@ class ClassSchedule(models.Model):
         ("cancelled", "Cancelled"),
     )
 
-    teacher = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Covered by the (teacher, date, start_time) index below.
+    teacher = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
@@ -48,18 +56,108 @@ class ClassSchedule(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="scheduled")
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("-date", "-start_time")
+        indexes = [
+            models.Index(fields=["teacher", "date", "start_time"], name="schedule_teacher_date_idx"),
+            models.Index(fields=["class_name", "date"], name="schedule_class_date_idx"),
+        ]
 
     @property
     def absent_students(self):
         return max(self.total_students - self.present_students, 0)
 
+    def clean(self):
+        if self.start_time and self.end_time and self.end_time <= self.start_time:
+            raise ValidationError({"end_time": "End time must be after the start time."})
+        if not (self.date and self.start_time and self.end_time) or self.status == "cancelled":
+            return
+        from .conflicts import describe, find_overlaps
+
+        errors = [describe(conflict) for conflict in find_overlaps(self)]
+        if errors:
+            raise ValidationError(errors)
+
     def __str__(self):
         return f"{self.class_name} - {self.topic}"
 
 
+class AttendanceRoster(models.Model):
+    """
+    Snapshot of the students in a class. Session attendance stores one mark
+    per position in ``student_ids``, so identical rosters are shared.
+    """
+
+    class_name = models.CharField(max_length=100)
+    # Packed signed 64-bit student ids, see school.attendance.
+    student_ids = models.BinaryField()
+    digest = models.CharField(max_length=40, unique=True)
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.class_name} ({self.size} students)"
+
+
+class SessionAttendance(models.Model):
+    schedule = models.OneToOneField(
+        ClassSchedule, on_delete=models.CASCADE, primary_key=True, related_name="attendance"
+    )
+    roster = models.ForeignKey(AttendanceRoster, on_delete=models.PROTECT)
+    # One status byte per roster position, see school.attendance.STATUSES.
+    marks = models.BinaryField()
+    present_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Attendance for {self.schedule}"
+
+
+class ScheduleRollup(models.Model):
+    """
+    Pre-aggregated session totals for one teacher, one class or the whole
+    school over a day or a week. Maintained by school.rollups.
+    """
+
+    SCOPE_CHOICES = (
+        ("teacher", "Teacher"),
+        ("class", "Class"),
+        ("school", "School"),
+    )
+    PERIOD_CHOICES = (
+        ("day", "Day"),
+        ("week", "Week"),
+    )
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    # Teacher id or class name; empty for the school scope.
+    key = models.CharField(max_length=100, blank=True)
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    # The day itself, or the Monday of the week.
+    period_start = models.DateField()
+    sessions = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    # Sum of syllabus_coverage over completed sessions.
+    coverage_total = models.PositiveIntegerField(default=0)
+    present_total = models.PositiveIntegerField(default=0)
+    enrolled_total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "period", "period_start", "key"], name="schedule_rollup_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["scope", "key", "period", "period_start"], name="schedule_rollup_key_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} {self.period} {self.period_start}"
+
+
 class Homework(models.Model):
     STATUS_CHOICES = (
         ("assigned", "Assigned"),
@@ -81,6 +179,183 @@ class Homework(models.Model):
 
     class Meta:
         ordering = ("due_date",)
+        indexes = [
+            models.Index(fields=["status", "due_date"], name="homework_status_due_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class HomeworkSubmission(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("submitted", "Submitted"),
+        ("excused", "Excused"),
+    )
+
+    # Covered by the (homework, student) unique constraint.
+    homework = models.ForeignKey(
+        Homework, on_delete=models.CASCADE, related_name="submissions", db_index=False
+    )
+    student = models.ForeignKey("student.Student", on_delete=models.CASCADE, db_index=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["homework", "student"], name="homework_submission_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["student", "status"], name="submission_student_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.homework} ({self.status})"
+
+
+class Exam(models.Model):
+    name = models.CharField(max_length=150)
+    term = models.CharField(max_length=50, blank=True)
+    # Matches Student.student_class; every section of the grade sits the exam.
+    grade = models.CharField(max_length=50)
+    date = models.DateField()
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-date",)
+
+    def __str__(self):
+        return f"{self.name} ({self.grade})"
+
+
+class ExamPaper(models.Model):
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="papers", db_index=False)
+    subject = models.CharField(max_length=120)
+    max_marks = models.PositiveIntegerField(default=100)
+
+    class Meta:
+        ordering = ("id",)
+        constraints = [
+            models.UniqueConstraint(fields=["exam", "subject"], name="exam_paper_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.exam.name} - {self.subject}"
+
+
+class ExamMark(models.Model):
+    paper = models.ForeignKey(ExamPaper, on_delete=models.CASCADE, related_name="marks", db_index=False)
+    student = models.ForeignKey("student.Student", on_delete=models.CASCADE, db_index=False)
+    marks = models.DecimalField(max_digits=6, decimal_places=2)
+    # The student's section when the exam was sat, so results keep their
+    # sections after students are promoted or moved.
+    section = models.CharField(max_length=10, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["paper", "student"], name="exam_mark_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["student", "paper"], name="exam_mark_student_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.paper}: {self.marks}"
+
+
+class ReportCardBatch(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="report_batches")
+    # Blank for every section of the exam's grade.
+    section = models.CharField(max_length=10, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # Storage path of the zip holding every card, once completed.
+    archive = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    @property
+    def progress(self):
+        return round(100 * self.done / self.total) if self.total else 0
+
+    def __str__(self):
+        return f"Report cards for {self.exam} ({self.status})"
+
+
+class ProfilingRule(models.Model):
+    """
+    Which requests ``school.middleware.ProfilingMiddleware`` profiles: those
+    whose path starts with ``path`` (blank = any) made by ``user`` (blank =
+    anyone), sampled at ``sample_rate`` percent. A rule switches itself off
+    after ``max_profiles`` captures or at ``expires_at``.
+    """
+
+    MODE_CHOICES = (
+        ("cprofile", "cProfile (every call, slower)"),
+        ("sampler", "Sampler (stack samples, flame graph)"),
+    )
+
+    path = models.CharField(max_length=255, blank=True, help_text="Path prefix, e.g. /teacher/dashboard/")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    sample_rate = models.DecimalField(max_digits=5, decimal_places=2, default=100)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default="sampler")
+    max_profiles = models.PositiveIntegerField(default=20)
+    captured = models.PositiveIntegerField(default=0)
+    enabled = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(sample_rate__gt=0, sample_rate__lte=100),
+                name="profiling_rule_sample_rate_range",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Profile {self.path or 'any path'} at {self.sample_rate}% ({self.mode})"
+
+
+class RequestProfile(models.Model):
+    rule = models.ForeignKey(ProfilingRule, on_delete=models.SET_NULL, null=True, blank=True, related_name="profiles")
+    mode = models.CharField(max_length=10, choices=ProfilingRule.MODE_CHOICES)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    # Storage path of the profile: pstats data (.prof) or folded stacks (.folded).
+    file = models.CharField(max_length=255)
+    # Plain-text top functions, shown without downloading the file.
+    summary = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,149 @@
+"""
+Prometheus metrics for ``/metrics``.
+
+Under gunicorn every worker is its own process with its own counters.
+When ``PROMETHEUS_MULTIPROC_DIR`` names a directory shared by the workers
+(emptied when the server starts, see gunicorn.conf.py), prometheus_client
+writes every worker's values there and a scrape of any worker returns the
+sum over all of them.
+"""
+import ipaddress
+import os
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+REQUESTS = Counter(
+    "django_http_requests_total",
+    "Requests served, by view and response status.",
+    ["app", "view", "method", "status"],
+)
+LATENCY = Histogram(
+    "django_http_request_duration_seconds",
+    "Time to the response (to the last byte for streamed responses).",
+    ["app", "view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+QUERIES = Histogram(
+    "django_db_queries_per_request",
+    "Database queries run by one request.",
+    ["app", "view"],
+    buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    "django_db_duration_seconds",
+    "Time one request spent waiting on the database.",
+    ["app", "view"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE = Counter(
+    "django_cache_gets_total",
+    "Cache lookups made while serving requests; the hit ratio is hit / (hit + miss).",
+    ["result"],
+)
+NOTIFICATION_QUEUE = Gauge(
+    "school_notification_queue_depth",
+    "Notification fan-out jobs submitted to the background workers but not finished.",
+    multiprocess_mode="livesum",
+)
+
+
+class SessionCollector:
+    """
+    Unexpired sessions, counted at scrape time; the figure comes from the
+    database, so it is the same whichever worker is scraped.
+    """
+
+    def collect(self):
+        yield GaugeMetricFamily(
+            "django_active_sessions",
+            "Sessions that have not expired yet.",
+            value=Session.objects.filter(expire_date__gt=timezone.now()).count(),
+        )
+
+
+_database_registry = CollectorRegistry()
+_database_registry.register(SessionCollector())
+
+
+def enabled():
+    return getattr(settings, "METRICS_ENABLED", True)
+
+
+def scrape_allowed(request):
+    """
+    Whether ``request`` may read the metrics: with the bearer token, from an
+    allowed network, or from anywhere when ``METRICS_PUBLIC`` is set.
+    Closed by default.
+    """
+    if getattr(settings, "METRICS_PUBLIC", False):
+        return True
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in getattr(settings, "METRICS_ALLOWED_NETWORKS", ())
+    )
+
+
+def view_labels(request):
+    """
+    ``(app, view)`` labels: the Django app the view lives in and its URL
+    name. Paths that match no URL share one label so 404 probes cannot
+    create new series.
+    """
+    match = request.resolver_match
+    if match is None:
+        return "", "unresolved"
+    return match.func.__module__.partition(".")[0], match.view_name
+
+
+def observe(request, response, stats):
+    """
+    Record one finished request from its ``instrumentation.RequestStats``.
+    """
+    app, view = view_labels(request)
+    method = request.method if request.method in METHODS else "other"
+    REQUESTS.labels(app, view, method, response.status_code).inc()
+    LATENCY.labels(app, view, method).observe(stats.elapsed)
+    QUERIES.labels(app, view).observe(stats.queries)
+    DB_TIME.labels(app, view).observe(stats.db_time)
+    if stats.cache_hits:
+        CACHE.labels("hit").inc(stats.cache_hits)
+    if stats.cache_misses:
+        CACHE.labels("miss").inc(stats.cache_misses)
+
+
+def exposition():
+    """
+    ``(body, content_type)`` of a scrape in the Prometheus text format.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(_database_registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,269 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from home_auth.models import CustomUser
+from . import monitoring, pubsub
+from .models import ClassSchedule, Notification
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DROPDOWN_LIMIT = 10
+# Counters are self-healing: after this many seconds they are recounted.
+DEFAULT_COUNT_TIMEOUT = 60 * 60
+
+
+def _count_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def _count_timeout():
+    return getattr(settings, "NOTIFICATION_COUNT_TIMEOUT", DEFAULT_COUNT_TIMEOUT)
+
+
+def dropdown_limit():
+    return getattr(settings, "NOTIFICATION_DROPDOWN_LIMIT", DEFAULT_DROPDOWN_LIMIT)
+
+
+def unread_count(user_id):
+    """
+    Return the user's unread notification count, counting (index-only) and
+    caching it on a miss.
+    """
+    key = _count_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.set(key, count, _count_timeout())
+    return count
+
+
+def latest_unread(user_id, limit=None):
+    """
+    Lazy queryset of the newest unread notifications, bounded to ``limit``.
+    """
+    return (
+        Notification.objects.filter(user_id=user_id, is_read=False)
+        .select_related("user")
+        .order_by("-created_at")[: limit or dropdown_limit()]
+    )
+
+
+def adjust_unread_count(user_id, delta):
+    """
+    Add ``delta`` to a cached counter once the current transaction commits,
+    so a rolled back insert never counts. A missing counter is left alone
+    and recounted on the next read.
+    """
+    def adjust():
+        try:
+            cache.incr(_count_key(user_id), delta)
+        except ValueError:
+            pass
+
+    transaction.on_commit(adjust)
+
+
+def reset_unread_count(user_id, count=0):
+    cache.set(_count_key(user_id), count, _count_timeout())
+
+
+def forget_unread_count(user_id):
+    cache.delete(_count_key(user_id))
+
+
+def forget_unread_counts(user_ids):
+    cache.delete_many([_count_key(user_id) for user_id in user_ids])
+
+
+# -------------------------------
+# Live push
+# -------------------------------
+def stream_enabled():
+    return getattr(settings, "NOTIFICATION_STREAM_ENABLED", False)
+
+
+def _payload(notification):
+    return {
+        "id": str(notification.pk),
+        "message": notification.message,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def publish_notifications(items):
+    """
+    Push new notifications to their owners' open streams. Does nothing
+    unless NOTIFICATION_STREAM_ENABLED is set.
+    """
+    if not stream_enabled():
+        return
+    pubsub.publish_many(
+        [(pubsub.channel_for_user(item.user_id), _payload(item)) for item in items]
+    )
+
+
+# -------------------------------
+# Fan-out
+# -------------------------------
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_DEDUPE_WINDOW = 300
+
+AUDIENCES = {
+    "teachers": "All teachers",
+    "admins": "All administrators",
+    "everyone": "Everyone",
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+
+
+def audience_recipients(audience, class_name=None):
+    """
+    Return a user-id queryset for a named audience. ``class_name`` narrows
+    the audience to teachers who have sessions with that class.
+    """
+    users = CustomUser.objects.filter(is_active=True)
+    if audience == "teachers":
+        users = users.filter(is_teacher=True)
+    elif audience == "admins":
+        users = users.filter(is_admin=True)
+    elif audience != "everyone":
+        raise ValueError(f"Unknown audience: {audience}")
+    if class_name:
+        users = users.filter(
+            pk__in=ClassSchedule.objects.filter(class_name=class_name).values("teacher_id")
+        )
+    return users.values_list("pk", flat=True)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def notify(recipients, message, dedupe_window=None, batch_size=None):
+    """
+    Create ``message`` for every recipient with batched ``bulk_create``.
+
+    ``recipients`` is a user queryset or an iterable of user ids. Users who
+    already received the identical message within ``dedupe_window`` seconds
+    are skipped. Returns the number of notifications created.
+    """
+    batch_size = batch_size or getattr(settings, "NOTIFICATION_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    if isinstance(recipients, QuerySet) and recipients.model is CustomUser:
+        recipients = recipients.values_list("pk", flat=True)
+    if isinstance(recipients, QuerySet):
+        recipients = recipients.iterator(chunk_size=batch_size)
+    return notify_many(
+        ((user_id, message) for user_id in recipients),
+        dedupe_window=dedupe_window,
+        batch_size=batch_size,
+    )
+
+
+def notify_many(messages, dedupe_window=None, batch_size=None):
+    """
+    Like :func:`notify` for ``(user_id, message)`` pairs, so every
+    recipient can get a different message. Each batch costs one dedupe
+    query and one INSERT.
+    """
+    if dedupe_window is None:
+        dedupe_window = getattr(settings, "NOTIFICATION_DEDUPE_WINDOW", DEFAULT_DEDUPE_WINDOW)
+    batch_size = batch_size or getattr(settings, "NOTIFICATION_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+    since = timezone.now() - timedelta(seconds=dedupe_window)
+    created = 0
+    for batch in _chunks(messages, batch_size):
+        if dedupe_window:
+            already = set(
+                Notification.objects.filter(
+                    user_id__in={user_id for user_id, _ in batch},
+                    message__in={message for _, message in batch},
+                    created_at__gte=since,
+                ).values_list("user_id", "message")
+            )
+            batch = [pair for pair in batch if pair not in already]
+        if not batch:
+            continue
+        items = Notification.objects.bulk_create(
+            [Notification(user_id=user_id, message=message) for user_id, message in batch]
+        )
+        # bulk_create sends no post_save, so drop the cached counters and
+        # push to open streams here.
+        forget_unread_counts({user_id for user_id, _ in batch})
+        transaction.on_commit(lambda items=items: publish_notifications(items))
+        created += len(batch)
+    return created
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "NOTIFICATION_WORKERS", 1),
+                thread_name_prefix="notifications",
+            )
+    return _executor
+
+
+def _run_notify(*args, **kwargs):
+    global _pending
+    try:
+        return notify(*args, **kwargs)
+    except Exception:
+        logger.exception("Notification fan-out failed")
+        return 0
+    finally:
+        close_old_connections()
+        with _executor_lock:
+            _pending -= 1
+            monitoring.NOTIFICATION_QUEUE.set(_pending)
+
+
+def notify_async(recipients, message, **kwargs):
+    """
+    Run :func:`notify` in the background worker once the current
+    transaction commits. ``recipients`` should be a queryset or a list of
+    ids. With ``NOTIFICATION_WORKERS = 0`` it runs inline on commit.
+    """
+    if isinstance(recipients, QuerySet):
+        # Evaluate lazily in the worker, not in the request thread.
+        recipients = recipients.all()
+
+    def submit():
+        global _pending
+        if getattr(settings, "NOTIFICATION_WORKERS", 1) <= 0:
+            notify(recipients, message, **kwargs)
+            return
+        with _executor_lock:
+            _pending += 1
+            monitoring.NOTIFICATION_QUEUE.set(_pending)
+        _get_executor().submit(_run_notify, recipients, message, **kwargs)
+
+    transaction.on_commit(submit)
+
+
+def queue_depth():
+    """
+    Number of fan-out jobs submitted to this process' worker but not finished.
+    """
+    return _pending
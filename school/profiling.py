@@ -0,0 +1,316 @@
+"""
+On-demand request profiling for ``school.middleware.ProfilingMiddleware``.
+
+Admins add a ``ProfilingRule`` (path prefix, user, sampling percentage)
+and matching requests are profiled either with cProfile or with a
+statistical sampler that records the request thread's stack every few
+milliseconds. Each profile is stored in media storage with a
+``RequestProfile`` row, written from a background thread once the response
+is ready. A rule's ``max_profiles`` slots are reserved in the database
+before profiling starts, so every process together stops at the limit.
+
+Rules are read from the database at most every ``PROFILING_RULES_REFRESH``
+seconds per process, so with no rule enabled a request costs one clock
+read and a comparison.
+
+Under ASGI both profilers watch the event loop thread: work that Django
+hands to its sync worker thread (sync views) does not show up.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ProfilingRule, RequestProfile
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH = 30
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# Lines of the text summary stored with each profile.
+SUMMARY_LINES = 30
+
+_rules = []
+_rules_expire = 0.0
+_rules_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def active_rules():
+    global _rules, _rules_expire
+    now = time.monotonic()
+    if now < _rules_expire:
+        return _rules
+    with _rules_lock:
+        if now >= _rules_expire:
+            _rules = list(
+                ProfilingRule.objects.filter(enabled=True)
+                .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+                .order_by("pk")
+            )
+            _rules_expire = now + getattr(settings, "PROFILING_RULES_REFRESH", DEFAULT_REFRESH)
+    return _rules
+
+
+def cached_rules():
+    """
+    The rules if they are fresh enough to use without a query, else None;
+    lets async callers read the database from a thread only when needed.
+    """
+    if time.monotonic() < _rules_expire:
+        return _rules
+    return None
+
+
+def forget_rules():
+    """
+    Re-read the rules on the next request (other processes pick changes up
+    within ``PROFILING_RULES_REFRESH`` seconds).
+    """
+    global _rules_expire
+    _rules_expire = 0.0
+
+
+def match(request, rules=None, user=None):
+    """
+    The first enabled rule of ``rules`` (default: :func:`active_rules`) that
+    selects ``request``, or None. ``user`` defaults to ``request.user``.
+    """
+    if rules is None:
+        rules = active_rules()
+    if not rules:
+        return None
+    for rule in rules:
+        if rule.path and not request.path.startswith(rule.path):
+            continue
+        if rule.expires_at and rule.expires_at <= timezone.now():
+            continue
+        if rule.user_id and getattr(user or request.user, "pk", None) != rule.user_id:
+            continue
+        if rule.sample_rate < 100 and random.uniform(0, 100) >= rule.sample_rate:
+            continue
+        return rule
+    return None
+
+
+class Sampler:
+    """
+    Records the stack of one thread every ``interval`` seconds from a
+    helper thread, as folded stacks (``outer;inner;leaf count``) that
+    flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({frame.f_globals.get('__name__', '?')}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        """
+        Functions with the most samples at the top of the stack.
+        """
+        total = sum(self.stacks.values())
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rpartition(";")[2]] += count
+        lines = [f"{total} samples, one every {self.interval * 1000:g} ms", ""]
+        lines += [
+            f"{count:6d}  {100 * count / total:5.1f}%  {leaf}"
+            for leaf, count in leaves.most_common(SUMMARY_LINES)
+        ]
+        return "\n".join(lines)
+
+
+def _cprofile_summary(profiler):
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    return output.getvalue()
+
+
+class Recording:
+    """
+    One profiled request, under cProfile or the sampler according to the
+    rule's mode: :meth:`start`, :meth:`stop`, then :meth:`output`.
+    """
+
+    def __init__(self, rule):
+        self.mode = rule.mode
+        self.duration = 0.0
+
+    def start(self):
+        """
+        Start profiling; False when cProfile cannot run because another
+        profiler is already active in this thread.
+        """
+        if self.mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                return False
+        else:
+            self.sampler = Sampler(getattr(settings, "PROFILING_SAMPLE_INTERVAL", DEFAULT_SAMPLE_INTERVAL))
+            self.sampler.start()
+        self._started = time.perf_counter()
+        return True
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._started
+        if self.mode == "cprofile":
+            self.profiler.disable()
+        else:
+            self.sampler.stop()
+
+    def output(self):
+        """
+        ``(data, summary, file extension)`` of the finished profile.
+        """
+        if self.mode == "cprofile":
+            self.profiler.create_stats()
+            return marshal.dumps(self.profiler.stats), _cprofile_summary(self.profiler), "prof"
+        return self.sampler.folded().encode(), self.sampler.summary(), "folded"
+
+
+def reserve(rule):
+    """
+    Take one of the rule's ``max_profiles`` slots; False when they are all
+    taken (or the rule was disabled) by any process.
+    """
+    reserved = ProfilingRule.objects.filter(
+        pk=rule.pk, enabled=True, captured__lt=F("max_profiles")
+    ).update(captured=F("captured") + 1)
+    if not reserved:
+        forget_rules()
+    return bool(reserved)
+
+
+def profile(rule, request, get_response):
+    """
+    Serve ``request`` under the rule's profiler and store the result in the
+    background. For streamed responses only the work up to the first byte
+    is profiled.
+    """
+    if not reserve(rule):
+        return get_response(request)
+    recording = Recording(rule)
+    if not recording.start():
+        return get_response(request)
+    try:
+        response = get_response(request)
+    finally:
+        recording.stop()
+    _save(rule, request, response, recording, getattr(request, "user", None))
+    return response
+
+
+async def aprofile(rule, request, get_response):
+    """
+    :func:`profile` for an async middleware chain; the slot is reserved
+    from a thread and the user loaded with ``request.auser()``.
+    """
+    if not await sync_to_async(reserve)(rule):
+        return await get_response(request)
+    recording = Recording(rule)
+    if not recording.start():
+        return await get_response(request)
+    try:
+        response = await get_response(request)
+    finally:
+        recording.stop()
+    user = await request.auser() if hasattr(request, "auser") else None
+    _save(rule, request, response, recording, user)
+    return response
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiling")
+    return _executor
+
+
+def _save(rule, request, response, recording, user):
+    """
+    Hand the finished profile to the background thread; only plain values
+    taken from the request and response go with it.
+    """
+    match = request.resolver_match
+    details = {
+        "rule": rule,
+        "mode": rule.mode,
+        "method": request.method[:10],
+        "path": request.path[:500],
+        "view_name": match.view_name[:200] if match else "",
+        "user_id": user.pk if user is not None and user.is_authenticated else None,
+        "status_code": response.status_code,
+        "duration_ms": recording.duration * 1000,
+    }
+    _get_executor().submit(_run, recording, details)
+
+
+def _run(recording, details):
+    try:
+        data, summary, extension = recording.output()
+        _store(details, data, summary, extension)
+    except Exception:
+        logger.exception("Could not store the profile of %s", details["path"])
+    finally:
+        close_old_connections()
+
+
+def _store(details, data, summary, extension):
+    stamp = timezone.now().strftime("%Y%m%d-%H%M%S-%f")
+    name = default_storage.save(f"profiles/{stamp}.{extension}", ContentFile(data))
+    RequestProfile.objects.create(file=name, summary=summary, **details)
+    rule = details["rule"]
+    if ProfilingRule.objects.filter(pk=rule.pk, captured__gte=F("max_profiles"), enabled=True).update(enabled=False):
+        forget_rules()
+
+
+def delete_profile(item):
+    if item.file and default_storage.exists(item.file):
+        default_storage.delete(item.file)
+    item.delete()
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "notifications:"
+SUBSCRIBER_QUEUE_SIZE = 100
+RECONNECT_DELAY = 5
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = None
+
+    async def __aenter__(self):
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.broker._add(self.channel, asyncio.get_running_loop(), self.queue)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker._remove(self.channel, self.queue)
+
+    async def get(self, timeout=None):
+        """
+        Return the next payload, or ``None`` if nothing arrived in ``timeout``
+        seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _deliver(queue, payload):
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        # A stalled client only loses live updates; the next page load
+        # shows the full list.
+        pass
+
+
+class InProcessBroker:
+    """
+    Delivers messages to subscribers in this process only. ``publish`` is
+    synchronous and thread-safe so views, signals and worker threads can
+    call it; subscribers are asyncio queues on the ASGI event loop.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def _add(self, channel, loop, queue):
+        with self._lock:
+            self._subscribers[channel][queue] = loop
+
+    def _remove(self, channel, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, {})
+            subscribers.pop(queue, None)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, {}).items())
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(_deliver, queue, payload)
+
+    def publish_many(self, messages):
+        for channel, payload in messages:
+            self.publish(channel, payload)
+
+    def subscription(self, channel):
+        return Subscription(self, channel)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes through Redis. Each event loop keeps one pattern subscription
+    and fans its messages out to local queues, so an open stream costs a
+    queue rather than a Redis connection.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._client = None
+        self._listeners = {}
+
+    def _get_client(self):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, channel, payload):
+        self._get_client().publish(channel, json.dumps(payload, cls=DjangoJSONEncoder))
+
+    def publish_many(self, messages):
+        pipeline = self._get_client().pipeline(transaction=False)
+        for channel, payload in messages:
+            pipeline.publish(channel, json.dumps(payload, cls=DjangoJSONEncoder))
+        pipeline.execute()
+
+    def subscription(self, channel):
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self._listen())
+        return Subscription(self, channel)
+
+    async def _listen(self):
+        import redis.asyncio
+
+        while True:
+            client = redis.asyncio.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    InProcessBroker.publish(self, channel, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification pub/sub listener lost its Redis connection")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+def get_broker():
+    """
+    Return the process-wide broker: Redis when NOTIFICATION_PUBSUB_URL is
+    set, otherwise the in-process one.
+    """
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = getattr(settings, "NOTIFICATION_PUBSUB_URL", None)
+            _broker = RedisBroker(url) if url else InProcessBroker()
+    return _broker
+
+
+def channel_for_user(user_id):
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+def publish(channel, payload):
+    try:
+        get_broker().publish(channel, payload)
+    except Exception:
+        logger.exception("Could not publish to %s", channel)
+
+
+def publish_many(messages):
+    try:
+        get_broker().publish_many(messages)
+    except Exception:
+        logger.exception("Could not publish %d messages", len(messages))
@@ -0,0 +1,193 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from student.models import Student
+from . import attendance, gradebook, report_pdf
+from .models import ExamMark, ReportCardBatch
+
+
+logger = logging.getLogger(__name__)
+
+# Attendance on a card covers the sessions in this many days up to the exam.
+ATTENDANCE_WINDOW_DAYS = 120
+# Cards rendered per worker task.
+CHUNK_SIZE = 25
+ARCHIVE_NAME = "report-cards.zip"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def batch_dir(batch):
+    return f"report_cards/{batch.pk}"
+
+
+def collect(exam, section=""):
+    """
+    Plain-dict report cards for everyone who sat the exam (or one section
+    of them), built from a handful of queries whatever the number of
+    students: papers, marks, students, the cached gradebook and their
+    attendance. Sections are the ones recorded on the marks, so cards for
+    a past exam still come out after a promotion.
+    """
+    papers = list(exam.papers.all())
+    scores = ExamMark.objects.filter(paper__exam=exam)
+    if section:
+        scores = scores.filter(section=section)
+    marks, sections = defaultdict(dict), {}
+    for student_id, student_section, paper_id, value in scores.values_list(
+        "student_id", "section", "paper_id", "marks"
+    ):
+        marks[student_id][paper_id] = float(value)
+        sections[student_id] = student_section
+    students = sorted(
+        Student.objects.only("pk", "first_name", "last_name", "student_id").in_bulk(list(sections)).values(),
+        key=lambda student: (sections[student.pk], student.first_name, student.last_name),
+    )
+    figures = gradebook.standings(gradebook.section_results(exam, papers))
+    summaries = attendance.student_summaries(
+        list(sections), exam.date - timedelta(days=ATTENDANCE_WINDOW_DAYS), exam.date + timedelta(days=1)
+    )
+
+    school = getattr(settings, "REPORT_CARD_SCHOOL_NAME", "Student Management System")
+    max_total = sum(paper.max_marks for paper in papers)
+    cards = []
+    for student in students:
+        scored = marks.get(student.pk, {})
+        cards.append({
+            "pk": student.pk,
+            # Student IDs are not unique (nor are their slugs), the pk is.
+            "filename": f"{slugify(student.student_id) or 'student'}-{student.pk}.pdf",
+            "school": school,
+            "exam": exam.name,
+            "term": exam.term,
+            "date": exam.date.isoformat(),
+            "grade": exam.grade,
+            "section": sections[student.pk],
+            "name": f"{student.first_name} {student.last_name}",
+            "student_id": student.student_id,
+            "subjects": [
+                (
+                    paper.subject,
+                    scored.get(paper.pk),
+                    paper.max_marks,
+                    gradebook.letter_grade(100 * scored[paper.pk] / paper.max_marks)
+                    if paper.pk in scored else "-",
+                )
+                for paper in papers
+            ],
+            "max_total": max_total,
+            "figures": figures.get(student.pk),
+            "attendance": summaries.get(student.pk, {}),
+        })
+    return cards
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _rendered(cards, processes):
+    """
+    Yield ``(student_pk, pdf_bytes)`` chunks as they finish, rendered in a
+    pool of ``processes`` worker processes (0 = in this process).
+    """
+    chunks = list(_chunks(cards, CHUNK_SIZE))
+    if processes == 0:
+        for chunk in chunks:
+            yield report_pdf.render_many(chunk)
+        return
+    # Spawned rather than forked: the parent may hold database connections
+    # and background threads that must not be copied into the workers.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        futures = [pool.submit(report_pdf.render_many, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def generate(batch, processes=None):
+    """
+    Render every card of ``batch`` to media storage, recording progress on
+    the batch after each chunk, then store a zip of all of them. Returns the
+    number of cards written.
+    """
+    if processes is None:
+        processes = getattr(settings, "REPORT_CARD_PROCESSES", None) or os.cpu_count() or 1
+    ReportCardBatch.objects.filter(pk=batch.pk).update(status="running", done=0, error="")
+    try:
+        cards = collect(batch.exam, batch.section)
+        filenames = {card["pk"]: card["filename"] for card in cards}
+        ReportCardBatch.objects.filter(pk=batch.pk).update(total=len(cards))
+
+        done = 0
+        folder = batch_dir(batch)
+        with tempfile.TemporaryFile() as archive_file:
+            with zipfile.ZipFile(archive_file, "w", zipfile.ZIP_DEFLATED) as archive:
+                for chunk in _rendered(cards, processes):
+                    for student_pk, pdf in chunk:
+                        name = f"{folder}/{filenames[student_pk]}"
+                        if default_storage.exists(name):
+                            default_storage.delete(name)
+                        default_storage.save(name, ContentFile(pdf))
+                        archive.writestr(filenames[student_pk], pdf)
+                    done += len(chunk)
+                    ReportCardBatch.objects.filter(pk=batch.pk).update(done=done)
+            archive_file.seek(0)
+            archive_name = f"{folder}/{ARCHIVE_NAME}"
+            if default_storage.exists(archive_name):
+                default_storage.delete(archive_name)
+            archive_name = default_storage.save(archive_name, File(archive_file))
+    except Exception as exc:
+        ReportCardBatch.objects.filter(pk=batch.pk).update(
+            status="failed", error=str(exc)[:1000], finished_at=timezone.now()
+        )
+        raise
+
+    ReportCardBatch.objects.filter(pk=batch.pk).update(
+        status="completed", archive=archive_name, finished_at=timezone.now()
+    )
+    return done
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # One batch at a time per web process; each batch already fans
+            # out over REPORT_CARD_PROCESSES.
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-cards")
+    return _executor
+
+
+def _run(batch_pk):
+    try:
+        generate(ReportCardBatch.objects.select_related("exam").get(pk=batch_pk))
+    except Exception:
+        logger.exception("Report card batch %s failed", batch_pk)
+    finally:
+        close_old_connections()
+
+
+def generate_async(batch):
+    """
+    Run :func:`generate` in a background thread once the current
+    transaction commits, so the request returns straight away.
+    """
+    transaction.on_commit(lambda: _get_executor().submit(_run, batch.pk))
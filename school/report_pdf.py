@@ -0,0 +1,99 @@
+"""
+Report card rendering. Runs in worker processes, so it only deals in plain
+dicts built by school.report_cards and never imports Django.
+"""
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#3d5ee1")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#dddddd")),
+    ("ALIGN", (1, 0), (-1, -1), "CENTER"),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+])
+
+
+def render(card):
+    """
+    One student's report card as PDF bytes.
+    """
+    styles = getSampleStyleSheet()
+    buffer = BytesIO()
+    document = SimpleDocTemplate(
+        buffer, pagesize=A4, leftMargin=18 * mm, rightMargin=18 * mm, topMargin=16 * mm,
+        title=f"{card['exam']} - {card['name']}",
+    )
+    figures = card["figures"]
+    # Paragraphs parse their text as markup; table cells are plain text.
+    text = {
+        key: escape(str(card[key]))
+        for key in ("school", "exam", "term", "date", "name", "student_id", "grade", "section")
+    }
+    story = [
+        Paragraph(text["school"], styles["Title"]),
+        Paragraph(f"{text['exam']} &middot; {text['term'] if card['term'] else text['date']}", styles["Heading2"]),
+        Paragraph(
+            f"<b>{text['name']}</b> ({text['student_id']}) &middot; {text['grade']}, "
+            f"section {text['section']}",
+            styles["Normal"],
+        ),
+        Spacer(1, 6 * mm),
+    ]
+
+    rows = [["Subject", "Marks", "Out of", "Grade"]]
+    rows.extend(
+        [subject, "-" if marks is None else f"{marks:g}", max_marks, letter]
+        for subject, marks, max_marks, letter in card["subjects"]
+    )
+    if figures:
+        rows.append(["Total", f"{figures['total']:g}", card["max_total"], figures["letter"]])
+    table = Table(rows, colWidths=[70 * mm, 30 * mm, 30 * mm, 30 * mm])
+    table.setStyle(TABLE_STYLE)
+    story += [table, Spacer(1, 6 * mm)]
+
+    if figures:
+        summary = Table(
+            [
+                ["Percentage", "GPA", "Class rank", "Grade rank", "Percentile"],
+                [
+                    f"{figures['percentage']}%",
+                    figures["gpa"],
+                    f"{figures['class_rank']} / {figures['section_size']}",
+                    f"{figures['grade_rank']} / {figures['grade_size']}",
+                    figures["percentile"],
+                ],
+            ],
+            colWidths=[32 * mm] * 5,
+        )
+        summary.setStyle(TABLE_STYLE)
+        story += [summary, Spacer(1, 6 * mm)]
+
+    attendance = card["attendance"]
+    if attendance:
+        story.append(Paragraph("Attendance", styles["Heading3"]))
+        table = Table(
+            [[name.title() for name in attendance], list(attendance.values())],
+            colWidths=[40 * mm] * len(attendance),
+        )
+        table.setStyle(TABLE_STYLE)
+        story.append(table)
+
+    document.build(story)
+    return buffer.getvalue()
+
+
+def render_many(cards):
+    """
+    ``[(student_pk, pdf_bytes), ...]``; a chunk of cards per task keeps the
+    inter-process traffic down.
+    """
+    return [(card["pk"], render(card)) for card in cards]
@@ -0,0 +1,243 @@
+import json
+import re
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import notifications
+from .models import Notification
+
+
+DEFAULT_READ_TTL_DAYS = 30
+DEFAULT_UNREAD_TTL_DAYS = 180
+DEFAULT_BATCH_SIZE = 5000
+
+TABLE = Notification._meta.db_table
+PARTITION_RE = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def get_cutoffs(now=None):
+    """
+    Return ``(read_cutoff, unread_cutoff)``: notifications created before
+    these instants are expired.
+    """
+    now = now or timezone.now()
+    read_days = getattr(settings, "NOTIFICATION_READ_TTL_DAYS", DEFAULT_READ_TTL_DAYS)
+    unread_days = getattr(settings, "NOTIFICATION_UNREAD_TTL_DAYS", DEFAULT_UNREAD_TTL_DAYS)
+    return now - timedelta(days=read_days), now - timedelta(days=unread_days)
+
+
+def expired_notifications(now=None):
+    read_cutoff, unread_cutoff = get_cutoffs(now)
+    return Notification.objects.filter(
+        Q(is_read=True, created_at__lt=read_cutoff) | Q(is_read=False, created_at__lt=unread_cutoff),
+        # Redundant bound that lets PostgreSQL prune partitions.
+        created_at__lt=max(read_cutoff, unread_cutoff),
+    )
+
+
+def prune_notifications(now=None, batch_size=None, archive=None, pause=0):
+    """
+    Delete expired notifications in chunks of ``batch_size`` rows, each in
+    its own short transaction so no lock is held for long. Rows are written
+    to the ``archive`` file object as JSON Lines first when one is given.
+    On a partitioned table whole expired months are dropped first.
+    Returns the number of rows removed.
+    """
+    batch_size = batch_size or getattr(settings, "NOTIFICATION_PRUNE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    removed = 0
+    if is_partitioned() and archive is None:
+        removed += drop_expired_partitions(min(get_cutoffs(now)))
+
+    expired = expired_notifications(now)
+    while True:
+        with transaction.atomic():
+            batch = list(expired.values_list("pk", "user_id", "is_read")[:batch_size])
+            if not batch:
+                break
+            pks = [pk for pk, _, _ in batch]
+            if archive is not None:
+                for row in Notification.objects.filter(pk__in=pks).values().iterator():
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+            Notification.objects.filter(pk__in=pks).delete()
+        notifications.forget_unread_counts({user_id for _, user_id, is_read in batch if not is_read})
+        removed += len(batch)
+        if pause:
+            time.sleep(pause)
+    return removed
+
+
+# -------------------------------
+# PostgreSQL monthly partitioning
+# -------------------------------
+# Months are UTC months throughout: partition bounds are UTC midnights on
+# the first of the month, whatever TIME_ZONE is.
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _utc_month(moment):
+    return _month_start(moment.astimezone(dt_timezone.utc))
+
+
+def _next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _partition_name(month):
+    return f"{TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """
+    Return ``[(month_start, table_name)]`` for every monthly partition.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def _create_partition(cursor, parent, month):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{_partition_name(month)}" PARTITION OF "{parent}" '
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [_bound(month), _bound(_next_month(month))],
+    )
+
+
+def _add_partition(cursor, month):
+    """
+    Add a month to the partitioned table. Rows of that month already in the
+    default partition would make ``PARTITION OF`` fail, so the partition is
+    built standalone, the rows are moved into it and it is then attached.
+    """
+    name = _partition_name(month)
+    bounds = [_bound(month), _bound(_next_month(month))]
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{TABLE}_default" WHERE created_at >= %s AND created_at < %s RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved',
+        bounds,
+    )
+    cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', bounds)
+
+
+def ensure_partitions(months_ahead=3):
+    """
+    Create monthly partitions up to ``months_ahead`` months from now.
+    Returns the number of partitions created.
+    """
+    existing = {month for month, _ in list_partitions()}
+    month = _utc_month(timezone.now())
+    created = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        # The default partition is scanned and moved from under this lock.
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        for _ in range(months_ahead + 1):
+            if month not in existing:
+                _add_partition(cursor, month)
+                created += 1
+            month = _next_month(month)
+    return created
+
+
+def drop_expired_partitions(cutoff):
+    """
+    Drop every monthly partition whose whole range lies before ``cutoff``.
+    Returns the number of rows that were in the dropped partitions.
+    """
+    removed = 0
+    with connection.cursor() as cursor:
+        for month, name in list_partitions():
+            if _bound(_next_month(month)) > cutoff:
+                continue
+            cursor.execute(f'SELECT count(*) FROM "{name}"')
+            removed += cursor.fetchone()[0]
+            cursor.execute(f'DROP TABLE "{name}"')
+    # Cached unread counters that included dropped rows correct themselves
+    # after NOTIFICATION_COUNT_TIMEOUT.
+    return removed
+
+
+def convert_to_partitioned(months_ahead=3):
+    """
+    Rebuild the notification table as a table range-partitioned by month
+    on ``created_at``. Runs in one transaction under an exclusive lock.
+    """
+    if connection.vendor != "postgresql":
+        raise ValueError("Partitioning is only supported on PostgreSQL.")
+    if is_partitioned():
+        return 0
+
+    user_table = Notification._meta.get_field("user").related_model._meta.db_table
+    staging = f"{TABLE}_partitioned"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT min(created_at) FROM "{TABLE}"')
+        oldest = cursor.fetchone()[0] or timezone.now()
+
+        cursor.execute(
+            f'CREATE TABLE "{staging}" (LIKE "{TABLE}" INCLUDING DEFAULTS) '
+            f"PARTITION BY RANGE (created_at)"
+        )
+        # A partitioned table's primary key must include the partition key.
+        cursor.execute(f'ALTER TABLE "{staging}" ADD PRIMARY KEY (id, created_at)')
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{staging}" DEFAULT')
+
+        month = _utc_month(oldest)
+        last = _utc_month(timezone.now())
+        for _ in range(months_ahead):
+            last = _next_month(last)
+        partitions = 0
+        while month <= last:
+            _create_partition(cursor, staging, month)
+            month = _next_month(month)
+            partitions += 1
+
+        cursor.execute(f'INSERT INTO "{staging}" SELECT * FROM "{TABLE}"')
+        cursor.execute(f'DROP TABLE "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{TABLE}"')
+
+        for index in Notification._meta.indexes:
+            columns = ", ".join(
+                f'"{Notification._meta.get_field(name).column}"' for name in index.fields
+            )
+            cursor.execute(f'CREATE INDEX "{index.name}" ON "{TABLE}" ({columns})')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_user_id_fk" '
+            f'FOREIGN KEY ("user_id") REFERENCES "{user_table}" ("id") DEFERRABLE INITIALLY DEFERRED'
+        )
+    return partitions
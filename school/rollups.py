@@ -0,0 +1,199 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ClassSchedule, ScheduleRollup
+
+
+SUM_FIELDS = ("sessions", "completed", "coverage_total", "present_total", "enrolled_total")
+UNIQUE_FIELDS = ("scope", "period", "period_start", "key")
+BATCH_SIZE = 1000
+
+# scope -> ClassSchedule field grouped on (None for school-wide)
+SCOPES = {
+    "teacher": "teacher_id",
+    "class": "class_name",
+    "school": None,
+}
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _aggregates():
+    completed = Q(status="completed")
+    return {
+        "sessions": Count("id"),
+        "completed": Count("id", filter=completed),
+        "coverage_total": Coalesce(Sum("syllabus_coverage", filter=completed), 0),
+        "present_total": Coalesce(Sum("present_students"), 0),
+        "enrolled_total": Coalesce(Sum("total_students"), 0),
+    }
+
+
+def _sums():
+    return {field: Coalesce(Sum(field), 0) for field in SUM_FIELDS}
+
+
+def _save(rows):
+    """
+    Upsert ``rows`` and delete the buckets that no longer hold a session.
+    """
+    rows = list(rows)
+    kept = [row for row in rows if row.sessions]
+    if kept:
+        ScheduleRollup.objects.bulk_create(
+            kept,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=SUM_FIELDS,
+        )
+    empty = Q()
+    for row in rows:
+        if not row.sessions:
+            empty |= Q(**{field: getattr(row, field) for field in UNIQUE_FIELDS})
+    if empty:
+        ScheduleRollup.objects.filter(empty).delete()
+
+
+def _day_rows(scope, buckets):
+    """
+    Recompute day buckets ``{(key, day)}`` of ``scope`` from the sessions,
+    in one query served by the (teacher, date) or (class_name, date) index.
+    """
+    column = SCOPES[scope]
+    wanted = Q()
+    for key, day in buckets:
+        wanted |= Q(**{column: key, "date": day})
+    found = {
+        (str(values.pop(column)), values.pop("date")): values
+        for values in ClassSchedule.objects.filter(wanted)
+        .order_by()
+        .values(column, "date")
+        .annotate(**_aggregates())
+    }
+    return [
+        ScheduleRollup(
+            scope=scope, key=str(key), period="day", period_start=day,
+            **found.get((str(key), day), dict.fromkeys(SUM_FIELDS, 0)),
+        )
+        for key, day in buckets
+    ]
+
+
+def _rolled_up(scope, period, starts, source_scope, keys=None):
+    """
+    Buckets built by summing stored day rows: school days from teacher days,
+    and weeks from the days of the same scope.
+    """
+    rows = []
+    for start in starts:
+        end = start + timedelta(days=7 if period == "week" else 1)
+        days = ScheduleRollup.objects.filter(
+            scope=source_scope, period="day", period_start__gte=start, period_start__lt=end
+        )
+        if keys is not None:
+            days = days.filter(key__in=keys)
+        if source_scope == scope:
+            found = {
+                values.pop("key"): values
+                for values in days.order_by().values("key").annotate(**_sums())
+            }
+        else:
+            found = {"": days.aggregate(**_sums())}
+        for key in keys if keys is not None else [""]:
+            rows.append(
+                ScheduleRollup(
+                    scope=scope, key=key, period=period, period_start=start,
+                    **found.get(key, dict.fromkeys(SUM_FIELDS, 0)),
+                )
+            )
+    return rows
+
+
+def refresh(touched):
+    """
+    Recompute the day and week buckets for ``touched``, an iterable of
+    ``(teacher_id, class_name, date)`` whose sessions changed. Only the
+    affected days are read.
+    """
+    touched = {item for item in touched if None not in item}
+    if not touched:
+        return
+    days = {day for _, _, day in touched}
+    weeks = {week_start(day) for day in days}
+    teachers = {str(teacher_id) for teacher_id, _, _ in touched}
+    classes = {class_name for _, class_name, _ in touched}
+
+    with transaction.atomic():
+        _save(_day_rows("teacher", {(teacher_id, day) for teacher_id, _, day in touched}))
+        _save(_day_rows("class", {(class_name, day) for _, class_name, day in touched}))
+        _save(_rolled_up("school", "day", days, "teacher"))
+        _save(_rolled_up("teacher", "week", weeks, "teacher", sorted(teachers)))
+        _save(_rolled_up("class", "week", weeks, "class", sorted(classes)))
+        _save(_rolled_up("school", "week", weeks, "school", [""]))
+
+
+def refresh_on_commit(schedules):
+    touched = {(schedule.teacher_id, schedule.class_name, schedule.date) for schedule in schedules}
+    transaction.on_commit(lambda: refresh(touched))
+
+
+def rebuild(start=None, end=None):
+    """
+    Recreate every bucket for sessions dated in ``[start, end)`` (default:
+    all history) with grouped queries. The range is widened to whole weeks.
+    Returns the number of rows written.
+    """
+    schedules = ClassSchedule.objects.order_by()
+    buckets = ScheduleRollup.objects.all()
+    if start:
+        start = week_start(start)
+        schedules = schedules.filter(date__gte=start)
+        buckets = buckets.filter(period_start__gte=start)
+    if end:
+        end = week_start(end - timedelta(days=1)) + timedelta(days=7)
+        schedules = schedules.filter(date__lt=end)
+        buckets = buckets.filter(period_start__lt=end)
+
+    written = 0
+    with transaction.atomic():
+        buckets.delete()
+        for scope, column in SCOPES.items():
+            group = [column, "date"] if column else ["date"]
+            weeks = defaultdict(lambda: dict.fromkeys(SUM_FIELDS, 0))
+            rows = []
+            for values in schedules.values(*group).annotate(**_aggregates()).iterator():
+                key = str(values.pop(column)) if column else ""
+                day = values.pop("date")
+                rows.append(ScheduleRollup(scope=scope, key=key, period="day", period_start=day, **values))
+                week = weeks[(key, week_start(day))]
+                for field in SUM_FIELDS:
+                    week[field] += values[field]
+            rows.extend(
+                ScheduleRollup(scope=scope, key=key, period="week", period_start=monday, **values)
+                for (key, monday), values in weeks.items()
+            )
+            ScheduleRollup.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            written += len(rows)
+    return written
+
+
+def totals(scope, key="", start=None):
+    """
+    Summed week buckets for a teacher, a class or the school, plus the
+    derived ``coverage`` and ``attendance_rate`` percentages.
+    """
+    weeks = ScheduleRollup.objects.filter(scope=scope, key=str(key), period="week")
+    if start:
+        weeks = weeks.filter(period_start__gte=week_start(start))
+    result = weeks.aggregate(**_sums())
+    completed, enrolled = result["completed"], result["enrolled_total"]
+    result["coverage"] = round(result["coverage_total"] / completed, 1) if completed else 0
+    result["attendance_rate"] = round(100 * result["present_total"] / enrolled, 1) if enrolled else 0
+    return result
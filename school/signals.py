@@ -0,0 +1,149 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from home_auth.models import CustomUser
+from student.models import Student
+from . import gradebook, homework, metrics, notifications, profiling, rollups
+from .models import (
+    ClassSchedule,
+    Exam,
+    ExamMark,
+    ExamPaper,
+    Homework,
+    HomeworkSubmission,
+    Notification,
+    ProfilingRule,
+    TeacherProfile,
+)
+
+
+# Model -> dashboard metric groups that depend on its rows.
+DASHBOARD_DEPENDENCIES = {
+    Student: ("students",),
+    ClassSchedule: ("schedules",),
+    Homework: ("homework",),
+    TeacherProfile: ("teachers",),
+    CustomUser: ("teachers",),
+}
+
+
+@receiver(post_save, sender=CustomUser)
+def ensure_teacher_profile(sender, instance, update_fields=None, **kwargs):
+    """
+    Give every teacher a profile as soon as the role is granted, so views
+    never have to backfill them.
+    """
+    if not instance.is_teacher:
+        return
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    # A single INSERT; the unique user_id makes it a no-op for existing profiles.
+    TeacherProfile.objects.bulk_create([TeacherProfile(user=instance)], ignore_conflicts=True)
+
+
+def invalidate_dashboard_metrics(sender, update_fields=None, **kwargs):
+    if sender is CustomUser and update_fields and set(update_fields) <= {"last_login"}:
+        # Logging in touches last_login only; no metric depends on it.
+        return
+    # After the commit, so a concurrent dashboard read cannot cache the old
+    # figures again before the change is visible.
+    groups = DASHBOARD_DEPENDENCIES[sender]
+    transaction.on_commit(lambda: metrics.invalidate(*groups))
+
+
+# Connected per model rather than to every sender: a post_delete receiver
+# without a sender disables Django's fast (single query) deletes everywhere.
+for _model in DASHBOARD_DEPENDENCIES:
+    post_save.connect(invalidate_dashboard_metrics, sender=_model, dispatch_uid=f"dashboard-save-{_model.__name__}")
+    post_delete.connect(invalidate_dashboard_metrics, sender=_model, dispatch_uid=f"dashboard-delete-{_model.__name__}")
+
+
+# No post_delete receiver for Notification on purpose, so bulk clears stay a
+# single DELETE; the views reset the counter themselves.
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        notifications.adjust_unread_count(instance.user_id, 1)
+        transaction.on_commit(lambda: notifications.publish_notifications([instance]))
+    elif not created:
+        notifications.forget_unread_count(instance.user_id)
+
+
+def _rollup_bucket(schedule):
+    # Read from __dict__ so deferred fields are never fetched just for this.
+    return tuple(schedule.__dict__.get(field) for field in ("teacher_id", "class_name", "date"))
+
+
+@receiver(post_init, sender=ClassSchedule)
+def remember_rollup_bucket(sender, instance, **kwargs):
+    instance._rollup_bucket = _rollup_bucket(instance)
+
+
+@receiver(post_save, sender=ClassSchedule)
+def refresh_rollups_on_save(sender, instance, **kwargs):
+    # A session moved to another day, teacher or class also changes the
+    # buckets it left.
+    touched = {instance._rollup_bucket, _rollup_bucket(instance)}
+    instance._rollup_bucket = _rollup_bucket(instance)
+    transaction.on_commit(lambda: rollups.refresh(touched))
+
+
+@receiver(post_delete, sender=ClassSchedule)
+def refresh_rollups_on_delete(sender, instance, **kwargs):
+    touched = {_rollup_bucket(instance)}
+    transaction.on_commit(lambda: rollups.refresh(touched))
+
+
+@receiver(pre_delete, sender=Student)
+def release_homework_counts(sender, instance, **kwargs):
+    """
+    Take a deleted student's submissions out of the homework counters; the
+    rows themselves go with the cascade. One UPDATE per counted status.
+    """
+    for status, field in homework.COUNTERS.items():
+        Homework.objects.filter(
+            pk__in=HomeworkSubmission.objects.filter(student=instance, status=status).values("homework_id")
+        ).update(**{field: F(field) - 1})
+
+
+# Mark entry goes through gradebook.record_marks, which invalidates only the
+# sections it touched; these cover single saves. No post_delete receiver for
+# ExamMark, so deleting a paper or an exam keeps its marks to one DELETE.
+@receiver(post_save, sender=ExamMark)
+def invalidate_gradebook_section(sender, instance, **kwargs):
+    exam_id = ExamPaper.objects.values_list("exam_id", flat=True).get(pk=instance.paper_id)
+    transaction.on_commit(lambda: gradebook.invalidate(exam_id, [instance.section]))
+
+
+@receiver(post_save, sender=Student)
+def invalidate_gradebook_on_student(sender, instance, created, **kwargs):
+    # A new student has no marks yet.
+    if not created:
+        gradebook.invalidate_students([instance.pk])
+
+
+# Before the delete: the student's marks go with the cascade, and with them
+# the record of which exams and sections to invalidate.
+@receiver(pre_delete, sender=Student)
+def invalidate_gradebook_on_student_delete(sender, instance, **kwargs):
+    gradebook.invalidate_students([instance.pk])
+
+
+@receiver(post_save, sender=ExamPaper)
+@receiver(post_delete, sender=ExamPaper)
+def invalidate_gradebook_on_paper(sender, instance, **kwargs):
+    transaction.on_commit(lambda: gradebook.invalidate(instance.exam_id))
+
+
+@receiver(post_save, sender=Exam)
+def invalidate_gradebook_on_exam(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: gradebook.invalidate(instance.pk))
+
+
+@receiver(post_save, sender=ProfilingRule)
+@receiver(post_delete, sender=ProfilingRule)
+def reload_profiling_rules(sender, instance, **kwargs):
+    transaction.on_commit(profiling.forget_rules)
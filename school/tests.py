@@ -1,3 +1,955 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import random
+import re
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from home_auth.models import CustomUser
+from student import promotion
+from student.models import GRADUATED_CLASS, Parent, Student
+from student.tests import make_student
+from . import (
+    attendance,
+    benchmark,
+    calendar,
+    conflicts,
+    gradebook,
+    homework,
+    instrumentation,
+    notifications,
+    profiling,
+    report_cards,
+    report_pdf,
+    retention,
+    rollups,
+)
+from .models import (
+    ClassSchedule,
+    Exam,
+    ExamMark,
+    ExamPaper,
+    Homework,
+    HomeworkSubmission,
+    Notification,
+    ProfilingRule,
+    RequestProfile,
+    ScheduleRollup,
+    TeacherProfile,
+)
+from .pubsub import InProcessBroker, channel_for_user
+
+
+@override_settings(NOTIFICATION_STREAM_ENABLED=True, NOTIFICATION_PUBSUB_URL=None)
+class NotificationStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        Notification.objects.create(user=cls.user, message="Earlier")
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_stream_sends_the_count_then_new_notifications(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("notification_stream"))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+        self.assertEqual(await asyncio.wait_for(anext(events), 5), b'event: count\ndata: {"unread": 1}\n\n')
+
+        item = await Notification.objects.acreate(user=self.user, message="Staff meeting")
+        notifications.publish_notifications([item])
+        event = await asyncio.wait_for(anext(events), 5)
+        self.assertTrue(event.startswith(b"event: notification\n"))
+        self.assertIn(b'"message": "Staff meeting"', event)
+        await events.aclose()
+
+    @override_settings(NOTIFICATION_STREAM_ENABLED=False)
+    def test_stream_is_off_unless_enabled(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("notification_stream")).status_code, 404)
+
+
+class InProcessBrokerTests(SimpleTestCase):
+    async def test_publish_reaches_only_the_channel_subscribers(self):
+        broker = InProcessBroker()
+        async with broker.subscription(channel_for_user(1)) as mine, broker.subscription(channel_for_user(2)) as theirs:
+            self.assertEqual(broker.subscriber_count(), 2)
+            # Published from another thread, as views and workers do.
+            thread = threading.Thread(target=broker.publish, args=(channel_for_user(1), {"id": 7}))
+            thread.start()
+            thread.join()
+            self.assertEqual(await mine.get(timeout=1), {"id": 7})
+            self.assertIsNone(await theirs.get(timeout=0.05))
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_a_full_queue_drops_messages_instead_of_blocking(self):
+        broker = InProcessBroker()
+        async with broker.subscription("notifications:1") as subscription:
+            broker.publish_many([("notifications:1", index) for index in range(subscription.queue.maxsize + 5)])
+            await asyncio.sleep(0)
+            self.assertEqual(subscription.queue.qsize(), subscription.queue.maxsize)
+            self.assertEqual(await subscription.get(timeout=1), 0)
+
+
+def row(pk, start, end, teacher_id=1, class_name="Grade 5", day=datetime.date(2026, 5, 4)):
+    return {
+        "id": pk,
+        "teacher_id": teacher_id,
+        "class_name": class_name,
+        "date": day,
+        "start_time": datetime.time(*start),
+        "end_time": datetime.time(*end),
+        "topic": f"Session {pk}",
+    }
+
+
+class ConflictTests(SimpleTestCase):
+    def test_find_conflicts_by_teacher_and_class(self):
+        rows = [
+            row(1, (9, 0), (10, 0)),
+            # Back to back is not a conflict.
+            row(2, (10, 0), (11, 0), teacher_id=2),
+            # Same teacher, other class, overlapping session 1.
+            row(3, (9, 30), (10, 30), class_name="Grade 6"),
+            # Same class, other teacher, overlapping session 2.
+            row(4, (10, 45), (11, 30), teacher_id=3),
+            # Another day.
+            row(5, (9, 0), (10, 0), day=datetime.date(2026, 5, 5)),
+        ]
+        found = {(conflict.kind, conflict.first["id"], conflict.second["id"]) for conflict in conflicts.find_conflicts(rows)}
+        self.assertEqual(found, {("teacher", 1, 3), ("class", 2, 4)})
+
+    def test_interval_tree_matches_a_linear_scan(self):
+        generator = random.Random(7)
+        intervals = []
+        for index in range(300):
+            start = generator.randrange(0, 1000)
+            intervals.append((start, start + generator.randrange(1, 60), index))
+        tree = conflicts.IntervalTree(intervals)
+        for _ in range(200):
+            start = generator.randrange(-20, 1020)
+            end = start + generator.randrange(1, 80)
+            expected = {index for low, high, index in intervals if low < end and high > start}
+            self.assertEqual(set(tree.overlapping(start, end)), expected)
+
+    def test_empty_tree(self):
+        self.assertEqual(conflicts.IntervalTree([]).overlapping(0, 10), [])
+
+
+class ScheduleConflictTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        cls.other = CustomUser.objects.create_user("other", "other@example.com", "pass", is_teacher=True)
+        cls.day = datetime.date(2026, 5, 4)
+        cls.existing = ClassSchedule.objects.create(
+            teacher=cls.teacher, date=cls.day, start_time=datetime.time(9), end_time=datetime.time(10),
+            class_name="Grade 5", topic="Fractions",
+        )
+
+    def session(self, start, end, teacher=None, class_name="Grade 6", **fields):
+        return ClassSchedule(
+            teacher=teacher or self.teacher, date=self.day, start_time=datetime.time(*start),
+            end_time=datetime.time(*end), class_name=class_name, topic="New", **fields
+        )
+
+    def test_find_overlaps_against_saved_sessions(self):
+        self.assertEqual([c.kind for c in conflicts.find_overlaps(self.session((9, 30), (10, 30)))], ["teacher"])
+        clash = self.session((9, 30), (10, 30), teacher=self.other, class_name="Grade 5")
+        self.assertEqual([c.kind for c in conflicts.find_overlaps(clash)], ["class"])
+        self.assertEqual(conflicts.find_overlaps(self.session((10, 0), (11, 0))), [])
+        # A session never conflicts with itself.
+        self.assertEqual(conflicts.find_overlaps(self.existing), [])
+
+    def test_validate_schedules_checks_the_batch_and_the_database(self):
+        batch = [
+            self.session((11, 0), (12, 0), teacher=self.other),
+            self.session((11, 30), (12, 30), teacher=self.other, class_name="Grade 7"),
+            self.session((9, 15), (9, 45), teacher=self.other, class_name="Grade 5"),
+            self.session((9, 15), (9, 45), status="cancelled"),
+        ]
+        problems = conflicts.validate_schedules(batch)
+        self.assertEqual(sorted(problems), [1, 2])
+        self.assertEqual([c.kind for c in problems[1]], ["teacher"])
+        self.assertEqual(problems[2][0].second["id"], self.existing.pk)
+
+    def test_cancelled_sessions_do_not_conflict(self):
+        ClassSchedule.objects.filter(pk=self.existing.pk).update(status="cancelled")
+        self.assertEqual(conflicts.find_overlaps(self.session((9, 30), (10, 30))), [])
+
+
+class AttendanceRosterTests(TestCase):
+    def test_ids_past_32_bits_round_trip(self):
+        ids = [1, 2**32 + 5, 2**63 - 1]
+        blob = attendance.pack_ids(ids)
+        self.assertEqual(len(blob), 8 * len(ids))
+        self.assertEqual(list(attendance.unpack_ids(blob)), ids)
+
+    def test_roster_accepts_a_class_or_one_section(self):
+        first = make_student("R1", student_class="Grade 9", section="A")
+        second = make_student("R2", student_class="Grade 9", section="B")
+        make_student("R3", student_class=GRADUATED_CLASS, section="B")
+        self.assertEqual(list(attendance.roster_students("Grade 9")), [first, second])
+        self.assertEqual(list(attendance.roster_students("Grade 9 B")), [second])
+
+    def test_summaries_follow_the_rosters_across_sections_and_promotions(self):
+        teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        first = make_student("R1", student_class="Grade 9", section="A")
+        second = make_student("R2", student_class="Grade 9", section="B")
+        day = datetime.date(2026, 5, 4)
+        whole, section = (
+            ClassSchedule.objects.create(
+                teacher=teacher, date=day, start_time=datetime.time(hour), end_time=datetime.time(hour + 1),
+                class_name=class_name, topic="Algebra",
+            )
+            for hour, class_name in ((9, "Grade 9"), (11, "Grade 9 B"))
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance.record([whole], "present")
+            attendance.record([section], {second.pk: "absent"})
+            promotion.apply()
+
+        second.refresh_from_db()
+        self.assertEqual(second.student_class, "Grade 10")
+        expected = {"present": 1, "absent": 1, "late": 0, "excused": 0}
+        self.assertEqual(attendance.student_summary(second), expected)
+        later = day + datetime.timedelta(days=1)
+        self.assertEqual(attendance.student_summary(second, start=later), dict.fromkeys(expected, 0))
+        self.assertEqual(
+            attendance.class_summaries("Grade 10"),
+            {first.pk: {"present": 1, "absent": 0, "late": 0, "excused": 0}, second.pk: expected},
+        )
+        self.assertEqual(attendance.class_summaries("Grade 10 B"), {second.pk: expected})
+
+
+class RankingTests(SimpleTestCase):
+    def test_competition_ranks_share_ties_within_each_group(self):
+        groups = np.array([0, 0, 0, 0, 1, 1, 1])
+        totals = np.array([80.0, 95.0, 80.0, 60.0, 70.0, 70.0, 90.0])
+        self.assertEqual(
+            gradebook._competition_ranks(groups, totals).tolist(), [2, 1, 2, 4, 2, 2, 1]
+        )
+
+    def test_grade_points_and_letters_at_band_edges(self):
+        percentages = np.array([np.nan, 34.9, 35.0, 89.9, 90.0, 100.0])
+        self.assertEqual(gradebook.grade_points(percentages).tolist(), [0.0, 0.0, 1.6, 3.6, 4.0, 4.0])
+        self.assertEqual(
+            [gradebook.letter_grade(value) for value in (34.9, 35.0, 45.0, 50.0, 90.0)], ["NG", "D", "C", "C+", "A+"]
+        )
+
+    def test_section_results_and_standings(self):
+        papers = [ExamPaper(pk=1, max_marks=100), ExamPaper(pk=2, max_marks=50)]
+        rows = [
+            # student, section, paper, marks; student 3 missed paper 2.
+            (1, "A", 1, Decimal("90")), (1, "A", 2, Decimal("40")),
+            (2, "A", 1, Decimal("80")), (2, "A", 2, Decimal("50")),
+            (3, "B", 1, Decimal("100")),
+            (4, "B", 1, Decimal("70")), (4, "B", 2, Decimal("20")),
+        ]
+        sections = gradebook._section_results(papers, rows)
+        self.assertEqual(sorted(sections), ["A", "B"])
+        self.assertEqual(sections["B"]["subject_counts"].tolist(), [2, 1])
+
+        results = gradebook.standings(sections)
+        self.assertEqual({student: row["total"] for student, row in results.items()}, {1: 130, 2: 130, 3: 100, 4: 90})
+        self.assertEqual([results[student]["class_rank"] for student in (1, 2, 3, 4)], [1, 1, 1, 2])
+        self.assertEqual([results[student]["grade_rank"] for student in (1, 2, 3, 4)], [1, 1, 3, 4])
+        self.assertEqual(results[1]["percentile"], 75.0)
+        self.assertEqual(results[4]["percentile"], 12.5)
+        self.assertEqual(results[3]["gpa"], 2.0)
+
+        averages = gradebook.subject_averages(sections, papers)
+        self.assertEqual(averages[1]["average"], round(110 / 3, 1))
+        self.assertEqual(averages[1]["sections"], {"A": 45.0, "B": 20.0})
+
+
+class GradebookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.exam = Exam.objects.create(name="Final", grade="Grade 12", date=datetime.date(2026, 3, 1))
+        self.paper = ExamPaper.objects.create(exam=self.exam, subject="Mathematics")
+        self.students = [
+            make_student("G1", student_class="Grade 12", section="A"),
+            make_student("G2", student_class="Grade 12", section="A"),
+            make_student("G3", student_class="Grade 12", section="B"),
+        ]
+
+    def record(self, marks):
+        with self.captureOnCommitCallbacks(execute=True):
+            return gradebook.record_marks(
+                self.exam, {(self.paper.pk, student.pk): value for student, value in zip(self.students, marks)}
+            )
+
+    def test_marks_keep_the_section_they_were_recorded_in(self):
+        self.record([Decimal(70), Decimal(90), Decimal(80)])
+        self.assertEqual(
+            dict(ExamMark.objects.values_list("student__student_id", "section")), {"G1": "A", "G2": "A", "G3": "B"}
+        )
+        self.students[0].section = "B"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].save()
+        self.record([Decimal(75), Decimal(90), Decimal(80)])
+        self.assertEqual(ExamMark.objects.get(student=self.students[0]).section, "A")
+
+    def test_past_exams_survive_a_promotion(self):
+        self.record([Decimal(70), Decimal(90), Decimal(90)])
+        before = gradebook.gradebook(self.exam)
+        with self.captureOnCommitCallbacks(execute=True):
+            run = promotion.apply()
+        self.assertFalse(Student.objects.filter(student_class=self.exam.grade).exists())
+
+        after = gradebook.gradebook(self.exam)
+        self.assertEqual(after["sections"], ["A", "B"])
+        self.assertEqual(
+            [(row["student"].pk, row["grade_rank"], row["section"]) for row in after["students"]],
+            [(row["student"].pk, row["grade_rank"], row["section"]) for row in before["students"]],
+        )
+        self.assertEqual([card["section"] for card in report_cards.collect(self.exam)], ["A", "A", "B"])
+        self.assertEqual(len(report_cards.collect(self.exam, "B")), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            promotion.undo(run)
+
+    def test_clearing_a_mark_invalidates_the_cached_section(self):
+        self.record([Decimal(70), Decimal(90), Decimal(80)])
+        self.assertEqual(len(gradebook.gradebook(self.exam)["students"]), 3)
+        self.record([None, Decimal(90), Decimal(80)])
+        self.assertEqual(len(gradebook.gradebook(self.exam)["students"]), 2)
+
+    def test_deleting_a_student_invalidates_their_sections(self):
+        self.record([Decimal(70), Decimal(90), Decimal(80)])
+        self.assertEqual(len(gradebook.gradebook(self.exam)["students"]), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[2].delete()
+        sections = gradebook.section_results(self.exam, [self.paper])
+        self.assertEqual(sections["B"]["student_ids"].tolist(), [])
+        self.assertEqual(len(sections["A"]["student_ids"]), 2)
+
+
+class ReportCardTests(TestCase):
+    def test_report_card_file_names_are_unique(self):
+        exam = Exam.objects.create(name="Final", grade="Grade 12", date=datetime.date(2026, 3, 1))
+        paper = ExamPaper.objects.create(exam=exam, subject="Mathematics")
+        first = make_student("G1", student_class="Grade 12")
+        # Same ID, other name: the slug (and the student) differs.
+        second = make_student("G1", first_name="Bina", student_class="Grade 12")
+        third = make_student("G3", student_class="Grade 12", section="B")
+        with self.captureOnCommitCallbacks(execute=True):
+            gradebook.record_marks(exam, {(paper.pk, student.pk): Decimal(70) for student in (first, second, third)})
+        filenames = [card["filename"] for card in report_cards.collect(exam)]
+        self.assertEqual(len(set(filenames)), 3)
+
+    def test_markup_in_names_is_printed_as_text(self):
+        card = {
+            "school": "St. Mary's <High> & Secondary", "exam": "Mid <term>", "term": "", "date": "2026-03-01",
+            "grade": "Grade 12", "section": "A", "name": "Asha <b>Rai", "student_id": "S&1",
+            "subjects": [("Maths <Core>", 70.0, 100, "B+")], "max_total": 100, "figures": None, "attendance": {},
+        }
+        self.assertTrue(report_pdf.render(card).startswith(b"%PDF"))
+
+
+class QueuedExecutor:
+    """
+    Stands in for the profiling thread: the work runs when the test says so.
+    """
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, function, *args):
+        self.pending.append((function, args))
+
+    def run(self):
+        while self.pending:
+            function, args = self.pending.pop(0)
+            function(*args)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/teacher/dashboard/")
+        self.request.user = AnonymousUser()
+        self.executor = QueuedExecutor()
+        patcher = mock.patch.object(profiling, "_get_executor", lambda: self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for item in RequestProfile.objects.all():
+            profiling.delete_profile(item)
+
+    def test_slots_are_reserved_up_to_max_profiles(self):
+        rule = ProfilingRule.objects.create(max_profiles=2)
+        self.assertEqual([profiling.reserve(rule) for _ in range(3)], [True, True, False])
+        rule.refresh_from_db()
+        self.assertEqual(rule.captured, 2)
+
+    def test_profiles_are_stored_in_the_background_until_the_rule_is_used_up(self):
+        for mode in ("cprofile", "sampler"):
+            rule = ProfilingRule.objects.create(mode=mode, max_profiles=1)
+            with self.subTest(mode=mode):
+                for _ in range(2):
+                    response = profiling.profile(rule, self.request, lambda request: HttpResponse("ok"))
+                    self.assertEqual(response.content, b"ok")
+                self.assertFalse(RequestProfile.objects.exists())
+                self.executor.run()
+                stored = RequestProfile.objects.get(rule=rule)
+                self.assertEqual((stored.path, stored.status_code, stored.user), ("/teacher/dashboard/", 200, None))
+                rule.refresh_from_db()
+                self.assertEqual((rule.captured, rule.enabled), (1, False))
+                profiling.delete_profile(stored)
+
+    async def test_async_requests_reserve_a_slot_too(self):
+        rule = await ProfilingRule.objects.acreate(max_profiles=1)
+
+        async def get_response(request):
+            return HttpResponse("ok")
+
+        for _ in range(2):
+            await profiling.aprofile(rule, self.request, get_response)
+        await sync_to_async(self.executor.run)()
+        self.assertEqual(await RequestProfile.objects.filter(rule=rule).acount(), 1)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        self.now = datetime.datetime(2026, 6, 15, tzinfo=datetime.timezone.utc)
+
+    def notification(self, days_old, is_read):
+        item = Notification.objects.create(user=self.user, message="Hello", is_read=is_read)
+        Notification.objects.filter(pk=item.pk).update(created_at=self.now - datetime.timedelta(days=days_old))
+        return item
+
+    def test_expired_rows_are_pruned_in_batches(self):
+        keep = {
+            self.notification(10, True).pk,
+            self.notification(100, False).pk,
+        }
+        self.notification(40, True)
+        self.notification(200, False)
+        self.notification(300, True)
+        self.assertEqual(notifications.unread_count(self.user.pk), 2)
+
+        archive = io.StringIO()
+        self.assertEqual(retention.prune_notifications(self.now, batch_size=2, archive=archive), 3)
+        self.assertEqual(set(Notification.objects.values_list("pk", flat=True)), keep)
+        self.assertEqual(len(archive.getvalue().splitlines()), 3)
+        self.assertEqual(notifications.unread_count(self.user.pk), 1)
+
+    def test_partition_months_are_utc_months(self):
+        kathmandu = datetime.timezone(datetime.timedelta(hours=5, minutes=45))
+        # Still April in UTC.
+        moment = datetime.datetime(2026, 5, 1, 3, 0, tzinfo=kathmandu)
+        self.assertEqual(retention._utc_month(moment), datetime.date(2026, 4, 1))
+        self.assertEqual(
+            retention._bound(retention._next_month(datetime.date(2026, 12, 1))),
+            datetime.datetime(2027, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+
+
+class BenchmarkTests(TestCase):
+    def test_failed_responses_are_not_timed(self):
+        client = Client(raise_request_exception=False)
+        result = benchmark.measure(client, "/no-such-page/", repeat=3, warmup=0)
+        self.assertEqual(result, {"path": "/no-such-page/", "status": 404, "failed": True})
+
+        result = benchmark.measure(client, reverse("login"), repeat=3, warmup=1)
+        self.assertEqual((result["status"], result["requests"]), (200, 3))
+        self.assertNotIn("failed", result)
+
+    def test_compare_flags_regressions_above_the_noise_floor(self):
+        before = {"p90_ms": 10.0, "queries": 4, "peak_memory_kb": 1000.0, "status": 200}
+        after = {
+            "slower": dict(before, p90_ms=20.0),
+            "noise": dict(before, p90_ms=11.9),
+            "queries": dict(before, queries=5),
+            "memory": dict(before, peak_memory_kb=1400.0),
+            "same": dict(before),
+        }
+        regressions = benchmark.compare({"100": after}, {"100": dict.fromkeys(after, before)}, threshold=25)
+        self.assertEqual(
+            [line.split(":")[0] for line in regressions],
+            ["100 students, slower", "100 students, queries", "100 students, memory"],
+        )
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        self.assertEqual(notifications.unread_count(self.user.pk), 0)
+
+    def test_counter_moves_when_the_notification_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Notification.objects.create(user=self.user, message="Hello")
+            self.assertEqual(notifications.unread_count(self.user.pk), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(notifications.unread_count(self.user.pk), 1)
+
+    def test_rolled_back_notifications_are_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Notification.objects.create(user=self.user, message="Hello")
+                raise RuntimeError
+        self.assertEqual(notifications.unread_count(self.user.pk), 0)
+
+
+class TeacherProfileTests(TestCase):
+    def test_profile_is_created_with_the_teacher_role(self):
+        user = CustomUser.objects.create_user("staff", "staff@example.com", "pass")
+        self.assertFalse(TeacherProfile.objects.exists())
+        user.is_teacher = True
+        user.save()
+        TeacherProfile.objects.filter(user=user).update(department="Science")
+        user.save()
+        self.assertEqual(list(TeacherProfile.objects.values_list("user_id", "department")), [(user.pk, "Science")])
+
+    def test_backfill_command_creates_only_missing_profiles(self):
+        teachers = [
+            CustomUser.objects.create_user(f"teacher{index}", f"teacher{index}@example.com", "pass", is_teacher=True)
+            for index in range(3)
+        ]
+        CustomUser.objects.create_user("admin", "admin@example.com", "pass", is_admin=True)
+        TeacherProfile.objects.filter(user__in=teachers[1:]).delete()
+        output = io.StringIO()
+        call_command("backfill_teacher_profiles", stdout=output)
+        self.assertIn("Created 2 teacher profiles", output.getvalue())
+        self.assertEqual(
+            sorted(TeacherProfile.objects.values_list("user_id", flat=True)), [teacher.pk for teacher in teachers]
+        )
+
+
+class FanOutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teachers = [
+            CustomUser.objects.create_user(f"teacher{index}", f"teacher{index}@example.com", "pass", is_teacher=True)
+            for index in range(3)
+        ]
+        cls.admin = CustomUser.objects.create_user("admin", "admin@example.com", "pass", is_admin=True)
+        CustomUser.objects.create_user("gone", "gone@example.com", "pass", is_teacher=True, is_active=False)
+        ClassSchedule.objects.create(
+            teacher=cls.teachers[0], date=datetime.date(2026, 5, 4), start_time=datetime.time(9),
+            end_time=datetime.time(10), class_name="Grade 5", topic="Fractions",
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_audiences(self):
+        teacher_ids = sorted(teacher.pk for teacher in self.teachers)
+        self.assertEqual(sorted(notifications.audience_recipients("teachers")), teacher_ids)
+        self.assertEqual(list(notifications.audience_recipients("admins")), [self.admin.pk])
+        self.assertEqual(sorted(notifications.audience_recipients("everyone")), sorted(teacher_ids + [self.admin.pk]))
+        self.assertEqual(list(notifications.audience_recipients("teachers", "Grade 5")), [self.teachers[0].pk])
+        with self.assertRaises(ValueError):
+            notifications.audience_recipients("parents")
+
+    def test_batches_cost_two_queries_and_repeats_are_skipped(self):
+        ids = [teacher.pk for teacher in self.teachers]
+        # Two batches, each one dedupe query and one INSERT.
+        with self.assertNumQueries(4):
+            self.assertEqual(notifications.notify(ids, "Staff meeting", batch_size=2), 3)
+        self.assertEqual(notifications.notify(notifications.audience_recipients("everyone"), "Staff meeting"), 1)
+        self.assertEqual(notifications.notify(ids, "Staff meeting", dedupe_window=0), 3)
+        self.assertEqual(Notification.objects.filter(user=self.teachers[0]).count(), 2)
+
+    def test_notify_many_sends_each_user_their_own_message(self):
+        created = notifications.notify_many([(teacher.pk, f"Hello {teacher.username}") for teacher in self.teachers])
+        self.assertEqual(created, 3)
+        self.assertEqual(Notification.objects.get(user=self.teachers[1]).message, "Hello teacher1")
+
+    @override_settings(NOTIFICATION_WORKERS=0)
+    def test_notify_async_waits_for_the_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify_async(notifications.audience_recipients("admins"), "Report cards ready")
+            self.assertFalse(Notification.objects.exists())
+        self.assertEqual(notifications.unread_count(self.admin.pk), 1)
+
+
+class CalendarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        cls.other = CustomUser.objects.create_user("other", "other@example.com", "pass", is_teacher=True)
+        cls.admin = CustomUser.objects.create_user("admin", "admin@example.com", "pass", is_admin=True)
+        for teacher, day, class_name in (
+            (cls.teacher, 4, "Grade 5"),
+            (cls.teacher, 10, "Grade 6"),
+            (cls.other, 5, "Grade 5"),
+            (cls.other, 11, "Grade 7"),
+        ):
+            ClassSchedule.objects.create(
+                teacher=teacher, date=datetime.date(2026, 5, day), start_time=datetime.time(9),
+                end_time=datetime.time(10), class_name=class_name, topic="Lesson",
+            )
+
+    def feed(self, user, headers=None, **params):
+        self.client.force_login(user)
+        return self.client.get(
+            reverse("schedule_events"), {"start": "2026-05-01", "end": "2026-05-10", **params}, headers=headers
+        )
+
+    def test_parse_window(self):
+        self.assertEqual(
+            calendar.parse_window({"start": "2026-05-01T00:00:00+05:45", "end": "2026-06-01"}),
+            (datetime.date(2026, 5, 1), datetime.date(2026, 6, 1)),
+        )
+        for params in ({}, {"start": "2026-05-02", "end": "2026-05-01"}, {"start": "2026-01-01", "end": "2026-06-01"}):
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                calendar.parse_window(params)
+
+    def test_feed_scopes(self):
+        def dates(response):
+            self.assertEqual(response.status_code, 200)
+            return [event["start"][:10] for event in response.json()]
+
+        # The end date is exclusive.
+        self.assertEqual(dates(self.feed(self.teacher)), ["2026-05-04"])
+        self.assertEqual(dates(self.feed(self.teacher, class_name="Grade 5")), ["2026-05-04", "2026-05-05"])
+        self.assertEqual(self.feed(self.teacher, teacher=self.other.pk).status_code, 403)
+        self.assertEqual(dates(self.feed(self.admin, teacher=self.other.pk)), ["2026-05-05"])
+        self.assertEqual(self.feed(self.teacher, end="2026-12-31").status_code, 400)
+
+    def test_unchanged_window_answers_not_modified(self):
+        etag = self.feed(self.teacher)["ETag"]
+        self.assertEqual(self.feed(self.teacher, headers={"If-None-Match": etag}).status_code, 304)
+        session = ClassSchedule.objects.get(teacher=self.teacher, date=datetime.date(2026, 5, 4))
+        session.topic = "Changed"
+        session.save()
+        self.assertEqual(self.feed(self.teacher, headers={"If-None-Match": etag}).status_code, 200)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        cls.other = CustomUser.objects.create_user("other", "other@example.com", "pass", is_teacher=True)
+
+    def session(self, teacher, day, hour, class_name, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ClassSchedule.objects.create(
+                teacher=teacher, date=datetime.date(2026, 5, day), start_time=datetime.time(hour),
+                end_time=datetime.time(hour + 1), class_name=class_name, topic="Lesson", **fields
+            )
+
+    def buckets(self):
+        return set(
+            ScheduleRollup.objects.values_list("scope", "key", "period", "period_start", *rollups.SUM_FIELDS)
+        )
+
+    def assert_matches_a_rebuild(self):
+        incremental = self.buckets()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.buckets())
+
+    def test_incremental_refresh_matches_a_rebuild(self):
+        self.session(self.teacher, 4, 9, "Grade 5", status="completed", syllabus_coverage=40,
+                     total_students=30, present_students=27)
+        moved = self.session(self.teacher, 5, 9, "Grade 6", total_students=20, present_students=10)
+        self.session(self.other, 12, 9, "Grade 5", status="completed", syllabus_coverage=60)
+        self.assert_matches_a_rebuild()
+
+        # Moving a session refreshes the buckets it left as well.
+        moved.teacher, moved.date = self.other, datetime.date(2026, 5, 13)
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.save()
+        self.assert_matches_a_rebuild()
+        left = ScheduleRollup.objects.filter(scope="class", key="Grade 6", period_start=datetime.date(2026, 5, 5))
+        self.assertFalse(left.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.delete()
+        self.assert_matches_a_rebuild()
+
+    def test_totals(self):
+        self.session(self.teacher, 4, 9, "Grade 5", status="completed", syllabus_coverage=40,
+                     total_students=30, present_students=27)
+        self.session(self.teacher, 5, 9, "Grade 5", status="completed", syllabus_coverage=60,
+                     total_students=30, present_students=21)
+        self.session(self.teacher, 6, 9, "Grade 5")
+        totals = rollups.totals("teacher", self.teacher.pk)
+        self.assertEqual((totals["sessions"], totals["completed"]), (3, 2))
+        self.assertEqual((totals["coverage"], totals["attendance_rate"]), (50.0, 80.0))
+        self.assertEqual(rollups.totals("class", "Grade 5", start=datetime.date(2026, 5, 11))["sessions"], 0)
+
+
+class HomeworkStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        cls.other = CustomUser.objects.create_user("other", "other@example.com", "pass", is_teacher=True)
+        cls.today = datetime.date(2026, 5, 4)
+
+    def setUp(self):
+        cache.clear()
+
+    def homework(self, title, days, teacher=None, **fields):
+        return Homework.objects.create(
+            teacher=teacher or self.teacher, title=title, subject="Maths", class_name="Grade 5",
+            description="", due_date=self.today + datetime.timedelta(days=days), **fields
+        )
+
+    def test_mark_overdue_moves_only_open_past_due_homework(self):
+        late = self.homework("Late", -1)
+        self.homework("Today", 0)
+        self.homework("Reviewed", -3, status="in_review")
+        self.assertEqual(homework.mark_overdue(self.today), 1)
+        self.assertEqual(Homework.objects.get(status="overdue"), late)
+        self.assertEqual(homework.mark_overdue(self.today), 0)
+
+    def test_one_reminder_per_teacher_per_day(self):
+        self.homework("Fractions", 0)
+        self.homework("Decimals", 2)
+        self.homework("Later", 3)
+        self.homework("Essay", 1, teacher=self.other)
+        self.assertEqual(homework.send_reminders(self.today, days=2), 2)
+        self.assertEqual(
+            Notification.objects.get(user=self.teacher).message,
+            "Homework due soon: Fractions (Grade 5, May 04), Decimals (Grade 5, May 06)",
+        )
+        self.assertEqual(homework.send_reminders(self.today, days=2), 0)
+
+    def test_command(self):
+        self.homework("Late", -400)
+        output = io.StringIO()
+        call_command("update_homework_status", "--no-reminders", stdout=output)
+        self.assertIn("1 homework assignments are now overdue.", output.getvalue())
+        self.assertFalse(Notification.objects.exists())
+
+
+class HomeworkSubmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        self.first = make_student("H1", first_name="Asha", student_class="Grade 5", section="A")
+        self.second = make_student("H2", first_name="Bina", student_class="Grade 5", section="B")
+        make_student("H3", student_class=GRADUATED_CLASS)
+        self.class_work = self.homework("Fractions", "Grade 5", 3)
+        self.section_work = self.homework("Decimals", "Grade 5 B", 1)
+
+    def homework(self, title, class_name, days, teacher=None):
+        item = Homework.objects.create(
+            teacher=teacher or self.teacher, title=title, subject="Maths", class_name=class_name,
+            description="", due_date=datetime.date(2026, 5, 4) + datetime.timedelta(days=days),
+        )
+        homework.assign(item)
+        return item
+
+    def counters(self, item):
+        item.refresh_from_db()
+        return item.pending_count, item.completed_count
+
+    def test_assign_covers_the_class_or_section_once(self):
+        self.assertEqual(self.counters(self.class_work), (2, 0))
+        self.assertEqual(self.counters(self.section_work), (1, 0))
+        self.assertEqual(homework.assign(self.class_work), 2)
+        self.assertEqual(HomeworkSubmission.objects.count(), 3)
+
+    def test_status_changes_move_the_counters(self):
+        changed = homework.update_statuses({
+            (self.class_work.pk, self.first.pk): "submitted",
+            (self.class_work.pk, self.second.pk): "excused",
+            (self.section_work.pk, self.second.pk): "lost",
+        })
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.counters(self.class_work), (0, 1))
+        self.assertEqual(homework.completion_rate("Grade 5"), 50.0)
+        self.assertEqual(homework.completion_rate("Grade 5 A"), 100.0)
+        self.assertEqual(
+            homework.matrix([self.class_work, self.section_work], [self.first, self.second]),
+            {
+                self.first.pk: {self.class_work.pk: "submitted"},
+                self.second.pk: {self.class_work.pk: "excused", self.section_work.pk: "pending"},
+            },
+        )
+        self.assertEqual(
+            [submission.homework for submission in homework.outstanding_for(self.second)], [self.section_work]
+        )
+
+    def test_matrix_page_saves_only_the_teachers_own_homework(self):
+        other = CustomUser.objects.create_user("other", "other@example.com", "pass", is_teacher=True)
+        foreign = self.homework("Essay", "Grade 5", 2, teacher=other)
+        self.client.force_login(self.teacher)
+        url = reverse("homework_matrix")
+        response = self.client.get(url, {"class_name": "Grade 5"})
+        self.assertEqual([row[0] for row in response.context["rows"]], [self.first, self.second])
+        self.client.post(f"{url}?class_name=Grade+5", {
+            f"cell_{self.class_work.pk}_{self.first.pk}": "submitted",
+            f"cell_{foreign.pk}_{self.first.pk}": "submitted",
+        })
+        self.assertEqual(self.counters(self.class_work), (1, 1))
+        self.assertEqual(self.counters(foreign), (2, 0))
+
+    def test_student_page_lists_outstanding_homework(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse("view_student", kwargs={"slug": self.second.slug}))
+        self.assertEqual(list(response.context["outstanding_homework"]), list(homework.outstanding_for(self.second)))
+        self.assertContains(response, "Decimals")
+
+
+class SeedDemoDataTests(TestCase):
+    def seed(self, **options):
+        options = {"teachers": 3, "students": 30, "schedules": 4, "homework": 1, "seed": 7, **options}
+        call_command("seed_demo_data", stdout=io.StringIO(), **options)
+
+    def snapshot(self):
+        return (
+            list(Student.objects.order_by("pk").values_list("student_id", "first_name", "student_class", "section")),
+            list(Homework.objects.order_by("pk").values_list("title", "class_name", "due_date")),
+            list(ClassSchedule.objects.order_by("pk").values_list("class_name", "date", "start_time", "topic")),
+        )
+
+    def test_same_seed_same_data(self):
+        self.seed()
+        first = self.snapshot()
+        self.assertEqual(len(first[0]), 30)
+        # Back to an empty database: teachers take schedules and homework with them.
+        Student.objects.all().delete()
+        Parent.objects.all().delete()
+        CustomUser.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_top_up_and_no_double_bookings(self):
+        self.seed(students=10)
+        self.seed(students=25, submissions=True)
+        self.assertEqual(Student.objects.count(), 25)
+        self.assertEqual(CustomUser.objects.filter(is_teacher=True).count(), 3)
+        rows = ClassSchedule.objects.values("id", "teacher_id", "class_name", "date", "start_time", "end_time", "topic")
+        self.assertEqual(ClassSchedule.objects.count(), 12)
+        self.assertEqual(list(conflicts.find_conflicts(list(rows))), [])
+
+
+class RequestInstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        for number in range(3):
+            make_student(f"S{number}")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+        self.addCleanup(instrumentation.stop)
+
+    def test_server_timing_header(self):
+        with self.assertLogs("school.requests", "INFO") as logs:
+            response = self.client.get(reverse("student_list"))
+        header = response["Server-Timing"]
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', header).group(1))
+        self.assertGreater(queries, 0)
+        self.assertRegex(header, r"tpl;dur=[\d.]+, ")
+        self.assertRegex(header, r"total;dur=[\d.]+$")
+        fields = logs.records[-1].request_stats
+        self.assertEqual((fields["view"], fields["status"], fields["queries"]), ("student_list", 200, queries))
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_can_be_turned_off(self):
+        response = self.client.get(reverse("student_list"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_lists_its_queries(self):
+        with self.assertLogs("school.requests.slow", "WARNING") as logs:
+            self.client.get(reverse("student_list"))
+        self.assertIn("Slow request GET /student/ (student_list)", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_repeated_query_shapes(self):
+        stats = instrumentation.start()
+        for student in Student.objects.all():
+            Student.objects.filter(pk=student.pk, first_name="Asha").exists()
+        instrumentation.stop()
+        [(shape, count, seconds)] = stats.repeated(3)
+        self.assertEqual(count, 3)
+        self.assertEqual(stats.queries, 4)
+        self.assertNotIn("Asha", shape)
+        self.assertEqual(
+            instrumentation.sql_shape("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'O''Neil' LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+    def test_cache_and_template_time(self):
+        stats = instrumentation.start()
+        cache.set("present", 1)
+        cache.get("present")
+        cache.get("absent")
+        cache.get_many(["present", "absent", "other"])
+        engines.all()[0].from_string("{% for i in items %}{{ i }}{% endfor %}").render({"items": range(100)})
+        instrumentation.stop()
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 3))
+        self.assertGreater(stats.template_time, 0)
+
+    def test_nothing_is_counted_outside_a_request(self):
+        stats = instrumentation.start()
+        instrumentation.stop()
+        Student.objects.count()
+        cache.get("absent")
+        self.assertEqual((stats.queries, stats.cache_misses), (0, 0))
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN="secret", METRICS_PUBLIC=False)
+class MetricsTests(TestCase):
+    outside = {"REMOTE_ADDR": "203.0.113.5"}
+
+    def scrape(self, **extra):
+        return self.client.get(reverse("prometheus_metrics"), **extra)
+
+    def requests_total(self, app, view, status):
+        return REGISTRY.get_sample_value(
+            "django_http_requests_total", {"app": app, "view": view, "method": "GET", "status": str(status)},
+        ) or 0
+
+    def test_loopback_scrape(self):
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        for name in ("django_http_requests_total", "django_db_queries_per_request", "django_active_sessions"):
+            self.assertIn(name, body)
+
+    def test_closed_to_other_addresses(self):
+        self.assertEqual(self.scrape(**self.outside).status_code, 403)
+        self.assertEqual(self.scrape(headers={"Authorization": "Bearer wrong"}, **self.outside).status_code, 403)
+        self.assertEqual(self.scrape(headers={"Authorization": "Bearer secret"}, **self.outside).status_code, 200)
+        with override_settings(METRICS_PUBLIC=True):
+            self.assertEqual(self.scrape(**self.outside).status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_is_not_a_password(self):
+        self.assertEqual(self.scrape(headers={"Authorization": "Bearer "}, **self.outside).status_code, 403)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.scrape().status_code, 404)
+
+    def test_requests_are_counted_by_view(self):
+        before = self.requests_total("student", "student_list", 302)
+        unresolved = self.requests_total("", "unresolved", 404)
+        self.client.get(reverse("student_list"))
+        self.client.get("/no/such/page/")
+        self.assertEqual(self.requests_total("student", "student_list", 302), before + 1)
+        self.assertEqual(self.requests_total("", "unresolved", 404), unresolved + 1)
+
+    def test_active_sessions(self):
+        teacher = CustomUser.objects.create_user("teacher", "teacher@example.com", "pass", is_teacher=True)
+        self.client.force_login(teacher)
+        self.assertIn("django_active_sessions 1.0", self.scrape().content.decode())
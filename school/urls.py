@@ -7,7 +7,25 @@ urlpatterns = [
     path('teacher/dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
     path('teacher/profile/', views.manage_teacher_profile, name='teacher_profile'),
     path('teacher/schedules/', views.manage_schedules, name='teacher_schedules'),
+    path('teacher/schedules/history/', views.schedule_history, name='schedule_history'),
+    path('teacher/schedules/events/', views.schedule_events, name='schedule_events'),
+    path('teacher/schedules/conflicts/', views.schedule_conflict_report, name='schedule_conflicts'),
+    path('teacher/schedules/<int:pk>/attendance/', views.session_attendance, name='session_attendance'),
+    path('teacher/attendance/mark-class/', views.mark_class_attendance, name='mark_class_attendance'),
     path('teacher/homework/', views.manage_homework, name='teacher_homework'),
+    path('teacher/homework/matrix/', views.homework_matrix, name='homework_matrix'),
+    path('teacher/exams/', views.manage_exams, name='teacher_exams'),
+    path('teacher/exams/<int:pk>/marks/', views.exam_marks, name='exam_marks'),
+    path('teacher/exams/<int:pk>/gradebook/', views.exam_gradebook, name='exam_gradebook'),
+    path('teacher/exams/<int:pk>/report-cards/', views.exam_report_cards, name='exam_report_cards'),
+    path('teacher/report-cards/<int:pk>/progress/', views.report_card_progress, name='report_card_progress'),
+    path('teacher/report-cards/<int:pk>/download/', views.download_report_cards, name='download_report_cards'),
+    path('notification/stream/', views.notification_stream, name='notification_stream'),
+    path('notification/broadcast/', views.broadcast_notification, name='broadcast_notification'),
     path('notification/mark-as-read/', views.mark_notification_as_read, name='mark_notification_as_read'),
     path('notification/clear-all', views.clear_all_notification, name="clear_all_notification"),
+    path('metrics', views.prometheus_metrics, name='prometheus_metrics'),
+    path('profiling/', views.manage_profiling, name='manage_profiling'),
+    path('profiling/<int:pk>/', views.profile_detail, name='profile_detail'),
+    path('profiling/<int:pk>/download/', views.download_profile, name='download_profile'),
 ]
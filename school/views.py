@@ -1,19 +1,41 @@
-from datetime import timedelta
+import json
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Avg
-from django.http import HttpResponseForbidden, JsonResponse
-from django.shortcuts import redirect, render
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.utils import timezone
-from home_auth.models import CustomUser
+from django.utils.http import urlencode
+from django.utils.text import slugify
+from django.views.decorators.http import condition
 from student.models import Student
 from .models import (
     Notification,
     TeacherProfile,
     ClassSchedule,
     Homework,
+    Exam,
+    ExamMark,
+    ExamPaper,
+    ProfilingRule,
+    ReportCardBatch,
+    RequestProfile,
+)
+from .forms import TeacherProfileForm, ClassScheduleForm, HomeworkForm, ExamForm, ProfilingRuleForm
+from . import homework as homework_service
+from . import (
+    attendance, calendar, conflicts, gradebook, metrics, monitoring, notifications, profiling, pubsub,
+    report_cards, rollups,
 )
-from .forms import TeacherProfileForm, ClassScheduleForm, HomeworkForm
 
 
 def index(request):
@@ -28,12 +50,6 @@ def _require_teacher(user):
     return user.is_authenticated and (user.is_teacher or user.is_admin)
 
 
-def _ensure_teacher_profiles():
-    teacher_users = CustomUser.objects.filter(is_teacher=True)
-    for teacher in teacher_users:
-        TeacherProfile.objects.get_or_create(user=teacher)
-
-
 @login_required
 def dashboard(request):
     if not request.user.is_admin:
@@ -42,29 +58,7 @@ def dashboard(request):
         messages.error(request, "You do not have access to the admin dashboard.")
         return redirect("login")
 
-    _ensure_teacher_profiles()
-    today = timezone.localdate()
-    student_count = Student.objects.count()
-    teacher_count = CustomUser.objects.filter(is_teacher=True).count()
-    total_classes = ClassSchedule.objects.count()
-    coverage = (
-        ClassSchedule.objects.filter(status="completed").aggregate(avg=Avg("syllabus_coverage"))["avg"]
-        or 0
-    )
-    upcoming_classes = ClassSchedule.objects.filter(date__gte=today).order_by("date", "start_time")[:5]
-    homework_queue = Homework.objects.order_by("-assigned_on")[:5]
-    teacher_profiles = TeacherProfile.objects.select_related("user").order_by("-updated_at")[:5]
-    recent_students = Student.objects.order_by("-joining_date")[:5]
-    context = {
-        "student_count": student_count,
-        "teacher_count": teacher_count,
-        "total_classes": total_classes,
-        "coverage": round(coverage, 1),
-        "upcoming_classes": upcoming_classes,
-        "homework_queue": homework_queue,
-        "teacher_profiles": teacher_profiles,
-        "recent_students": recent_students,
-    }
+    context = metrics.get_dashboard_metrics()
     return render(request, "Home/index.html", context)
 
 
@@ -74,7 +68,6 @@ def teacher_dashboard(request):
         messages.error(request, "Only teachers can access the teacher workspace.")
         return redirect("login")
 
-    _ensure_teacher_profiles()
     profile, _ = TeacherProfile.objects.get_or_create(user=request.user)
     today = timezone.localdate()
     weekly_range = today - timedelta(days=7)
@@ -82,10 +75,8 @@ def teacher_dashboard(request):
     teacher_classes = ClassSchedule.objects.filter(teacher=request.user)
     upcoming_classes = teacher_classes.filter(date__gte=today).order_by("date", "start_time")[:5]
     recent_history = teacher_classes.filter(date__gte=weekly_range).order_by("-date", "-start_time")[:5]
-    completed_count = teacher_classes.filter(status="completed").count()
-    total_classes = teacher_classes.count()
-    coverage = teacher_classes.aggregate(avg=Avg("syllabus_coverage"))["avg"] or 0
-    total_students = Student.objects.count()
+    summary = rollups.totals("teacher", request.user.pk)
+    total_students = metrics.get_dashboard_metrics(["students"])["student_count"]
 
     homework_list = Homework.objects.filter(teacher=request.user).order_by("due_date")[:5]
     other_teachers = (
@@ -93,15 +84,16 @@ def teacher_dashboard(request):
         .exclude(user=request.user)
         .order_by("user__first_name")[:6]
     )
-    students = Student.objects.select_related("parent").all()[:6]
+    students = Student.objects.active().select_related("parent")[:6]
 
     context = {
         "profile": profile,
         "upcoming_classes": upcoming_classes,
         "recent_history": recent_history,
-        "total_classes": total_classes,
-        "completed_count": completed_count,
-        "coverage": round(coverage, 1),
+        "total_classes": summary["sessions"],
+        "completed_count": summary["completed"],
+        "coverage": summary["coverage"],
+        "attendance_rate": summary["attendance_rate"],
         "total_students": total_students,
         "homework_list": homework_list,
         "other_teachers": other_teachers,
@@ -129,20 +121,88 @@ def manage_schedules(request):
     if not _require_teacher(request.user):
         return HttpResponseForbidden()
 
-    form = ClassScheduleForm(request.POST or None)
+    # The teacher is set up front so model validation can check for
+    # overlapping sessions.
+    form = ClassScheduleForm(request.POST or None, instance=ClassSchedule(teacher=request.user))
     if request.method == "POST" and form.is_valid():
-        schedule = form.save(commit=False)
-        schedule.teacher = request.user
-        schedule.save()
-        messages.success(request, "Class schedule saved.")
-        return redirect("teacher_schedules")
+        try:
+            form.save()
+        except IntegrityError:
+            # A concurrent booking won the race; PostgreSQL's exclusion
+            # constraint rejected this one.
+            form.add_error(None, "This session overlaps another booking.")
+        else:
+            messages.success(request, "Class schedule saved.")
+            return redirect("teacher_schedules")
 
-    schedules = ClassSchedule.objects.filter(teacher=request.user)
-    return render(
-        request,
-        "teachers/manage-schedules.html",
-        {"form": form, "schedules": schedules},
-    )
+    return render(request, "teachers/manage-schedules.html", {"form": form})
+
+
+SCHEDULE_HISTORY_PAGE_SIZE = 25
+
+
+@login_required
+def schedule_history(request):
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+
+    schedules = ClassSchedule.objects.filter(
+        teacher=request.user, date__lt=timezone.localdate()
+    ).order_by("-date", "-start_time")
+    page = Paginator(schedules, SCHEDULE_HISTORY_PAGE_SIZE).get_page(request.GET.get("page"))
+    return render(request, "teachers/schedule-history.html", {"page": page})
+
+
+def _calendar_scope(request):
+    """
+    Return ``(schedules, etag_key)`` for a calendar feed request. Teachers
+    see their own sessions or a whole class; admins may pick any teacher.
+    """
+    start, end = calendar.parse_window(request.GET)
+    class_name = request.GET.get("class_name") or None
+    teacher_id = request.GET.get("teacher")
+    if teacher_id:
+        if not teacher_id.isdigit():
+            raise ValueError("teacher must be a user id.")
+        teacher_id = int(teacher_id)
+        if teacher_id != request.user.pk and not request.user.is_admin:
+            raise PermissionError
+    elif not class_name:
+        teacher_id = request.user.pk
+    else:
+        teacher_id = None
+    key = f"{start}:{end}:{teacher_id}:{class_name}"
+    return calendar.schedules_in_window(start, end, teacher_id, class_name), key
+
+
+def _calendar_etag(request):
+    if not _require_teacher(request.user):
+        return None
+    try:
+        schedules, key = _calendar_scope(request)
+    except (ValueError, PermissionError):
+        return None
+    return calendar.window_etag(schedules, key)
+
+
+@login_required
+@condition(etag_func=_calendar_etag)
+def schedule_events(request):
+    """
+    FullCalendar event feed for the ``[start, end)`` window. Answers 304
+    when the window has not changed since the browser's copy.
+    """
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    try:
+        schedules, _ = _calendar_scope(request)
+    except PermissionError:
+        return HttpResponseForbidden()
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    response = JsonResponse(calendar.events(schedules), safe=False)
+    response["Cache-Control"] = "private, no-cache"
+    return response
 
 
 @login_required
@@ -155,7 +215,8 @@ def manage_homework(request):
         homework = form.save(commit=False)
         homework.teacher = request.user
         homework.save()
-        messages.success(request, "Homework record saved.")
+        assigned = homework_service.assign(homework)
+        messages.success(request, f"Homework assigned to {assigned} students.")
         return redirect("teacher_homework")
 
     homework_items = Homework.objects.filter(teacher=request.user)
@@ -166,11 +227,383 @@ def manage_homework(request):
     )
 
 
+HOMEWORK_MATRIX_COLUMNS = 8
+
+
+@login_required
+def homework_matrix(request):
+    """
+    Students x homework grid for one class, with every cell editable and
+    saved in one bulk update.
+    """
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+
+    homework_items = Homework.objects.all()
+    if not request.user.is_admin:
+        homework_items = homework_items.filter(teacher=request.user)
+    class_names = list(
+        homework_items.order_by("class_name").values_list("class_name", flat=True).distinct()
+    )
+    class_name = request.GET.get("class_name") or (class_names[0] if class_names else "")
+    columns = list(
+        homework_items.filter(class_name=class_name).order_by("-due_date")[:HOMEWORK_MATRIX_COLUMNS]
+    )
+
+    if request.method == "POST":
+        changes = {}
+        for key, value in request.POST.items():
+            parts = key.split("_")
+            if len(parts) == 3 and parts[0] == "cell" and parts[1].isdigit() and parts[2].isdigit():
+                changes[(int(parts[1]), int(parts[2]))] = value
+        changed = homework_service.update_statuses(
+            changes, homework_ids={item.pk for item in columns}
+        )
+        messages.success(request, f"Updated {changed} submissions.")
+        return redirect(f"{request.path}?{urlencode({'class_name': class_name})}")
+
+    students = list(
+        homework_service.class_students(class_name).order_by("first_name", "last_name")
+        .only("pk", "first_name", "last_name", "student_id")
+    )
+    cells = homework_service.matrix(columns, students)
+    rows = [
+        (student, [(item, cells.get(student.pk, {}).get(item.pk)) for item in columns])
+        for student in students
+    ]
+    return render(
+        request,
+        "teachers/homework-matrix.html",
+        {
+            "class_name": class_name,
+            "class_names": class_names,
+            "columns": columns,
+            "rows": rows,
+            "statuses": homework_service.SUBMISSION_STATUSES,
+            "completion_rate": homework_service.completion_rate(class_name) if class_name else 0,
+        },
+    )
+
+
+@login_required
+def manage_exams(request):
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+
+    form = ExamForm(request.POST or None)
+    if request.method == "POST" and form.is_valid():
+        with transaction.atomic():
+            exam = form.save(commit=False)
+            exam.created_by = request.user
+            exam.save()
+            ExamPaper.objects.bulk_create(
+                ExamPaper(exam=exam, subject=subject, max_marks=max_marks)
+                for subject, max_marks in form.cleaned_data["subjects"].items()
+            )
+        messages.success(request, f"{exam.name} created for {exam.grade}.")
+        return redirect("exam_marks", pk=exam.pk)
+
+    exams = Exam.objects.annotate(paper_count=Count("papers"))
+    return render(request, "teachers/manage-exams.html", {"form": form, "exams": exams})
+
+
+@login_required
+def exam_marks(request, pk):
+    """
+    Students x papers mark sheet for one section of the exam's grade, saved
+    in one upsert.
+    """
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    exam = get_object_or_404(Exam, pk=pk)
+    papers = list(exam.papers.all())
+    grade_students = Student.objects.active().filter(student_class=exam.grade)
+    sections = list(grade_students.order_by("section").values_list("section", flat=True).distinct())
+    section = request.GET.get("section") or (sections[0] if sections else "")
+    students = list(
+        grade_students.filter(section=section)
+        .order_by("first_name", "last_name")
+        .only("pk", "first_name", "last_name", "student_id")
+    )
+
+    if request.method == "POST":
+        max_marks = {paper.pk: paper.max_marks for paper in papers}
+        student_ids = {student.pk for student in students}
+        entries, invalid = {}, 0
+        for key, value in request.POST.items():
+            parts = key.split("_")
+            if not (len(parts) == 3 and parts[0] == "mark" and parts[1].isdigit() and parts[2].isdigit()):
+                continue
+            paper_id, student_id = int(parts[1]), int(parts[2])
+            if paper_id not in max_marks or student_id not in student_ids:
+                continue
+            value = value.strip()
+            if not value:
+                entries[(paper_id, student_id)] = None
+                continue
+            try:
+                marks = Decimal(value)
+            except InvalidOperation:
+                invalid += 1
+                continue
+            if not 0 <= marks <= max_marks[paper_id]:
+                invalid += 1
+                continue
+            entries[(paper_id, student_id)] = marks
+        saved = gradebook.record_marks(exam, entries)
+        messages.success(request, f"Saved {saved} marks.")
+        if invalid:
+            messages.warning(request, f"Skipped {invalid} marks outside the allowed range.")
+        return redirect(f"{request.path}?{urlencode({'section': section})}")
+
+    recorded = {
+        (paper_id, student_id): marks
+        for paper_id, student_id, marks in ExamMark.objects.filter(
+            paper__in=papers, student__in=students
+        ).values_list("paper_id", "student_id", "marks")
+    }
+    rows = [
+        (student, [(paper, recorded.get((paper.pk, student.pk))) for paper in papers])
+        for student in students
+    ]
+    return render(
+        request,
+        "teachers/exam-marks.html",
+        {"exam": exam, "papers": papers, "sections": sections, "section": section, "rows": rows},
+    )
+
+
+@login_required
+def exam_gradebook(request, pk):
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    exam = get_object_or_404(Exam, pk=pk)
+    return render(
+        request,
+        "teachers/exam-gradebook.html",
+        {"exam": exam, "results": gradebook.gradebook(exam)},
+    )
+
+
+@login_required
+def exam_report_cards(request, pk):
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    exam = get_object_or_404(Exam, pk=pk)
+
+    if request.method == "POST":
+        batch = ReportCardBatch.objects.create(
+            exam=exam, section=request.POST.get("section", "").strip(), created_by=request.user
+        )
+        report_cards.generate_async(batch)
+        messages.success(request, "Report cards are being generated.")
+        return redirect("exam_report_cards", pk=exam.pk)
+
+    sections = list(
+        ExamMark.objects.filter(paper__exam=exam)
+        .order_by("section")
+        .values_list("section", flat=True)
+        .distinct()
+    )
+    return render(
+        request,
+        "teachers/report-cards.html",
+        {"exam": exam, "sections": sections, "batches": exam.report_batches.all()[:20]},
+    )
+
+
+@login_required
+def report_card_progress(request, pk):
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    batch = get_object_or_404(ReportCardBatch, pk=pk)
+    return JsonResponse({
+        "status": batch.status,
+        "done": batch.done,
+        "total": batch.total,
+        "progress": batch.progress,
+        "error": batch.error,
+    })
+
+
+@login_required
+def download_report_cards(request, pk):
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    batch = get_object_or_404(ReportCardBatch.objects.select_related("exam"), pk=pk)
+    if batch.status != "completed" or not batch.archive:
+        raise Http404("Report cards are not ready yet.")
+    filename = f"{slugify(f'{batch.exam.name} {batch.exam.grade} {batch.section}')}-report-cards.zip"
+    return FileResponse(default_storage.open(batch.archive), as_attachment=True, filename=filename)
+
+
+def _teacher_schedules(user):
+    schedules = ClassSchedule.objects.all()
+    if not user.is_admin:
+        schedules = schedules.filter(teacher=user)
+    return schedules
+
+
+@login_required
+def session_attendance(request, pk):
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    schedule = get_object_or_404(_teacher_schedules(request.user), pk=pk)
+
+    if request.method == "POST":
+        mark_all = request.POST.get("mark_all")
+        if mark_all in attendance.STATUSES:
+            attendance.record([schedule], mark_all)
+        else:
+            statuses = {}
+            for key, value in request.POST.items():
+                if key.startswith("status_") and key[7:].isdigit():
+                    statuses[int(key[7:])] = value if value in attendance.STATUSES else None
+            attendance.record([schedule], statuses)
+        messages.success(request, "Attendance saved.")
+        return redirect("session_attendance", pk=schedule.pk)
+
+    return render(
+        request,
+        "teachers/session-attendance.html",
+        {
+            "schedule": schedule,
+            "marks": attendance.session_marks(schedule),
+            "statuses": attendance.STATUSES,
+        },
+    )
+
+
+@login_required
+def mark_class_attendance(request):
+    """
+    Mark every student in a class with one status for all of the user's
+    sessions with that class on a day.
+    """
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    if request.method != "POST":
+        return HttpResponseForbidden()
+
+    status = request.POST.get("status", "present")
+    class_name = request.POST.get("class_name", "").strip()
+    try:
+        day = date.fromisoformat(request.POST.get("date", ""))
+    except ValueError:
+        return JsonResponse({"error": "date must be an ISO date."}, status=400)
+    if status not in attendance.STATUSES or not class_name:
+        return JsonResponse({"error": "Choose a class and a valid status."}, status=400)
+
+    schedules = _teacher_schedules(request.user).filter(class_name=class_name, date=day)
+    written = attendance.record(schedules, status)
+    return JsonResponse({"status": "success", "sessions": written})
+
+
+TERM_MAX_DAYS = 366
+
+
+@login_required
+def schedule_conflict_report(request):
+    """
+    Every teacher or class double booking among sessions in the
+    ``[start, end)`` term. Admins see all of them, teachers their own.
+    """
+    if not _require_teacher(request.user):
+        return HttpResponseForbidden()
+    try:
+        start, end = calendar.parse_window(request.GET, max_days=TERM_MAX_DAYS)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    teacher_id = None if request.user.is_admin else request.user.pk
+    found = conflicts.term_conflicts(start, end, teacher_id=teacher_id)
+    return JsonResponse(
+        {
+            "start": start,
+            "end": end,
+            "count": len(found),
+            "conflicts": [
+                {
+                    "kind": conflict.kind,
+                    "first": conflict.first,
+                    "second": conflict.second,
+                    "message": conflicts.describe(conflict),
+                }
+                for conflict in found
+            ],
+        }
+    )
+
+
+@login_required
+def broadcast_notification(request):
+    if not request.user.is_admin:
+        return HttpResponseForbidden()
+
+    if request.method == "POST":
+        audience = request.POST.get("audience")
+        message = request.POST.get("message", "").strip()
+        class_name = request.POST.get("class_name", "").strip() or None
+        if audience not in notifications.AUDIENCES or not message:
+            messages.error(request, "Choose an audience and enter a message.")
+            return redirect("broadcast_notification")
+        notifications.notify_async(
+            notifications.audience_recipients(audience, class_name=class_name),
+            message[:255],
+        )
+        messages.success(request, "Notification queued for delivery.")
+        return redirect("broadcast_notification")
+
+    return render(
+        request,
+        "Home/broadcast-notification.html",
+        {"audiences": notifications.AUDIENCES},
+    )
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _notification_events(user_id):
+    heartbeat = getattr(settings, "NOTIFICATION_STREAM_HEARTBEAT", 15)
+    # Subscribe before counting so nothing created in between is missed.
+    async with pubsub.get_broker().subscription(pubsub.channel_for_user(user_id)) as subscription:
+        count = await sync_to_async(notifications.unread_count)(user_id)
+        yield _sse_event("count", {"unread": count})
+        while True:
+            payload = await subscription.get(timeout=heartbeat)
+            if payload is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield _sse_event("notification", payload)
+
+
+@login_required
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's new notifications. Only useful
+    when served through Home.asgi, where an open stream costs a coroutine
+    instead of a worker.
+    """
+    if not notifications.stream_enabled():
+        raise Http404
+    user = await request.auser()
+    response = StreamingHttpResponse(
+        _notification_events(user.pk), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 def mark_notification_as_read(request):
     if request.method == "POST":
         notification = Notification.objects.filter(user=request.user, is_read=False)
         notification.update(is_read=True)
+        notifications.reset_unread_count(request.user.pk)
         return JsonResponse({"status": "success"})
     return HttpResponseForbidden()
 
@@ -180,5 +613,85 @@ def clear_all_notification(request):
     if request.method == "POST":
         notification = Notification.objects.filter(user=request.user)
         notification.delete()
+        notifications.reset_unread_count(request.user.pk)
         return JsonResponse({"status": "success"})
-    return HttpResponseForbidden()
\ No newline at end of file
+    return HttpResponseForbidden()
+
+
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint, for the scrapers ``monitoring.scrape_allowed``
+    lets through.
+    """
+    if not monitoring.enabled():
+        raise Http404
+    if not monitoring.scrape_allowed(request):
+        return HttpResponseForbidden()
+    body, content_type = monitoring.exposition()
+    return HttpResponse(body, content_type=content_type)
+
+
+@login_required
+def manage_profiling(request):
+    """
+    Profiling rules and the profiles they captured. Admins only.
+    """
+    if not request.user.is_admin:
+        return HttpResponseForbidden()
+
+    form = ProfilingRuleForm()
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "create":
+            form = ProfilingRuleForm(request.POST)
+            if form.is_valid():
+                rule = form.save(commit=False)
+                rule.created_by = request.user
+                rule.save()
+                messages.success(request, "Profiling rule added.")
+                return redirect("manage_profiling")
+        elif action == "toggle":
+            rule = get_object_or_404(ProfilingRule, pk=request.POST.get("rule"))
+            rule.enabled = not rule.enabled
+            if rule.enabled and rule.captured >= rule.max_profiles:
+                # Re-enabling a finished rule starts a new round of captures.
+                rule.captured = 0
+            rule.save(update_fields=["enabled", "captured"])
+            return redirect("manage_profiling")
+        elif action == "delete":
+            profiling.delete_profile(get_object_or_404(RequestProfile, pk=request.POST.get("profile")))
+            messages.success(request, "Profile deleted.")
+            return redirect("manage_profiling")
+
+    page = Paginator(
+        RequestProfile.objects.select_related("user").defer("summary"), 25
+    ).get_page(request.GET.get("page"))
+    return render(request, "Home/profiling.html", {
+        "form": form,
+        "rules": ProfilingRule.objects.select_related("user"),
+        "page": page,
+    })
+
+
+@login_required
+def profile_detail(request, pk):
+    if not request.user.is_admin:
+        return HttpResponseForbidden()
+    item = get_object_or_404(RequestProfile.objects.select_related("user", "rule"), pk=pk)
+    return render(request, "Home/profile-detail.html", {"profile": item})
+
+
+@login_required
+def download_profile(request, pk):
+    """
+    The raw profile: pstats data (``.prof``, for snakeviz or ``pstats``) or
+    folded stacks (``.folded``, for speedscope or flamegraph.pl).
+    """
+    if not request.user.is_admin:
+        return HttpResponseForbidden()
+    item = get_object_or_404(RequestProfile, pk=pk)
+    if not default_storage.exists(item.file):
+        raise Http404("The profile file is missing.")
+    name = slugify(f"{item.view_name or item.path} {item.created_at:%Y%m%d-%H%M%S}")
+    filename = f"{name}.{item.file.rpartition('.')[2]}"
+    return FileResponse(default_storage.open(item.file), as_attachment=True, filename=filename)
@@ -0,0 +1,102 @@
+import csv
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .importer import PARENT_COLUMNS, STUDENT_COLUMNS
+from .models import Student
+from .roster import filter_students
+
+
+# Export column name -> queryset lookup. Names match the importer headers so
+# an export can be re-imported as is.
+EXPORT_COLUMNS = {name: name for name in STUDENT_COLUMNS}
+EXPORT_COLUMNS.update({name: f"parent__{name}" for name in PARENT_COLUMNS})
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    File-like object whose ``write`` hands the value straight back, so
+    ``csv.writer`` can feed a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def get_chunk_size():
+    return getattr(settings, "STUDENT_EXPORT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+
+def parse_columns(value):
+    """
+    Validate a comma separated column list, defaulting to every column.
+    """
+    if not value:
+        return list(EXPORT_COLUMNS)
+    columns = [column.strip() for column in value.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    return columns
+
+
+def iter_values(columns, filters, chunk_size=None):
+    """
+    Yield one tuple per student, fetched ``chunk_size`` rows at a time.
+    """
+    queryset = filter_students(Student.objects.all(), filters)
+    lookups = [EXPORT_COLUMNS[column] for column in columns]
+    return queryset.order_by("pk").values_list(*lookups).iterator(
+        chunk_size=chunk_size or get_chunk_size()
+    )
+
+
+def iter_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def write_xlsx(columns, rows, fileobj):
+    """
+    Write rows into ``fileobj`` with openpyxl's write-only mode, which
+    spools rows to disk instead of holding the sheet in memory.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:
+        raise ValueError("XLSX export requires the openpyxl package.") from exc
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Students")
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def export_xlsx_file(columns, rows):
+    """
+    Return a rewound temporary file containing the XLSX export. The zip
+    container can only be finalised once every row is written, so XLSX is
+    built on disk first and streamed afterwards.
+    """
+    fileobj = tempfile.TemporaryFile()
+    write_xlsx(columns, rows, fileobj)
+    fileobj.seek(0)
+    return fileobj
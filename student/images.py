@@ -0,0 +1,152 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+from .models import Student
+
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> (width, height, crop). Thumbnails are square crops sized
+# for the 32px list avatar at 2x density; medium fits the detail card.
+VARIANTS = {
+    "thumb": (64, 64, True),
+    "medium": (480, 480, False),
+}
+# Output format -> (file extension, Pillow save options).
+FORMATS = {
+    "webp": ("webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+}
+VARIANT_DIR = "students/variants"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(source_name, variant, fmt):
+    # The whole source name, directories and extension included: storage
+    # keeps source names unique, while photo.jpg and photo.png share a stem.
+    extension = FORMATS[fmt][0]
+    return f"{VARIANT_DIR}/{source_name}_{variant}.{extension}"
+
+
+def variant_names(source_name, variants=None):
+    """
+    Storage names of every variant of ``source_name``: the names derived
+    from it, plus those recorded in ``variants`` when they belong to it.
+    """
+    names = {variant_name(source_name, variant, fmt) for variant in VARIANTS for fmt in FORMATS}
+    if variants and variants.get("source") == source_name:
+        names.update(
+            name
+            for variant, formats in variants.items()
+            if variant != "source"
+            for name in formats.values()
+        )
+    return names
+
+
+def delete_variants(names, storage=default_storage):
+    for name in names:
+        try:
+            if storage.exists(name):
+                storage.delete(name)
+        except OSError:
+            logger.exception("Could not delete image variant %s", name)
+
+
+def _render(image, size, crop):
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    return resized
+
+
+def generate_variants(source_name, storage=default_storage):
+    """
+    Write every size/format variant of ``source_name`` and return a mapping
+    of ``{variant: {format: storage name}}``. EXIF orientation is applied to
+    the pixels and no metadata is copied into the variants.
+    """
+    with storage.open(source_name, "rb") as fileobj:
+        with Image.open(fileobj) as original:
+            image = ImageOps.exif_transpose(original).convert("RGB")
+
+    variants = {}
+    for variant, (width, height, crop) in VARIANTS.items():
+        rendered = _render(image, (width, height), crop)
+        variants[variant] = {}
+        for fmt, (_, options) in FORMATS.items():
+            buffer = BytesIO()
+            rendered.save(buffer, **options)
+            name = variant_name(source_name, variant, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[variant][fmt] = storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def process_student_image(student_pk, source_name):
+    """
+    Generate variants for one student and record them, unless the image was
+    replaced (or the student deleted) in the meantime; the new variants are
+    then removed again.
+    """
+    try:
+        variants = generate_variants(source_name)
+    except Exception:
+        logger.exception("Could not generate image variants for %s", source_name)
+        return False
+    variants["source"] = source_name
+    if not Student.objects.filter(pk=student_pk, student_image=source_name).update(image_variants=variants):
+        delete_variants(variant_names(source_name, variants))
+        return False
+    return True
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "STUDENT_IMAGE_WORKERS", 2),
+                thread_name_prefix="student-images",
+            )
+    return _executor
+
+
+def schedule_student_image(student_pk, source_name):
+    """
+    Process an uploaded image in the worker pool, off the request path.
+    With ``STUDENT_IMAGE_WORKERS = 0`` the work runs inline instead.
+    """
+    if getattr(settings, "STUDENT_IMAGE_WORKERS", 2) <= 0:
+        return process_student_image(student_pk, source_name)
+    return get_executor().submit(process_in_worker, student_pk, source_name)
+
+
+def process_in_worker(student_pk, source_name):
+    try:
+        return process_student_image(student_pk, source_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_variant_cleanup(source_name, variants=None):
+    """
+    Delete the variants of a photo that was replaced or removed, in the
+    worker pool like their generation.
+    """
+    names = variant_names(source_name, variants)
+    if getattr(settings, "STUDENT_IMAGE_WORKERS", 2) <= 0:
+        return delete_variants(names)
+    return get_executor().submit(delete_variants, names)
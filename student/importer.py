@@ -0,0 +1,231 @@
+import csv
+import datetime
+import io
+import os
+import zipfile
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils.text import slugify
+
+from school import metrics
+from .models import Parent, Student
+
+
+STUDENT_COLUMNS = [
+    "first_name",
+    "last_name",
+    "student_id",
+    "gender",
+    "date_of_birth",
+    "student_class",
+    "religion",
+    "joining_date",
+    "mobile_number",
+    "admission_number",
+    "section",
+]
+PARENT_COLUMNS = [
+    "father_name",
+    "father_occupation",
+    "father_mobile",
+    "father_email",
+    "mother_name",
+    "mother_occupation",
+    "mother_mobile",
+    "mother_email",
+    "present_address",
+    "permanent_address",
+]
+COLUMNS = STUDENT_COLUMNS + PARENT_COLUMNS
+DEFAULT_BATCH_SIZE = 500
+# Row key for the values past the last header column.
+EXTRA_COLUMNS = "__extra__"
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)
+    # Why the file could not be read to the end; the rows before it are
+    # still imported.
+    failure: str = ""
+
+    def add_error(self, line, messages):
+        self.errors.append((line, messages))
+
+
+def get_batch_size():
+    return getattr(settings, "STUDENT_IMPORT_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+
+def _iter_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text, restkey=EXTRA_COLUMNS)
+    try:
+        for row in reader:
+            extra = row.pop(EXTRA_COLUMNS, None)
+            cleaned = {(key or "").strip(): (value or "").strip() for key, value in row.items()}
+            if extra is not None:
+                cleaned[EXTRA_COLUMNS] = extra
+            yield cleaned
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ValueError(f"Could not read the CSV file after line {reader.line_num}: {exc}") from exc
+    finally:
+        text.detach()
+
+
+def _cell_to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        # Numeric IDs and phone numbers come back from Excel as floats.
+        return str(int(value))
+    return str(value).strip()
+
+
+def _iter_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError as exc:
+        raise ValueError("XLSX import requires the openpyxl package.") from exc
+
+    # A damaged workbook fails as a bad zip, a missing part (KeyError) or
+    # malformed XML (a SyntaxError), either when opened or while rows are read.
+    unreadable = (zipfile.BadZipFile, InvalidFileException, KeyError, SyntaxError)
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except unreadable as exc:
+        raise ValueError("The file is not a readable XLSX workbook.") from exc
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell or "").strip() for cell in next(rows, ())]
+        for values in rows:
+            yield {key: _cell_to_text(value) for key, value in zip(header, values)}
+    except unreadable as exc:
+        raise ValueError("The XLSX workbook is damaged and could not be read to the end.") from exc
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj, filename):
+    """
+    Yield one dict per data row of a CSV or XLSX file without loading the
+    whole file into memory.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        return _iter_csv(fileobj)
+    if extension == ".xlsx":
+        return _iter_xlsx(fileobj)
+    raise ValueError("Only .csv and .xlsx files can be imported.")
+
+
+def _clean(model, columns, row):
+    cleaned, errors = {}, []
+    for name in columns:
+        model_field = model._meta.get_field(name)
+        value = row.get(name, "")
+        try:
+            cleaned[name] = model_field.clean(value, None)
+        except ValidationError as exc:
+            errors.extend(f"{name}: {message}" for message in exc.messages)
+    return cleaned, errors
+
+
+def validate_row(row):
+    """
+    Return ``(student_data, parent_data, errors)`` for one input row.
+    """
+    student_data, student_errors = _clean(Student, STUDENT_COLUMNS, row)
+    parent_data, parent_errors = _clean(Parent, PARENT_COLUMNS, row)
+    errors = student_errors + parent_errors
+    if EXTRA_COLUMNS in row:
+        errors.insert(0, f"Too many columns: {len(row[EXTRA_COLUMNS])} more than the header.")
+    return student_data, parent_data, errors
+
+
+def _write_batch(batch, result, dry_run=False):
+    """
+    Insert a batch of validated rows, skipping student IDs that already
+    exist. Each batch commits or rolls back on its own.
+    """
+    existing = set(
+        Student.objects.filter(student_id__in=[item[1]["student_id"] for item in batch])
+        .values_list("student_id", flat=True)
+    )
+    pending = []
+    for line, student_data, parent_data in batch:
+        if student_data["student_id"] in existing:
+            result.add_error(line, ["student_id: A student with this ID already exists."])
+        else:
+            pending.append((line, student_data, parent_data))
+    if not pending:
+        return
+    if dry_run:
+        result.created += len(pending)
+        return
+
+    try:
+        with transaction.atomic():
+            parents = Parent.objects.bulk_create(
+                [Parent(**parent_data) for _, _, parent_data in pending]
+            )
+            students = []
+            for (_, student_data, _), parent in zip(pending, parents):
+                student = Student(parent=parent, **student_data)
+                student.slug = slugify(f"{student.first_name}-{student.last_name}-{student.student_id}")
+                students.append(student)
+            Student.objects.bulk_create(students)
+    except DatabaseError as exc:
+        for line, _, _ in pending:
+            result.add_error(line, [f"Batch rejected by the database: {exc}"])
+        return
+    result.created += len(pending)
+
+
+def import_students(rows, batch_size=None, dry_run=False):
+    """
+    Validate ``rows`` and bulk insert Parent/Student pairs in batches of
+    ``batch_size``. Invalid rows are reported in the result and skipped. A
+    file that cannot be read to the end (``ValueError`` from ``rows``) stops
+    the import with ``result.failure`` set; the rows read before it are
+    still written, and ``result.created`` counts every committed batch.
+    """
+    batch_size = batch_size or get_batch_size()
+    result = ImportResult()
+    seen_ids = set()
+    batch = []
+    try:
+        try:
+            # Line 1 is the header row.
+            for line, row in enumerate(rows, start=2):
+                student_data, parent_data, errors = validate_row(row)
+                student_id = student_data.get("student_id")
+                if student_id in seen_ids:
+                    errors.append("student_id: Duplicate ID earlier in this file.")
+                if errors:
+                    result.add_error(line, errors)
+                    continue
+                seen_ids.add(student_id)
+                batch.append((line, student_data, parent_data))
+                if len(batch) >= batch_size:
+                    _write_batch(batch, result, dry_run)
+                    batch = []
+        except ValueError as exc:
+            result.failure = str(exc)
+        if batch:
+            _write_batch(batch, result, dry_run)
+    finally:
+        if result.created and not dry_run:
+            # bulk_create skips post_save, so refresh the dashboard explicitly,
+            # even when a later batch raised.
+            metrics.invalidate("students")
+    return result
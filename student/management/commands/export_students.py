@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student import exporter
+
+
+class Command(BaseCommand):
+    help = "Export the student and parent roster as CSV, XLSX or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=sorted(exporter.FORMATS),
+            default="csv",
+            help="Output format (default: csv)",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write to (default: stdout; required for xlsx)",
+        )
+        parser.add_argument(
+            "--columns",
+            help="Comma separated list of columns to export (default: all)",
+        )
+        parser.add_argument("--class", dest="student_class", help="Only export this class")
+        parser.add_argument("--section", help="Only export this section")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=exporter.get_chunk_size(),
+            help="Rows fetched per query (default: STUDENT_EXPORT_CHUNK_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            columns = exporter.parse_columns(options["columns"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        filters = {
+            "student_class": options["student_class"],
+            "section": options["section"],
+        }
+        rows = exporter.iter_values(columns, filters, chunk_size=options["chunk_size"])
+        export_format = options["format"]
+        output = options["output"]
+
+        if export_format == "xlsx":
+            if not output:
+                raise CommandError("--output is required for xlsx exports.")
+            try:
+                with open(output, "wb") as fileobj:
+                    exporter.write_xlsx(columns, rows, fileobj)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            return
+
+        stream = exporter.iter_jsonl(columns, rows) if export_format == "jsonl" else exporter.iter_csv(columns, rows)
+        if output:
+            with open(output, "w", newline="", encoding="utf-8") as fileobj:
+                fileobj.writelines(stream)
+        else:
+            for chunk in stream:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from student.images import process_in_worker
+from student.models import Student
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail and medium variants for existing student photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=max(getattr(settings, "STUDENT_IMAGE_WORKERS", 2), 1),
+            help="Worker threads (default: STUDENT_IMAGE_WORKERS)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants even when they are already up to date",
+        )
+
+    def handle(self, *args, **options):
+        rows = (
+            Student.objects.exclude(student_image="")
+            .values_list("pk", "student_image", "image_variants")
+            .iterator(chunk_size=1000)
+        )
+        pending = (
+            (pk, name)
+            for pk, name, variants in rows
+            if options["force"] or (variants or {}).get("source") != name
+        )
+
+        processed = failed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for ok in executor.map(lambda item: process_in_worker(*item), pending):
+                if ok:
+                    processed += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated variants for {processed} students ({failed} failed).")
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student import importer
+
+
+class Command(BaseCommand):
+    help = "Bulk import students and parents from a CSV or XLSX file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the .csv or .xlsx file to import")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=importer.get_batch_size(),
+            help="Rows written per transaction (default: STUDENT_IMPORT_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the file without writing anything",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            with open(path, "rb") as fileobj:
+                rows = importer.iter_rows(fileobj, path)
+                result = importer.import_students(
+                    rows,
+                    batch_size=options["batch_size"],
+                    dry_run=options["dry_run"],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for line, errors in result.errors:
+            self.stderr.write(f"Line {line}: {'; '.join(errors)}")
+        if result.failure:
+            self.stderr.write(f"The import stopped early: {result.failure}")
+
+        verb = "validated" if options["dry_run"] else "imported"
+        self.stdout.write(
+            self.style.SUCCESS(f"{result.created} students {verb}, {len(result.errors)} rows rejected.")
+        )
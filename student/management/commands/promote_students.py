@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student import promotion
+from student.models import PromotionRun
+
+
+class Command(BaseCommand):
+    help = "Move every student up one grade and archive final-grade graduates. Previews unless --apply is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rule",
+            action="append",
+            default=[],
+            help='Section rule, e.g. "Grade 6: 3" or "Grade 9: C>A" (repeatable)',
+        )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Apply the promotion instead of only printing the preview",
+        )
+        parser.add_argument(
+            "--undo",
+            type=int,
+            metavar="RUN_ID",
+            help="Undo an earlier promotion run",
+        )
+
+    def handle(self, *args, **options):
+        if options["undo"]:
+            try:
+                promotion.undo(PromotionRun.objects.get(pk=options["undo"]))
+            except PromotionRun.DoesNotExist:
+                raise CommandError(f"Promotion run {options['undo']} does not exist.")
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(f"Promotion run {options['undo']} undone."))
+            return
+
+        try:
+            rules = promotion.Rules.parse(options["rule"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        moves, unchanged = promotion.plan(rules)
+        for move in moves:
+            self.stdout.write(
+                f"{move['from_class']} {move['from_section']} -> "
+                f"{move['to_class']} {move['to_section']}: {move['students']}"
+            )
+        for group in unchanged:
+            self.stdout.write(f"Unchanged: {group['student_class']} {group['section']}: {group['students']}")
+
+        if not options["apply"]:
+            self.stdout.write("Dry run; pass --apply to promote.")
+            return
+        try:
+            run = promotion.apply(rules)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Promotion run {run.pk} applied; {run.graduates.count()} students graduated."
+            )
+        )
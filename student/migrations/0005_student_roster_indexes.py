@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0004_alter_parent_father_mobile_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_id', 'id'], name='student_student_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['first_name', 'id'], name='student_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['student_class', 'section', 'id'], name='student_class_section_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['date_of_birth', 'id'], name='student_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['gender'], name='student_gender_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+# (table, trigger columns, trigram-indexed columns)
+SEARCH_TABLES = [
+    (
+        "student_student",
+        ["first_name", "last_name", "student_id", "admission_number", "student_class"],
+        ["first_name", "last_name"],
+    ),
+    (
+        "student_parent",
+        ["father_name", "mother_name", "father_mobile", "mother_mobile", "father_email", "mother_email"],
+        ["father_name", "mother_name"],
+    ),
+]
+
+
+def create_search_infrastructure(apps, schema_editor):
+    # tsvector triggers and GIN indexes are PostgreSQL only; on SQLite the
+    # search module falls back to plain lookups.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, columns, trigram_columns in SEARCH_TABLES:
+        column_list = ", ".join(columns)
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_search_vector_update BEFORE INSERT OR UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION "
+            f"tsvector_update_trigger(search_vector, 'pg_catalog.simple', {column_list})"
+        )
+        document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+        schema_editor.execute(
+            f"UPDATE {table} SET search_vector = to_tsvector('pg_catalog.simple', {document})"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {table}_search_vector_gin ON {table} USING gin (search_vector)"
+        )
+        for column in trigram_columns:
+            schema_editor.execute(
+                f"CREATE INDEX {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def drop_search_infrastructure(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, _, trigram_columns in SEARCH_TABLES:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table}")
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_vector_gin")
+        for column in trigram_columns:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0005_student_roster_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='parent',
+            name='search_vector',
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='search_vector',
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_infrastructure, drop_search_infrastructure),
+    ]
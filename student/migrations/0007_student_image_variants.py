@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0006_student_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
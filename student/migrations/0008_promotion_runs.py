@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0007_student_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromotionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('applied', 'Applied'), ('undone', 'Undone')], default='applied', max_length=10)),
+                ('summary', models.JSONField(default=list)),
+                ('snapshot', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('undone_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Graduate',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='graduation', serialize=False, to='student.student')),
+                ('final_class', models.CharField(max_length=50)),
+                ('final_section', models.CharField(max_length=10)),
+                ('graduated_on', models.DateField()),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='graduates', to='student.promotionrun')),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_academic_year(apps, schema_editor):
+    PromotionRun = apps.get_model("student", "PromotionRun")
+    for run in PromotionRun.objects.only("pk", "created_at"):
+        PromotionRun.objects.filter(pk=run.pk).update(academic_year=run.created_at.year)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0008_promotion_runs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotionrun',
+            name='academic_year',
+            field=models.PositiveIntegerField(default=2026),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_academic_year, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='promotionrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'applied')), fields=('academic_year',), name='promotion_run_once_per_year'),
+        ),
+    ]
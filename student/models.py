@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.text import slugify
 from django.utils.crypto import get_random_string
@@ -5,6 +7,19 @@ from django.utils.crypto import get_random_string
 
 from django.db import models
 
+# Class of the students who finished the final grade (see student.promotion).
+# They keep their rows for marks and attendance but are no longer enrolled.
+GRADUATED_CLASS = "Graduated"
+
+
+class StudentQuerySet(models.QuerySet):
+    def active(self):
+        """
+        Students still enrolled, i.e. everyone but the graduates.
+        """
+        return self.exclude(student_class=GRADUATED_CLASS)
+
+
 class Parent(models.Model):
     father_name = models.CharField(max_length=100)
     father_occupation = models.CharField(max_length=100, blank=True)
@@ -16,6 +31,8 @@ class Parent(models.Model):
     mother_email = models.EmailField(max_length=100)
     present_address = models.TextField()
     permanent_address = models.TextField()
+    # Maintained by a database trigger on PostgreSQL (see migration 0006).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return f"{self.father_name} & {self.mother_name}"
@@ -33,13 +50,92 @@ class Student(models.Model):
     admission_number = models.CharField(max_length=20)
     section = models.CharField(max_length=10)
     student_image = models.ImageField(upload_to='students/', blank=True)
+    # {"source": name, "thumb": {"webp": name, "jpeg": name}, "medium": {...}}
+    # filled in by student.images once the resized copies exist.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     parent = models.OneToOneField(Parent, on_delete=models.CASCADE)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
+    # Maintained by a database trigger on PostgreSQL (see migration 0006).
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = StudentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["student_id", "id"], name="student_student_id_idx"),
+            models.Index(fields=["first_name", "id"], name="student_first_name_idx"),
+            models.Index(fields=["student_class", "section", "id"], name="student_class_section_idx"),
+            models.Index(fields=["date_of_birth", "id"], name="student_dob_idx"),
+            models.Index(fields=["gender"], name="student_gender_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         desired_slug = slugify(f"{self.first_name}-{self.last_name}-{self.student_id}")
         if not self.slug or self.slug != desired_slug:
             self.slug = desired_slug
         super(Student, self).save(*args, **kwargs)
+
+    @property
+    def image_variant_urls(self):
+        """
+        URLs of the resized copies of ``student_image``, keyed by variant and
+        format. Empty until the variants for the current image are ready.
+        """
+        variants = self.image_variants or {}
+        if not self.student_image or variants.get("source") != self.student_image.name:
+            return {}
+        storage = self.student_image.storage
+        return {
+            variant: {fmt: storage.url(name) for fmt, name in formats.items()}
+            for variant, formats in variants.items()
+            if variant != "source"
+        }
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name} ({self.student_id})"
+
+class PromotionRun(models.Model):
+    STATUS_CHOICES = (
+        ("applied", "Applied"),
+        ("undone", "Undone"),
+    )
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="applied")
+    # Calendar year of the promotion; at most one applied run per year.
+    academic_year = models.PositiveIntegerField()
+    # [{"from_class", "from_section", "to_class", "to_section", "students"}, ...]
+    summary = models.JSONField(default=list)
+    # Undo snapshot: [[class, section, [student pk, ...]], ...] as before the run.
+    snapshot = models.JSONField(default=list)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    undone_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["academic_year"],
+                condition=models.Q(status="applied"),
+                name="promotion_run_once_per_year",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Promotion {self.created_at:%Y-%m-%d} ({self.status})"
+
+
+class Graduate(models.Model):
+    """
+    Archive entry for a student who finished the final grade. The student
+    row is kept (under the "Graduated" class) so marks and attendance stay
+    attached.
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name="graduation")
+    run = models.ForeignKey(PromotionRun, on_delete=models.CASCADE, related_name="graduates")
+    final_class = models.CharField(max_length=50)
+    final_section = models.CharField(max_length=10)
+    graduated_on = models.DateField()
+
     def __str__(self):
-        return f"{self.first_name} {self.last_name} ({self.student_id})"
\ No newline at end of file
+        return f"{self.student} ({self.graduated_on:%Y})"
@@ -0,0 +1,220 @@
+import re
+import string
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from school import gradebook, metrics
+from .models import GRADUATED_CLASS, Graduate, PromotionRun, Student
+
+
+GRADE_PATTERN = re.compile(r"^Grade (\d+)$")
+FINAL_GRADE = 12
+SECTION_NAMES = string.ascii_uppercase
+
+
+class Rules:
+    """
+    Section rules for the grade students move into: ``section_maps`` renames
+    arriving sections (``{"Grade 6": {"C": "A"}}``) and ``rebalance``
+    spreads the arriving students evenly over N sections
+    (``{"Grade 6": 3}``). Unlisted grades keep their sections.
+    """
+
+    def __init__(self, section_maps=None, rebalance=None):
+        self.section_maps = section_maps or {}
+        self.rebalance = rebalance or {}
+
+    @classmethod
+    def parse(cls, lines):
+        """
+        Build rules from lines like ``Grade 6: 3`` (rebalance into three
+        sections) or ``Grade 6: B>A, C>A`` (merge B and C into A). Raises
+        ValueError on anything else.
+        """
+        rules = cls()
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            grade, _, spec = line.partition(":")
+            grade, spec = grade.strip(), spec.strip()
+            if not GRADE_PATTERN.match(grade) or not spec:
+                raise ValueError(f"Invalid rule: {line}")
+            if spec.isdigit():
+                if not 1 <= int(spec) <= len(SECTION_NAMES):
+                    raise ValueError(f"Invalid number of sections: {line}")
+                rules.rebalance[grade] = int(spec)
+                continue
+            mapping = {}
+            for pair in spec.split(","):
+                old, separator, new = pair.partition(">")
+                if not separator or not old.strip() or not new.strip():
+                    raise ValueError(f"Invalid section mapping: {line}")
+                mapping[old.strip()] = new.strip()[:10]
+            rules.section_maps[grade] = mapping
+        return rules
+
+
+def next_class(student_class):
+    """
+    The class a student moves to, ``GRADUATED_CLASS`` after the final
+    grade, or None for classes outside the "Grade N" scheme.
+    """
+    match = GRADE_PATTERN.match(student_class)
+    if not match:
+        return None
+    grade = int(match.group(1))
+    return GRADUATED_CLASS if grade >= FINAL_GRADE else f"Grade {grade + 1}"
+
+
+def plan(rules=None):
+    """
+    Dry run: one move per current class and section, from a single grouped
+    query. Each move is ``{"from_class", "from_section", "to_class",
+    "to_section", "students"}``; rebalanced sections show as ``"1..N"``.
+    Classes outside the grade scheme are returned separately, unchanged.
+    """
+    rules = rules or Rules()
+    moves, unchanged = [], []
+    groups = (
+        Student.objects.active()
+        .order_by("student_class", "section")
+        .values("student_class", "section")
+        .annotate(students=Count("id"))
+    )
+    for group in groups:
+        target = next_class(group["student_class"])
+        if target is None:
+            unchanged.append(group)
+            continue
+        if target in rules.rebalance:
+            section = f"A..{SECTION_NAMES[rules.rebalance[target] - 1]}"
+        else:
+            section = rules.section_maps.get(target, {}).get(group["section"], group["section"])
+        moves.append({
+            "from_class": group["student_class"],
+            "from_section": group["section"],
+            "to_class": target,
+            "to_section": section,
+            "students": group["students"],
+        })
+    moves.sort(key=lambda move: (int(GRADE_PATTERN.match(move["from_class"]).group(1)), move["from_section"]))
+    return moves, unchanged
+
+
+def _rebalance(grade, count, student_ids):
+    """
+    Deal the students arriving in ``grade`` round-robin, in name order,
+    into ``count`` sections: one UPDATE per section.
+    """
+    ordered = list(
+        Student.objects.filter(pk__in=student_ids, student_class=grade)
+        .order_by("last_name", "first_name", "pk")
+        .values_list("pk", flat=True)
+    )
+    for index in range(count):
+        Student.objects.filter(pk__in=ordered[index::count]).update(section=SECTION_NAMES[index])
+
+
+def apply(rules=None, user=None, today=None):
+    """
+    Promote every student one grade and archive those leaving the final
+    grade, inside one transaction. Raises ValueError when a run is already
+    applied for ``today``'s year, so a resubmitted or concurrent apply
+    cannot promote everyone twice:
+
+    * the current class/section of everyone moving is stored as the run's
+      undo snapshot;
+    * graduates are added to the archive with one INSERT;
+    * classes and mapped sections change in a single CASE ``UPDATE``;
+    * rebalanced grades cost one more ``UPDATE`` per section.
+
+    Returns the ``PromotionRun``.
+    """
+    rules = rules or Rules()
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        # Claimed first: the conditional unique constraint makes a second
+        # apply for the year fail (or wait for the first to roll back)
+        # before any student row is read.
+        try:
+            with transaction.atomic():
+                run = PromotionRun.objects.create(academic_year=today.year, created_by=user)
+        except IntegrityError:
+            raise ValueError(f"Students were already promoted in {today.year}; undo that run first.")
+
+        moves, _ = plan(rules)
+        classes = sorted({move["from_class"] for move in moves})
+        moving = Student.objects.select_for_update().filter(student_class__in=classes)
+
+        snapshot = defaultdict(list)
+        for pk, student_class, section in moving.values_list("pk", "student_class", "section"):
+            snapshot[(student_class, section)].append(pk)
+        run.summary = moves
+        run.snapshot = [[student_class, section, pks] for (student_class, section), pks in snapshot.items()]
+        run.save(update_fields=["summary", "snapshot"])
+
+        final = [student_class for student_class in classes if next_class(student_class) == GRADUATED_CLASS]
+        Graduate.objects.bulk_create(
+            Graduate(
+                student_id=pk, run=run, final_class=student_class, final_section=section,
+                graduated_on=today,
+            )
+            for (student_class, section), pks in snapshot.items()
+            if student_class in final
+            for pk in pks
+        )
+
+        section_rules = [
+            When(Q(student_class=previous, section=old), then=Value(new))
+            for previous in classes
+            for old, new in rules.section_maps.get(next_class(previous), {}).items()
+        ]
+        moving.update(
+            student_class=Case(
+                *(When(student_class=previous, then=Value(next_class(previous))) for previous in classes),
+                default=F("student_class"),
+            ),
+            section=Case(*section_rules, default=F("section")) if section_rules else F("section"),
+        )
+
+        for grade, count in rules.rebalance.items():
+            arriving = [
+                pk
+                for (student_class, _), pks in snapshot.items()
+                if next_class(student_class) == grade
+                for pk in pks
+            ]
+            _rebalance(grade, count, arriving)
+
+        # update() sends no post_save, so the dashboard and the gradebooks
+        # are refreshed here.
+        transaction.on_commit(lambda: metrics.invalidate("students"))
+        gradebook.invalidate_students([pk for pks in snapshot.values() for pk in pks])
+    return run
+
+
+def undo(run):
+    """
+    Put every student of ``run`` back in the class and section recorded in
+    its snapshot and drop its graduates from the archive. Only the latest
+    applied run can be undone. Manual edits made since the run are
+    overwritten for the students it moved.
+    """
+    if run.status != "applied":
+        raise ValueError("This promotion has already been undone.")
+    if PromotionRun.objects.filter(status="applied", created_at__gt=run.created_at).exists():
+        raise ValueError("Undo the later promotions first.")
+    with transaction.atomic():
+        for student_class, section, pks in run.snapshot:
+            Student.objects.filter(pk__in=pks).update(student_class=student_class, section=section)
+        run.graduates.all().delete()
+        run.status = "undone"
+        run.undone_at = timezone.now()
+        run.save(update_fields=["status", "undone_at"])
+        transaction.on_commit(lambda: metrics.invalidate("students"))
+        gradebook.invalidate_students([pk for _, _, pks in run.snapshot for pk in pks])
+    return run
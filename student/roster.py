@@ -0,0 +1,120 @@
+import base64
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.templatetags.static import static
+from django.urls import reverse
+
+from .models import GRADUATED_CLASS
+
+
+# DataTables column index -> indexed model field used for ordering.
+ORDERABLE_COLUMNS = {
+    0: "student_id",
+    1: "first_name",
+    2: "student_class",
+    3: "date_of_birth",
+}
+DEFAULT_ORDER_FIELD = "student_id"
+FILTER_FIELDS = ("student_class", "section", "gender")
+MAX_PAGE_LENGTH = 100
+
+
+def filter_students(queryset, params):
+    """
+    Apply the class/section/gender filters from a request's GET params.
+    Graduates are left out unless their class is asked for.
+    """
+    if params.get("student_class") != GRADUATED_CLASS:
+        queryset = queryset.active()
+    for field in FILTER_FIELDS:
+        value = params.get(field)
+        if value:
+            queryset = queryset.filter(**{field: value})
+    return queryset
+
+
+def parse_ordering(params):
+    """
+    Return ``(field, descending)`` from DataTables ``order[0][...]`` params.
+    Unknown columns fall back to ``student_id`` so we never sort unindexed.
+    """
+    try:
+        column = int(params.get("order[0][column]", 0))
+    except (TypeError, ValueError):
+        column = 0
+    field = ORDERABLE_COLUMNS.get(column, DEFAULT_ORDER_FIELD)
+    descending = params.get("order[0][dir]") == "desc"
+    return field, descending
+
+
+def encode_cursor(student, field):
+    payload = json.dumps([getattr(student, field), student.pk], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value, int(pk)
+    except (ValueError, TypeError, UnicodeError):
+        return None
+
+
+def paginate(queryset, field, descending, length, cursor=None, start=0):
+    """
+    Return one page of ``queryset`` ordered by ``field`` with ``pk`` as a
+    tie-breaker. When a cursor from the previous page is supplied the page
+    is located with a keyset seek instead of ``OFFSET``.
+    """
+    prefix = "-" if descending else ""
+    queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}pk")
+
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        value, pk = position
+        op = "lt" if descending else "gt"
+        try:
+            queryset = queryset.filter(
+                Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"pk__{op}": pk})
+            )
+        except ValidationError:
+            position = None
+        else:
+            start = 0
+
+    if position is None and start:
+        queryset = queryset[start:]
+
+    page = list(queryset[:length])
+    next_cursor = encode_cursor(page[-1], field) if len(page) == length else None
+    return page, next_cursor
+
+
+def serialize_student(student):
+    parent = student.parent
+    thumb = student.image_variant_urls.get("thumb")
+    if thumb:
+        image_url, image_webp_url = thumb["jpeg"], thumb["webp"]
+    elif student.student_image:
+        image_url, image_webp_url = student.student_image.url, None
+    else:
+        image_url, image_webp_url = static("assets/img/user.jpg"), None
+    return {
+        "student_id": student.student_id,
+        "name": f"{student.first_name} {student.last_name}",
+        "student_class": student.student_class,
+        "section": student.section,
+        "gender": student.gender,
+        "date_of_birth": student.date_of_birth.strftime("%d %b %Y"),
+        "parent_name": f"{parent.father_name} / {parent.mother_name}",
+        "mobile_number": student.mobile_number,
+        "address": parent.present_address,
+        "image_url": image_url,
+        "image_webp_url": image_webp_url,
+        "view_url": reverse("view_student", args=[student.slug]),
+        "edit_url": reverse("edit_student", args=[student.slug]),
+        "delete_url": reverse("delete_student", args=[student.slug]),
+    }
@@ -0,0 +1,106 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Parent, Student
+
+
+MIN_TERM_LENGTH = 2
+DEFAULT_LIMIT = 20
+TRIGRAM_FIELDS = ("first_name", "last_name", "parent__father_name", "parent__mother_name")
+FALLBACK_FIELDS = (
+    "first_name",
+    "last_name",
+    "student_id",
+    "admission_number",
+    "student_class",
+    "parent__father_name",
+    "parent__mother_name",
+    "parent__father_mobile",
+    "parent__mother_mobile",
+    "parent__father_email",
+    "parent__mother_email",
+)
+TOKEN_RE = re.compile(r"[\w@.+-]+")
+
+
+def _prefix_query(term):
+    """
+    Build a raw ``to_tsquery`` string matching every token as a prefix.
+    """
+    tokens = TOKEN_RE.findall(term.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"'{token}':*" for token in tokens)
+
+
+def _trigram_match(fields, term):
+    match = Q()
+    for field in fields:
+        match |= Q(**{f"{field}__trigram_similar": term})
+    return match
+
+
+def _postgres_search(queryset, term):
+    raw_query = _prefix_query(term)
+    if raw_query is None:
+        return queryset.none()
+    query = SearchQuery(raw_query, search_type="raw", config="simple")
+    # Each table is matched on its own so its GIN indexes can be used (an
+    # OR across the join cannot), and the candidates are combined with a
+    # UNION; only they are ranked.
+    student_fields = [field for field in TRIGRAM_FIELDS if not field.startswith("parent__")]
+    parent_fields = [field.removeprefix("parent__") for field in TRIGRAM_FIELDS if field.startswith("parent__")]
+    parents = Parent.objects.filter(Q(search_vector=query) | _trigram_match(parent_fields, term))
+    candidates = (
+        Student.objects.filter(Q(search_vector=query) | _trigram_match(student_fields, term))
+        .values("pk")
+        .union(Student.objects.filter(parent__in=parents.values("pk")).values("pk"))
+    )
+    return (
+        queryset.filter(pk__in=candidates)
+        .annotate(
+            rank=Coalesce(SearchRank(F("search_vector"), query), 0.0)
+            + Coalesce(SearchRank(F("parent__search_vector"), query), 0.0)
+            + Greatest(*[TrigramSimilarity(field, term) for field in TRIGRAM_FIELDS])
+        )
+        .order_by("-rank", "pk")
+    )
+
+
+def _fallback_search(queryset, term):
+    match = Q()
+    for field in FALLBACK_FIELDS:
+        match |= Q(**{f"{field}__icontains": term})
+    return (
+        queryset.filter(match)
+        .annotate(
+            rank=Case(
+                When(Q(student_id__iexact=term) | Q(admission_number__iexact=term), then=Value(3)),
+                When(Q(first_name__istartswith=term) | Q(last_name__istartswith=term), then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("-rank", "pk")
+    )
+
+
+def search_students(term, limit=DEFAULT_LIMIT):
+    """
+    Return up to ``limit`` students ranked by how well they or their parents
+    match ``term``. Uses the tsvector/trigram indexes on PostgreSQL and plain
+    ``icontains`` lookups elsewhere.
+    """
+    term = (term or "").strip()
+    queryset = Student.objects.active().select_related("parent").defer("search_vector", "parent__search_vector")
+    if len(term) < MIN_TERM_LENGTH:
+        return []
+    if connection.vendor == "postgresql":
+        results = _postgres_search(queryset, term)
+    else:
+        results = _fallback_search(queryset, term)
+    return list(results[:limit])
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .images import schedule_student_image, schedule_variant_cleanup
+from .models import Student
+
+
+def _image_name(student):
+    # Read from __dict__ so a deferred photo is never fetched just for this.
+    image = student.__dict__.get("student_image")
+    return getattr(image, "name", image) or ""
+
+
+@receiver(post_init, sender=Student)
+def remember_image(sender, instance, **kwargs):
+    instance._original_image = _image_name(instance)
+
+
+@receiver(post_save, sender=Student)
+def queue_image_variants(sender, instance, **kwargs):
+    """
+    Queue thumbnail/medium generation whenever a student's photo changes,
+    and the removal of the previous photo's variants.
+    """
+    name = instance.student_image.name if instance.student_image else ""
+    previous, instance._original_image = instance._original_image, name
+    if previous and previous != name:
+        variants = dict(instance.image_variants or {})
+        transaction.on_commit(lambda: schedule_variant_cleanup(previous, variants))
+
+    source = (instance.image_variants or {}).get("source", "")
+    if name == source:
+        return
+    if not name:
+        Student.objects.filter(pk=instance.pk).update(image_variants={})
+        return
+
+    student_pk = instance.pk
+    transaction.on_commit(lambda: schedule_student_image(student_pk, name))
+
+
+@receiver(post_delete, sender=Student)
+def delete_image_variants(sender, instance, **kwargs):
+    name = _image_name(instance)
+    if name:
+        variants = dict(instance.image_variants or {})
+        transaction.on_commit(lambda: schedule_variant_cleanup(name, variants))
@@ -1,3 +1,407 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import shutil
+import tempfile
+import unittest
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from home_auth.models import CustomUser
+from school import metrics
+from . import exporter, images, importer, promotion, roster, search
+from .models import GRADUATED_CLASS, Graduate, Parent, PromotionRun, Student
+
+
+def make_student(student_id, first_name="Asha", last_name="Rai", student_class="Grade 1", section="A", **fields):
+    parent = Parent.objects.create(
+        father_name=fields.pop("father_name", "Hari Rai"),
+        father_mobile="9800000000",
+        father_email="father@example.com",
+        mother_name=fields.pop("mother_name", "Sita Rai"),
+        mother_mobile="9800000001",
+        mother_email="mother@example.com",
+        present_address="Kathmandu",
+        permanent_address="Kathmandu",
+    )
+    return Student.objects.create(
+        first_name=first_name,
+        last_name=last_name,
+        student_id=student_id,
+        gender="Female",
+        date_of_birth=datetime.date(2015, 1, 1),
+        student_class=student_class,
+        religion="Hindu",
+        joining_date=datetime.date(2020, 4, 1),
+        mobile_number="9800000002",
+        admission_number=f"ADM-{student_id}",
+        section=section,
+        parent=parent,
+        **fields,
+    )
+
+
+class RosterCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated first names make the pk tie-breaker matter.
+        names = ["Bina", "Asha", "Bina", "Chandra", "Asha", "Bina", "Dipa"]
+        cls.students = [make_student(f"S{index:02d}", first_name=name) for index, name in enumerate(names)]
+
+    def walk(self, field, descending, length):
+        queryset = Student.objects.all()
+        seen, cursor = [], None
+        while True:
+            page, cursor = roster.paginate(queryset, field, descending, length, cursor=cursor)
+            seen += [student.pk for student in page]
+            if cursor is None:
+                return seen
+
+    def test_cursor_pages_cover_every_row_once_in_order(self):
+        for descending in (False, True):
+            expected = sorted(
+                self.students, key=lambda student: (student.first_name, student.pk), reverse=descending
+            )
+            with self.subTest(descending=descending):
+                self.assertEqual(self.walk("first_name", descending, 3), [student.pk for student in expected])
+
+    def test_short_last_page_has_no_cursor(self):
+        page, cursor = roster.paginate(Student.objects.all(), "student_id", False, 10)
+        self.assertEqual(len(page), 7)
+        self.assertIsNone(cursor)
+
+    def test_cursor_round_trip(self):
+        student = self.students[0]
+        self.assertEqual(
+            roster.decode_cursor(roster.encode_cursor(student, "first_name")), ("Bina", student.pk)
+        )
+
+    def test_invalid_cursor_falls_back_to_offset(self):
+        self.assertIsNone(roster.decode_cursor("not a cursor"))
+        page, _ = roster.paginate(Student.objects.all(), "student_id", False, 2, cursor="not a cursor", start=2)
+        self.assertEqual([student.student_id for student in page], ["S02", "S03"])
+
+    def test_cursor_with_a_value_of_the_wrong_type_falls_back_to_offset(self):
+        cursor = roster.encode_cursor(self.students[0], "first_name")
+        page, _ = roster.paginate(Student.objects.all(), "date_of_birth", False, 2, cursor=cursor, start=1)
+        self.assertEqual(len(page), 2)
+
+
+@unittest.skipIf(connection.vendor == "postgresql", "PostgreSQL uses the full-text search path")
+class SearchFallbackTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.by_id = make_student("KTM-42", first_name="Bikash", last_name="Thapa")
+        cls.by_name = make_student("KTM-43", first_name="Ktmala", last_name="Gurung")
+        cls.by_parent = make_student("PKR-1", first_name="Nisha", last_name="Lama", mother_name="Sunita Ktmandal")
+        cls.graduate = make_student("KTM-44", first_name="Ram", student_class=GRADUATED_CLASS)
+
+    def test_short_terms_return_nothing(self):
+        self.assertEqual(search.search_students("k"), [])
+
+    def test_matches_students_and_parents_and_ranks_exact_ids_first(self):
+        self.assertEqual(
+            [student.pk for student in search.search_students("ktm-42")],
+            [self.by_id.pk],
+        )
+        self.assertEqual(
+            [student.pk for student in search.search_students("Ktm")],
+            [self.by_name.pk, self.by_id.pk, self.by_parent.pk],
+        )
+
+    def test_graduates_are_left_out(self):
+        self.assertNotIn(self.graduate, search.search_students("KTM-44"))
+
+    def test_limit(self):
+        self.assertEqual(len(search.search_students("Ktm", limit=1)), 1)
+
+
+def csv_file(rows):
+    lines = [",".join(importer.COLUMNS)]
+    for values in rows:
+        lines.append(",".join(values.get(column, "") for column in importer.COLUMNS))
+    return "\n".join(lines) + "\n"
+
+
+def import_row(student_id, **values):
+    row = {
+        "first_name": "Asha",
+        "last_name": "Rai",
+        "student_id": student_id,
+        "gender": "Female",
+        "date_of_birth": "2015-01-01",
+        "student_class": "Grade 1",
+        "religion": "Hindu",
+        "joining_date": "2020-04-01",
+        "mobile_number": "9800000002",
+        "admission_number": f"ADM-{student_id}",
+        "section": "A",
+        "father_name": "Hari Rai",
+        "father_mobile": "9800000000",
+        "father_email": "father@example.com",
+        "mother_name": "Sita Rai",
+        "mother_mobile": "9800000001",
+        "mother_email": "mother@example.com",
+        "present_address": "Kathmandu",
+        "permanent_address": "Kathmandu",
+    }
+    row.update(values)
+    return row
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def run_import(self, data, filename="students.csv", **options):
+        if isinstance(data, str):
+            data = data.encode()
+        with self.captureOnCommitCallbacks(execute=True):
+            return importer.import_students(importer.iter_rows(io.BytesIO(data), filename), **options)
+
+    def test_valid_rows_are_imported_and_invalid_rows_reported(self):
+        make_student("EXISTING")
+        result = self.run_import(csv_file([
+            import_row("N1"),
+            import_row("N2", date_of_birth="not a date"),
+            import_row("N1"),
+            import_row("EXISTING"),
+            import_row("N3"),
+        ]))
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.failure, "")
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5])
+        self.assertIn("Duplicate ID", result.errors[1][1][0])
+        self.assertIn("already exists", result.errors[2][1][0])
+        self.assertEqual(
+            sorted(Student.objects.filter(student_id__startswith="N").values_list("student_id", flat=True)),
+            ["N1", "N3"],
+        )
+
+    def test_row_with_too_many_columns_is_reported(self):
+        data = csv_file([import_row("N1"), import_row("N2")]).splitlines()
+        data[2] += ",surplus,values"
+        result = self.run_import("\n".join(data) + "\n")
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(3, ["Too many columns: 2 more than the header."])])
+
+    def test_dry_run_writes_nothing(self):
+        result = self.run_import(csv_file([import_row("N1"), import_row("N2")]), dry_run=True)
+        self.assertEqual(result.created, 2)
+        self.assertFalse(Student.objects.exists())
+
+    def test_unsupported_extension_is_rejected(self):
+        with self.assertRaises(ValueError):
+            importer.iter_rows(io.BytesIO(b""), "students.txt")
+
+    def test_damaged_workbook_is_reported(self):
+        result = self.run_import(b"PK\x03\x04 not really a zip", filename="students.xlsx")
+        self.assertEqual(result.created, 0)
+        self.assertIn("XLSX", result.failure)
+
+    def test_read_error_keeps_committed_batches_and_refreshes_the_dashboard(self):
+        self.assertEqual(metrics.get_dashboard_metrics(["students"])["student_count"], 0)
+        # Enough rows that the decoding error comes after the first batches.
+        data = csv_file([import_row(f"N{index}") for index in range(60)]).encode() + b"\xff\xfe broken\n"
+        result = self.run_import(data, batch_size=10)
+        self.assertIn("Could not read the CSV file", result.failure)
+        self.assertGreater(result.created, 0)
+        self.assertEqual(result.created, Student.objects.count())
+        self.assertEqual(metrics.get_dashboard_metrics(["students"])["student_count"], result.created)
+
+
+class PromotionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = make_student("P1", student_class="Grade 1", section="A")
+        self.second = make_student("P2", student_class="Grade 1", section="B")
+        self.final = make_student("P3", student_class="Grade 12", section="A")
+        self.other = make_student("P4", student_class="Nursery", section="A")
+
+    def apply(self, rules=None, **options):
+        with self.captureOnCommitCallbacks(execute=True):
+            return promotion.apply(rules, **options)
+
+    def undo(self, run):
+        with self.captureOnCommitCallbacks(execute=True):
+            return promotion.undo(run)
+
+    def classes(self):
+        return dict(Student.objects.values_list("student_id", "student_class"))
+
+    def test_plan_lists_moves_and_unchanged_classes(self):
+        moves, unchanged = promotion.plan()
+        self.assertEqual(
+            [(move["from_class"], move["from_section"], move["to_class"], move["students"]) for move in moves],
+            [("Grade 1", "A", "Grade 2", 1), ("Grade 1", "B", "Grade 2", 1), ("Grade 12", "A", GRADUATED_CLASS, 1)],
+        )
+        self.assertEqual([group["student_class"] for group in unchanged], ["Nursery"])
+
+    def test_apply_promotes_and_archives_graduates(self):
+        run = self.apply()
+        self.assertEqual(
+            self.classes(), {"P1": "Grade 2", "P2": "Grade 2", "P3": GRADUATED_CLASS, "P4": "Nursery"}
+        )
+        self.assertEqual(list(run.graduates.values_list("student_id", "final_class")), [(self.final.pk, "Grade 12")])
+        self.assertNotIn(self.final, Student.objects.active())
+        self.assertEqual(metrics.get_dashboard_metrics(["students"])["student_count"], 3)
+
+    def test_section_rules(self):
+        self.apply(promotion.Rules.parse(["Grade 2: B>A"]))
+        self.assertEqual(
+            set(Student.objects.filter(student_class="Grade 2").values_list("section", flat=True)), {"A"}
+        )
+
+    def test_invalid_rules_are_rejected(self):
+        for line in ("Grade 6", "Class 6: 2", "Grade 6: 0", "Grade 6: A"):
+            with self.subTest(line=line), self.assertRaises(ValueError):
+                promotion.Rules.parse([line])
+
+    def test_undo_restores_classes_and_graduates(self):
+        before = self.classes()
+        run = self.apply(promotion.Rules.parse(["Grade 2: 1"]))
+        self.undo(run)
+        self.assertEqual(self.classes(), before)
+        self.assertEqual(
+            set(Student.objects.values_list("section", flat=True)), {"A", "B"}
+        )
+        self.assertFalse(Graduate.objects.exists())
+        run.refresh_from_db()
+        self.assertEqual(run.status, "undone")
+        with self.assertRaises(ValueError):
+            promotion.undo(run)
+
+    def test_second_apply_in_a_year_is_refused(self):
+        run = self.apply(today=datetime.date(2026, 3, 31))
+        with self.assertRaises(ValueError):
+            self.apply(today=datetime.date(2026, 4, 1))
+        self.assertEqual(self.classes()["P1"], "Grade 2")
+        self.undo(run)
+        self.apply(today=datetime.date(2026, 4, 1))
+        self.assertEqual(PromotionRun.objects.filter(status="applied").count(), 1)
+
+    def test_only_the_latest_run_can_be_undone(self):
+        first = self.apply(today=datetime.date(2025, 3, 31))
+        self.apply(today=datetime.date(2026, 3, 31))
+        with self.assertRaises(ValueError):
+            promotion.undo(first)
+
+
+class StudentPageTests(TestCase):
+    def test_edit_page_for_a_student_without_a_photo(self):
+        student = make_student("E1")
+        self.client.force_login(CustomUser.objects.create_user("admin", "admin@example.com", "pass", is_admin=True))
+        response = self.client.get(reverse("edit_student", kwargs={"slug": student.slug}))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Current Image")
+
+
+def image_file(name, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), color).save(buffer, format="JPEG")
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, STUDENT_IMAGE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def save_photo(self, student, name, color):
+        student.student_image = image_file(name, color)
+        with self.captureOnCommitCallbacks(execute=True):
+            student.save()
+        student.refresh_from_db()
+        return student.image_variants
+
+    def stored(self, variants):
+        return [
+            default_storage.exists(name)
+            for variant, formats in sorted(variants.items()) if variant != "source"
+            for name in formats.values()
+        ]
+
+    def test_variants_follow_the_photo(self):
+        student = make_student("I1")
+        first = self.save_photo(student, "first.jpg", "red")
+        self.assertEqual(self.stored(first), [True] * 4)
+        self.assertEqual(
+            images.variant_names(first["source"], first),
+            images.variant_names(first["source"]),
+        )
+
+        second = self.save_photo(student, "second.jpg", "blue")
+        self.assertEqual(self.stored(first), [False] * 4)
+        self.assertEqual(self.stored(second), [True] * 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            student.delete()
+        self.assertEqual(self.stored(second), [False] * 4)
+
+    def test_variants_of_a_replaced_photo_are_not_kept(self):
+        student = make_student("I2")
+        student.student_image = image_file("old.jpg", "red")
+        student.save()
+        old_name = student.student_image.name
+        Student.objects.filter(pk=student.pk).update(student_image="students/newer.jpg")
+        self.assertFalse(images.process_student_image(student.pk, old_name))
+        self.assertFalse(any(default_storage.exists(name) for name in images.variant_names(old_name)))
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user("admin", "admin@example.com", "pass", is_admin=True)
+        make_student("X1", student_class="Grade 3")
+        make_student("X2", student_class="Grade 4", section="B")
+        make_student("X3", student_class=GRADUATED_CLASS)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse("export_students"), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_export_can_be_imported_again(self):
+        data = self.export(format="csv")
+        self.assertEqual(data.splitlines()[0].decode(), ",".join(importer.COLUMNS))
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.exclude(student_class=GRADUATED_CLASS).delete()
+            result = importer.import_students(importer.iter_rows(io.BytesIO(data), "students.csv"))
+        self.assertEqual((result.created, result.errors), (2, []))
+        self.assertEqual(
+            sorted(Student.objects.active().values_list("student_id", "student_class", "section")),
+            [("X1", "Grade 3", "A"), ("X2", "Grade 4", "B")],
+        )
+
+    def test_json_lines_with_columns_and_filters(self):
+        data = self.export(format="jsonl", columns="student_id,father_name", section="B")
+        self.assertEqual(
+            [json.loads(line) for line in data.decode().splitlines()],
+            [{"student_id": "X2", "father_name": "Hari Rai"}],
+        )
+
+    def test_xlsx_export(self):
+        rows = list(importer.iter_rows(io.BytesIO(self.export(format="xlsx")), "students.xlsx"))
+        self.assertEqual([row["student_id"] for row in rows], ["X1", "X2"])
+        self.assertEqual(rows[0]["date_of_birth"], "2015-01-01")
+
+    def test_rows_are_read_in_chunks(self):
+        rows = exporter.iter_values(["student_id"], {}, chunk_size=1)
+        self.assertEqual(list(rows), [("X1",), ("X2",)])
+
+    def test_bad_requests(self):
+        for params in ({"format": "pdf"}, {"columns": "student_id,password"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse("export_students"), params).status_code, 400)
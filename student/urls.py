@@ -5,6 +5,12 @@ from . import views
 urlpatterns = [
     path("", views.student_list, name='student_list'),
     path("add/", views.add_student, name="add_student"),
+    path("import/", views.import_students, name="import_students"),
+    path("export/", views.export_students, name="export_students"),
+    path("promote/", views.promote_students, name="promote_students"),
+    path("api/roster/", views.student_roster_data, name="student_roster_data"),
+    path("search/", views.student_search, name="student_search"),
+    path("api/search/", views.student_search_data, name="student_search_data"),
     path('students/<str:slug>/', views.view_student, name='view_student'),
     path('edit/<str:slug>/', views.edit_student, name='edit_student'),
     path('delete/<str:slug>/', views.delete_student, name='delete_student'),
@@ -1,9 +1,13 @@
+from datetime import timedelta
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponseForbidden
+from django.http import FileResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from .models import Parent, Student
+from django.utils import timezone
+from .models import Parent, PromotionRun, Student
+from . import exporter, importer, promotion, roster, search
+from school import attendance, homework, metrics
 from school.models import Notification
 
 
@@ -87,16 +91,185 @@ def add_student(request):
     return render(request, "students/add-student.html")
 
 
+@login_required
+def import_students(request):
+    _ensure_staff_access(request)
+    context = {'columns': importer.COLUMNS}
+    if request.method == "POST":
+        upload = request.FILES.get('import_file')
+        if not upload:
+            messages.error(request, "Choose a CSV or XLSX file to import.")
+            return redirect("import_students")
+        try:
+            rows = importer.iter_rows(upload, upload.name)
+            result = importer.import_students(rows, dry_run=bool(request.POST.get('dry_run')))
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return redirect("import_students")
+        if result.failure:
+            messages.error(request, f"The import stopped early: {result.failure}")
+        if result.created and not request.POST.get('dry_run'):
+            create_notification(request.user, f"Imported {result.created} students")
+        context['result'] = result
+        context['dry_run'] = bool(request.POST.get('dry_run'))
+    return render(request, "students/import-students.html", context)
+
+
+@login_required
+def promote_students(request):
+    """
+    Year-end promotion: preview the moves, apply them in one transaction,
+    or undo the latest run. Administrators only.
+    """
+    if not request.user.is_admin:
+        raise PermissionDenied("Only administrators can promote students.")
+    rules_text = request.POST.get('rules', '')
+    try:
+        rules = promotion.Rules.parse(rules_text.splitlines())
+        rules_valid = True
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        rules, rules_valid = promotion.Rules(), False
+
+    if request.method == "POST" and request.POST.get('action') == 'undo':
+        run = get_object_or_404(PromotionRun, pk=request.POST.get('run'))
+        try:
+            promotion.undo(run)
+        except ValueError as exc:
+            messages.error(request, str(exc))
+        else:
+            create_notification(request.user, "Undid the year-end promotion")
+            messages.success(request, "Promotion undone.")
+        return redirect("promote_students")
+
+    if request.method == "POST" and request.POST.get('action') == 'apply' and rules_valid:
+        try:
+            run = promotion.apply(rules, user=request.user)
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return redirect("promote_students")
+        promoted = sum(move['students'] for move in run.summary)
+        create_notification(request.user, f"Promoted {promoted} students")
+        messages.success(request, f"Promoted {promoted} students; {run.graduates.count()} graduated.")
+        return redirect("promote_students")
+
+    moves, unchanged = promotion.plan(rules)
+    return render(request, "students/promote-students.html", {
+        'rules': rules_text,
+        'moves': moves,
+        'unchanged': unchanged,
+        'runs': PromotionRun.objects.select_related('created_by')[:10],
+        'graduated_class': promotion.GRADUATED_CLASS,
+    })
+
+
+@login_required
+def export_students(request):
+    _ensure_staff_access(request)
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exporter.FORMATS:
+        return JsonResponse({'error': 'Unsupported export format.'}, status=400)
+    try:
+        columns = exporter.parse_columns(request.GET.get('columns'))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    content_type, extension = exporter.FORMATS[export_format]
+    filename = f"students.{extension}"
+    rows = exporter.iter_values(columns, request.GET)
+    if export_format == 'xlsx':
+        return FileResponse(
+            exporter.export_xlsx_file(columns, rows),
+            as_attachment=True,
+            filename=filename,
+            content_type=content_type,
+        )
+    if export_format == 'jsonl':
+        stream = exporter.iter_jsonl(columns, rows)
+    else:
+        stream = exporter.iter_csv(columns, rows)
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def student_list(request):
     _ensure_staff_access(request)
-    student_list = Student.objects.select_related('parent').all()
+    # Rows are fetched page by page from student_roster_data; only the
+    # filter choices are rendered here.
     context = {
-        'student_list': student_list,
+        'class_choices': Student.objects.order_by('student_class').values_list('student_class', flat=True).distinct(),
+        'section_choices': Student.objects.order_by('section').values_list('section', flat=True).distinct(),
+        'gender_choices': [value for value, _ in Student._meta.get_field('gender').choices],
     }
     return render(request, "students/students.html", context)
 
 
+@login_required
+def student_roster_data(request):
+    """
+    DataTables server-side endpoint for the student list.
+    """
+    _ensure_staff_access(request)
+    params = request.GET
+    try:
+        length = int(params.get('length', 10))
+        start = int(params.get('start', 0))
+        draw = int(params.get('draw', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid paging parameters.'}, status=400)
+    if length < 1:
+        length = roster.MAX_PAGE_LENGTH
+    length = min(length, roster.MAX_PAGE_LENGTH)
+    start = max(start, 0)
+
+    queryset = Student.objects.select_related('parent').defer('search_vector', 'parent__search_vector')
+    records_total = metrics.get_dashboard_metrics(['students'])['student_count']
+    filtered = roster.filter_students(queryset, params)
+    # Without a filter the count is the (cached) number of enrolled students.
+    filtering = any(params.get(field) for field in roster.FILTER_FIELDS)
+    records_filtered = filtered.count() if filtering else records_total
+
+    field, descending = roster.parse_ordering(params)
+    page, next_cursor = roster.paginate(
+        filtered, field, descending, length, cursor=params.get('cursor'), start=start
+    )
+    return JsonResponse({
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'data': [roster.serialize_student(student) for student in page],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def student_search(request):
+    _ensure_staff_access(request)
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'results': search.search_students(query),
+    }
+    return render(request, "students/search-results.html", context)
+
+
+@login_required
+def student_search_data(request):
+    _ensure_staff_access(request)
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit', search.DEFAULT_LIMIT)), roster.MAX_PAGE_LENGTH)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit.'}, status=400)
+    results = search.search_students(query, limit=max(limit, 1))
+    return JsonResponse({
+        'query': query,
+        'data': [roster.serialize_student(student) for student in results],
+    })
+
+
 @login_required
 def edit_student(request,slug):
     _ensure_staff_access(request)
@@ -159,7 +332,11 @@ def view_student(request, slug):
     _ensure_staff_access(request)
     student = get_object_or_404(Student, slug=slug)
     context = {
-        'student': student
+        'student': student,
+        'attendance': attendance.student_summary(
+            student, start=timezone.localdate() - timedelta(days=90)
+        ),
+        'outstanding_homework': homework.outstanding_for(student)[:10],
     }
     return render(request, "students/student-details.html", context)
 